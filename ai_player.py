@@ -1,20 +1,72 @@
 import math
 import random
+from physics import SIMULATION_RATE
+from shot_cache import TranspositionCache, MISSING
+from table_geometry import table_geometry
+
+try:
+    from shot_planner import ShotPlanner
+    from placement_search import best_placement
+except ImportError:  # numpy missing: fall back to the geometric heuristics
+    ShotPlanner = None
+    best_placement = None
 
 class AIPlayer:
-    def __init__(self):
+    def __init__(self, time_budget=0.1, cache_entries=4096, physics_rate=SIMULATION_RATE):
         self.difficulty = 1  # Can be adjusted for different difficulty levels
         self.top_spin = 0
         self.side_spin = 0
         self.pockets = []  # Will be populated when calculate_shot is called
-        self.WIDTH, self.TABLE_HEIGHT = 800, 400
+        self.geometry = table_geometry()
+        self.WIDTH, self.TABLE_HEIGHT = self.geometry.width, self.geometry.height
         self.HEIGHT = 600
-        self.EDGE_WIDTH = 20
-        self.POCKET_RADIUS = 15
+        self.EDGE_WIDTH = self.geometry.edge_width
+        self.POCKET_RADIUS = self.geometry.pocket_radius
         self.DIAMOND_SIZE = 5
-        self.BALL_RADIUS = 8
+        self.BALL_RADIUS = self.geometry.ball_radius
+        # Monte-Carlo search on the real physics, stepped at the game's physics
+        # rate and limited to time_budget seconds per shot
+        self.planner = ShotPlanner(time_budget, physics_rate=physics_rate) if ShotPlanner and time_budget > 0 else None
+        # Memoized shots, next-shot options and placements for repeated layouts
+        self.cache = TranspositionCache(cache_entries)
 
     def calculate_shot(self, cue_ball, target_ball, all_balls, pockets, BALL_RADIUS):
+        """Pick a shot, refining the heuristic and geometric candidates with the planner when available"""
+        key = self.cache.key([cue_ball] + all_balls, 'shot', target_ball.number)
+        shot = self.cache.get(key)
+        if shot is MISSING:
+            shot = self.search_shot(cue_ball, target_ball, all_balls, pockets, BALL_RADIUS)
+            self.cache.put(key, shot)
+        return shot
+
+    def search_shot(self, cue_ball, target_ball, all_balls, pockets, BALL_RADIUS):
+        """Uncached shot search behind calculate_shot"""
+        heuristic_shot = self.calculate_heuristic_shot(cue_ball, target_ball, all_balls, pockets, BALL_RADIUS)
+        if self.planner is None or not target_ball.in_game:
+            return heuristic_shot
+
+        seeds = [heuristic_shot] + self.geometric_shots(cue_ball, target_ball, pockets)
+        planned_shot, _ = self.planner.plan(cue_ball, target_ball, all_balls, seeds)
+        return planned_shot if planned_shot else heuristic_shot
+
+    def geometric_shots(self, cue_ball, target_ball, pockets):
+        """Ghost-ball shot into every pocket the target can enter, at the power evaluate_direct_shot would start from"""
+        shots = []
+        pocket_indices = {pocket: index for index, pocket in enumerate(self.geometry.pockets)}
+        distance_to_target = math.sqrt((target_ball.x - cue_ball.x)**2 + (target_ball.y - cue_ball.y)**2)
+        for pocket in pockets:
+            index = pocket_indices.get(tuple(pocket))
+            approach = math.atan2(pocket[1] - target_ball.y, pocket[0] - target_ball.x)
+            if index is not None and not self.geometry.accepts(index, approach):
+                continue  # The target ball would meet the pocket jaw
+            angle = self.calculate_shot_angle(cue_ball.x, cue_ball.y, target_ball.x, target_ball.y,
+                                              pocket[0], pocket[1])
+            target_to_pocket = math.sqrt((pocket[0] - target_ball.x)**2 + (pocket[1] - target_ball.y)**2)
+            power = min((distance_to_target + target_to_pocket/2) / 4, 20) * self.difficulty
+            shots.append((angle, power, 0, 0))
+        return shots
+
+    def calculate_heuristic_shot(self, cue_ball, target_ball, all_balls, pockets, BALL_RADIUS):
         """Modified to properly handle blocked shots and legal safeties"""
         if not target_ball.in_game:
             return None, None, 0, 0
@@ -399,6 +451,12 @@ class AIPlayer:
 
     def evaluate_shot_options(self, cue_x, cue_y, target_ball, all_balls):
         """Evaluate shot options for a given cue ball position and target"""
+        key = self.cache.key(all_balls, 'options', target_ball.number,
+                             self.cache.quantize(cue_x), self.cache.quantize(cue_y))
+        shot_options = self.cache.get(key)
+        if shot_options is not MISSING:
+            return shot_options
+
         shot_options = []
         for pocket in self.pockets:
             # Check direct shots
@@ -415,6 +473,7 @@ class AIPlayer:
             if bank_shot:
                 shot_options.append(bank_shot)
 
+        self.cache.put(key, shot_options)
         return shot_options
 
     def evaluate_direct_shot_simple(self, cue_x, cue_y, target_ball, pocket, all_balls):
@@ -440,12 +499,12 @@ class AIPlayer:
         best_bank_shot = None
         best_bank_score = float('-inf')
 
-        # Define cushions with offset
-        offset = self.POCKET_RADIUS / math.sqrt(2)
-        top_cushion = self.EDGE_WIDTH + offset
-        bottom_cushion = self.TABLE_HEIGHT - self.EDGE_WIDTH - offset
-        left_cushion = self.EDGE_WIDTH + offset
-        right_cushion = self.WIDTH - self.EDGE_WIDTH - offset
+        # Cushion lines with offset
+        bank_lines = self.geometry.bank_lines
+        top_cushion = bank_lines['top']
+        bottom_cushion = bank_lines['bottom']
+        left_cushion = bank_lines['left']
+        right_cushion = bank_lines['right']
 
         # Calculate symmetric points for each cushion
         symmetric_points = [
@@ -492,29 +551,20 @@ class AIPlayer:
         best_bank_shot = None
         best_bank_score = float('-inf')
 
-        # Define cushions with offset
-        offset = self.POCKET_RADIUS / math.sqrt(2)
-        top_cushion = self.EDGE_WIDTH + offset
-        bottom_cushion = self.TABLE_HEIGHT - self.EDGE_WIDTH - offset
-        left_cushion = self.EDGE_WIDTH + offset
-        right_cushion = self.WIDTH - self.EDGE_WIDTH - offset
+        # Cushion lines with offset
+        bank_lines = self.geometry.bank_lines
+        top_cushion = bank_lines['top']
+        bottom_cushion = bank_lines['bottom']
+        left_cushion = bank_lines['left']
+        right_cushion = bank_lines['right']
+
+        # Symmetric points for each cushion are the same for every pocket
+        cushions = list(bank_lines.items())
+        symmetric_points = [self.geometry.mirror(target_ball.x, target_ball.y, cushion_type)
+                            for cushion_type, _ in cushions]
 
         # Try each pocket
         for pocket in self.pockets:
-            # Calculate symmetric points for each cushion
-            symmetric_points = [
-                (target_ball.x, top_cushion - (target_ball.y - top_cushion)),  # Top
-                (target_ball.x, bottom_cushion + (bottom_cushion - target_ball.y)),  # Bottom
-                (left_cushion - (target_ball.x - left_cushion), target_ball.y),  # Left
-                (right_cushion + (right_cushion - target_ball.x), target_ball.y)  # Right
-            ]
-            cushions = [
-                ("top", top_cushion),
-                ("bottom", bottom_cushion),
-                ("left", left_cushion),
-                ("right", right_cushion)
-            ]
-
             for (cushion_type, cushion_pos), symmetric_point in zip(cushions, symmetric_points):
                 intersection = self.find_cushion_intersection(
                     cue_ball, symmetric_point, cushion_type, cushion_pos
@@ -858,10 +908,31 @@ class AIPlayer:
         best_score = float('-inf')
         target_ball = game_instance.numbered_balls[game_instance.current_target_ball - 1]
 
+        key = self.cache.key(game_instance.numbered_balls, 'placement', target_ball.number, is_initial_placement)
+        cached_position = self.cache.get(key)
+        if cached_position is not MISSING:
+            return cached_position
+
         if not target_ball.in_game:
             return self.find_random_valid_position(game_instance, min_x, max_x, min_y, max_y, 
                                                  is_initial_placement)
 
+        if best_placement:
+            # 200x100 grid searched coarse-to-fine with array scoring
+            placement = best_placement(
+                (min_x, max_x, min_y, max_y), (target_ball.x, target_ball.y),
+                [(ball.x, ball.y) for ball in game_instance.numbered_balls if ball.in_game],
+                [(ball.x, ball.y) for ball in game_instance.numbered_balls if ball.in_game and ball != target_ball],
+                game_instance.pockets, game_instance.WIDTH, game_instance.TABLE_HEIGHT,
+                game_instance.cue_ball.radius + game_instance.BALL_RADIUS, self.BALL_RADIUS * 1.8
+            )
+            if placement:
+                best_position = placement[:2]
+                self.cache.put(key, best_position)
+                return best_position
+            return self.find_random_valid_position(game_instance, min_x, max_x, min_y, max_y,
+                                                 is_initial_placement)
+
         # Grid search for best position
         grid_steps = 20
         x_step = (max_x - min_x) / grid_steps
@@ -884,6 +955,7 @@ class AIPlayer:
                     best_position = (x, y)
 
         if best_position:
+            self.cache.put(key, best_position)
             return best_position
 
         return self.find_random_valid_position(game_instance, min_x, max_x, min_y, max_y, 
@@ -0,0 +1,185 @@
+import math
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from physics import BallState, SIMULATION_RATE
+from ai_player import AIPlayer, ShotPlanner
+from shot_cache import TranspositionCache, MISSING
+
+# Immutable copy of a table at rest, cheap to pickle across to a worker process.
+# balls holds one BallSnapshot per ball, cue ball first; physics_rate is the
+# rate the game steps its physics at, for rollouts on the same steps.
+BallSnapshot = namedtuple('BallSnapshot', 'number x y in_game top_spin side_spin')
+TableSnapshot = namedtuple('TableSnapshot', 'balls width height edge_width pocket_radius ball_radius acceleration '
+                                            'physics_rate')
+
+# Heuristics-only AIPlayer kept for the life of a worker process, so its
+# transposition cache carries over between searches
+_worker_player = None
+
+
+def snapshot_table(cue_ball, numbered_balls, physics_rate=SIMULATION_RATE):
+    """Freeze the positions and leftover spin of every ball on the table"""
+    balls = tuple(BallSnapshot(ball.number, ball.x, ball.y, ball.in_game, ball.top_spin, ball.side_spin)
+                  for ball in [cue_ball] + numbered_balls)
+    return TableSnapshot(balls, cue_ball.width, cue_ball.height, cue_ball.edge_width,
+                         cue_ball.pocket_radius, cue_ball.radius, cue_ball.acceleration, physics_rate)
+
+
+def restore_table(snapshot):
+    """Rebuild resting BallStates from a snapshot; returns (cue_ball, numbered_balls)"""
+    offset = snapshot.pocket_radius / math.sqrt(2)
+    balls = []
+    for frozen in snapshot.balls:
+        ball = BallState(frozen.x, frozen.y, snapshot.ball_radius, snapshot.width, snapshot.height,
+                         snapshot.edge_width, snapshot.pocket_radius, offset, snapshot.acceleration,
+                         number=frozen.number)
+        ball.in_game = frozen.in_game
+        ball.top_spin = frozen.top_spin
+        ball.side_spin = frozen.side_spin
+        balls.append(ball)
+    return balls[0], balls[1:]
+
+
+def search_shot(snapshot, target_number, pockets, pocket_indices, include_heuristic, time_budget, seed):
+    """
+    Worker entry point. Runs the planner over the ghost-ball shots into the
+    given pockets, plus the heuristic shot when include_heuristic is set.
+    Returns (shot, score); score is -inf when the planner is unavailable.
+    """
+    global _worker_player
+    if _worker_player is None:
+        _worker_player = AIPlayer(time_budget=0)  # The planner below gets its own seed
+    ai_player = _worker_player
+
+    cue_ball, numbered_balls = restore_table(snapshot)
+    target_ball = numbered_balls[target_number - 1]
+    key = ai_player.cache.key([cue_ball] + numbered_balls, 'search', target_number,
+                              tuple(pocket_indices), include_heuristic, snapshot.physics_rate)
+    result = ai_player.cache.get(key)
+    if result is not MISSING:
+        return result
+    ai_player.BALL_RADIUS = snapshot.ball_radius
+    ai_player.pockets = pockets
+
+    seeds = ai_player.geometric_shots(cue_ball, target_ball, [pockets[index] for index in pocket_indices])
+    if include_heuristic:
+        seeds.insert(0, ai_player.calculate_heuristic_shot(cue_ball, target_ball, numbered_balls,
+                                                           pockets, snapshot.ball_radius))
+    if ShotPlanner is None:
+        result = (seeds[0] if seeds else None), float('-inf')
+    else:
+        planner = ShotPlanner(time_budget, seed=seed, physics_rate=snapshot.physics_rate)
+        result = planner.plan(cue_ball, target_ball, numbered_balls, seeds)
+    ai_player.cache.put(key, result)
+    return result
+
+
+class AISearch:
+    """
+    Runs AI shot searches on a process pool so the render loop never waits.
+    start() splits the pockets across the workers and returns at once;
+    poll() returns None until every worker has answered, then the best shot.
+    Finished searches are cached, so a repeated layout skips the pool. If the
+    workers fail, the heuristic shot is worked out here instead.
+    """
+
+    def __init__(self, workers=None, time_budget=0.5, cache_entries=1024, physics_rate=SIMULATION_RATE):
+        self.workers = workers or max(1, min(6, (os.cpu_count() or 2) - 1))
+        self.time_budget = time_budget
+        self.physics_rate = physics_rate  # Rollouts step like the game's physics
+        self.cache = TranspositionCache(cache_entries)
+        self._pool = None
+        self._futures = []
+        self._key = None
+        self._ready = None
+        self._turn = 0
+        self._search = None  # (snapshot, target number, pockets) of the running search
+        self._player = None  # Heuristics-only AIPlayer for the fallback shot
+
+    def start(self, cue_ball, target_ball, numbered_balls, pockets):
+        """Submit a search for the current table, dropping any search still running"""
+        self.cancel()
+        snapshot = snapshot_table(cue_ball, numbered_balls, self.physics_rate)
+        self._key = self.cache.key(snapshot.balls, target_ball.number)
+        self._ready = self.cache.get(self._key)
+        if self._ready is not MISSING:
+            return
+
+        self._ready = None
+        self._turn += 1
+        pockets = [tuple(pocket) for pocket in pockets]
+        self._search = (snapshot, target_ball.number, pockets)
+        try:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(self.workers)
+            for worker in range(self.workers):
+                pocket_indices = list(range(worker, len(pockets), self.workers))
+                if not pocket_indices and worker > 0:
+                    break
+                self._futures.append(self._pool.submit(
+                    search_shot, snapshot, target_ball.number, pockets, pocket_indices,
+                    worker == 0, self.time_budget, self._turn * self.workers + worker))
+        except Exception as e:
+            print(f"AI workers unavailable: {e}")
+            self.cancel()
+            self._drop_pool()
+            self._ready = self._fallback_shot()
+
+    def poll(self):
+        """Best (angle, power, top_spin, side_spin) once every worker is done, otherwise None"""
+        if self._ready is not None:
+            shot, self._ready = self._ready, None
+            return shot
+        if not self._futures or not all(future.done() for future in self._futures):
+            return None
+        results = []
+        failed = 0
+        for future in self._futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                print(f"AI worker failed: {e}")
+                if isinstance(e, BrokenProcessPool):
+                    self._drop_pool()  # Start a fresh pool for the next search
+                results.append((None, float('-inf')))
+                failed += 1
+        self._futures = []
+        if failed == len(results):
+            return self._fallback_shot()  # Not cached, so the workers get another go
+
+        best_shot, best_score = None, float('-inf')
+        for shot, score in results:
+            if shot is not None and (best_shot is None or score > best_score):
+                best_shot, best_score = shot, score
+        best_shot = best_shot if best_shot is not None else (None, None, 0, 0)
+        self.cache.put(self._key, best_shot)
+        return best_shot
+
+    def pending(self):
+        return bool(self._futures) or self._ready is not None
+
+    def cancel(self):
+        for future in self._futures:
+            future.cancel()
+        self._futures = []
+        self._ready = None
+
+    def shutdown(self):
+        self.cancel()
+        self._drop_pool()
+
+    def _drop_pool(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
+
+    def _fallback_shot(self):
+        """Heuristic shot for the current search, worked out synchronously"""
+        snapshot, target_number, pockets = self._search
+        if self._player is None:
+            self._player = AIPlayer(time_budget=0)
+        cue_ball, numbered_balls = restore_table(snapshot)
+        return self._player.calculate_heuristic_shot(cue_ball, numbered_balls[target_number - 1], numbered_balls,
+                                                     pockets, snapshot.ball_radius)
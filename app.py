@@ -1,41 +1,180 @@
 from flask import Flask, request
-from flask_socketio import SocketIO, emit
-from collections import deque
+from flask_socketio import SocketIO, emit, join_room, leave_room
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import math
+import os
+import threading
 import time
 import uuid
+from game_room import GameRoom, resolve_stroke
+import protocol
 
 app = Flask(__name__)
 socketio = SocketIO(app, cors_allowed_origins="*")
 
+# Matchmaking tuning: players are bucketed by rating in steps of
+# RATING_BUCKET, and a waiting player accepts opponents within
+# BASE_TOLERANCE rating points, widening by TOLERANCE_PER_SECOND up to
+# MAX_TOLERANCE the longer they wait
+DEFAULT_RATING = 1000
+DEFAULT_REGION = 'global'
+RATING_BUCKET = 100
+BASE_TOLERANCE = 100
+TOLERANCE_PER_SECOND = 20
+MAX_TOLERANCE = 600
+PAIRING_TICK = 0.5  # Seconds between pairing passes
+
+
 class MatchMaker:
-    def __init__(self):
-        self.waiting_players = deque()
-
-    def add_player(self, player_id):
-        self.waiting_players.append({
-            'id': player_id,
-            'join_time': time.time()
-        })
-
-    def find_match(self, player_id):
-        # Remove current player if they're already in queue
-        self.waiting_players = deque(
-            player for player in self.waiting_players 
-            if player['id'] != player_id
-        )
-        
-        # Add current player to queue
-        self.add_player(player_id)
-
-        # If we have at least 2 players, make a match
-        if len(self.waiting_players) >= 2:
-            player1 = self.waiting_players.popleft()
-            player2 = self.waiting_players.popleft()
-            return player1, player2
-        return None
+    """
+    Players waiting for an opponent, bucketed by region and rating. Joining
+    and cancelling only touch one bucket, an OrderedDict keyed by socket id,
+    and are O(1). pair_waiting() makes all the matches it can in one pass:
+    oldest first within each bucket, then the leftover player of each bucket
+    against neighbouring buckets whose rating is within tolerance. Entries
+    older than max_wait are dropped, in line with the client's own waiting
+    timeout.
+    """
+
+    def __init__(self, max_wait=30):
+        self.max_wait = max_wait
+        self.buckets = {}  # (region, rating bucket) -> OrderedDict of player id -> (join time, rating)
+        self.player_buckets = {}  # player id -> bucket key
+        self.lock = threading.Lock()  # Socket handlers and the pairing tick run on different threads
+
+    def __len__(self):
+        return len(self.player_buckets)
+
+    def add_player(self, player_id, rating=DEFAULT_RATING, region=DEFAULT_REGION, now=None):
+        """Queue a player; re-joining moves them to the back of their bucket"""
+        key = (region, int(rating // RATING_BUCKET))
+        with self.lock:
+            self._remove(player_id)
+            self.buckets.setdefault(key, OrderedDict())[player_id] = (time.time() if now is None else now, rating)
+            self.player_buckets[player_id] = key
+
+    def cancel(self, player_id):
+        """Remove a player from the queue; returns whether they were waiting"""
+        with self.lock:
+            return self._remove(player_id)
+
+    def _remove(self, player_id):
+        key = self.player_buckets.pop(player_id, None)
+        if key is None:
+            return False
+        bucket = self.buckets[key]
+        del bucket[player_id]
+        if not bucket:
+            del self.buckets[key]
+        return True
+
+    def tolerance(self, waited):
+        return min(BASE_TOLERANCE + TOLERANCE_PER_SECOND * waited, MAX_TOLERANCE)
+
+    def pair_waiting(self, now=None):
+        """
+        One pairing pass. Returns a list of matches, each a pair of
+        {'id', 'join_time', 'rating'} dicts with the longer-waiting player first.
+        """
+        now = time.time() if now is None else now
+        deadline = now - self.max_wait
+        matches = []
+        leftovers = {}  # region -> [(rating, player id, join time)]
+
+        with self.lock:
+            for key in list(self.buckets):
+                bucket = self.buckets[key]
+                # Join times only grow towards the back, so expiry stops at the first fresh entry
+                while bucket and next(iter(bucket.values()))[0] < deadline:
+                    player_id, _ = bucket.popitem(last=False)
+                    del self.player_buckets[player_id]
+
+                # Same bucket: always close enough, oldest first
+                while len(bucket) >= 2:
+                    matches.append((self._pop(bucket), self._pop(bucket)))
+                if bucket:
+                    player_id, (join_time, rating) = next(iter(bucket.items()))
+                    leftovers.setdefault(key[0], []).append((rating, player_id, join_time))
+                else:
+                    del self.buckets[key]
+
+            # At most one player per bucket is left; pair neighbours by rating
+            # when either of them has waited long enough to accept the gap
+            for players in leftovers.values():
+                players.sort()
+                index = 0
+                while index < len(players) - 1:
+                    rating, player_id, join_time = players[index]
+                    other_rating, other_id, other_join_time = players[index + 1]
+                    gap = other_rating - rating
+                    if gap <= max(self.tolerance(now - join_time), self.tolerance(now - other_join_time)):
+                        first, second = sorted([(join_time, player_id), (other_join_time, other_id)])
+                        matches.append((self._pop_player(first[1]), self._pop_player(second[1])))
+                        index += 2
+                    else:
+                        index += 1
+        return matches
+
+    def _pop(self, bucket):
+        player_id, (join_time, rating) = bucket.popitem(last=False)
+        del self.player_buckets[player_id]
+        return {'id': player_id, 'join_time': join_time, 'rating': rating}
+
+    def _pop_player(self, player_id):
+        key = self.player_buckets[player_id]
+        join_time, rating = self.buckets[key][player_id]
+        self._remove(player_id)
+        return {'id': player_id, 'join_time': join_time, 'rating': rating}
 
 matchmaker = MatchMaker()
 
+# Authoritative games, by game id and by the socket ids of their players
+rooms = {}
+rooms_by_player = {}
+
+# Strokes are played to rest on worker processes, so a heavy break in one
+# room never holds up the socket handlers or the other rooms. The pool is
+# started by the first shot, not at import, so worker processes that import
+# this module do not each start a pool of their own
+shot_pool = None
+shot_pool_lock = threading.Lock()
+
+
+def get_shot_pool():
+    global shot_pool
+    with shot_pool_lock:
+        if shot_pool is None:
+            shot_pool = ProcessPoolExecutor(max(1, (os.cpu_count() or 2) - 1))
+        return shot_pool
+
+
+def finish_shot(room, stroke, future):
+    """Runs on the pool's callback thread once a stroke has been resolved"""
+    try:
+        result = future.result()
+    except Exception as e:
+        print(f"Shot failed in game {room.room_id}: {e}")
+        with room.lock:
+            room.cancel_stroke()
+        socketio.emit('shot_rejected', {'game_id': room.room_id, 'reason': "Shot could not be played"},
+                      room=room.room_id)
+        return
+    with room.lock:
+        if rooms.get(room.room_id) is not room:
+            return  # Game ended while the shot was being played
+        message = protocol.encode_shot_update(room, room.finish_stroke(stroke, result))
+    socketio.emit('shot_result', message, room=room.room_id)
+
+
+def close_room(room_id):
+    room = rooms.pop(room_id, None)
+    if room:
+        for player_id in room.players:
+            rooms_by_player.pop(player_id, None)
+    return room
+
 @socketio.on('connect')
 def handle_connect():
     print(f"Client connected: {request.sid}")
@@ -43,24 +182,106 @@ def handle_connect():
 @socketio.on('disconnect')
 def handle_disconnect():
     print(f"Client disconnected: {request.sid}")
+    matchmaker.cancel(request.sid)
+    room = rooms_by_player.get(request.sid)
+    if room:
+        close_room(room.room_id)
+        socketio.emit('opponent_left', {'game_id': room.room_id}, room=room.room_id)
+
+def start_game(player1, player2):
+    """Create the room for a match and put both players in it; returns the match_found payload"""
+    game_id = str(uuid.uuid4())
+    room = GameRoom(game_id, [player1['id'], player2['id']])
+    rooms[game_id] = room
+    for player in (player1, player2):
+        rooms_by_player[player['id']] = room
+        join_room(game_id, sid=player['id'], namespace='/')
+    return {
+        'game_id': game_id,
+        'player1_id': player1['id'],
+        'player2_id': player2['id'],
+        'state': protocol.encode_snapshot(room)
+    }
+
+
+def pairing_loop():
+    """Background task: run a pairing pass every PAIRING_TICK and announce the matches together"""
+    while True:
+        socketio.sleep(PAIRING_TICK)
+        try:
+            with app.app_context():
+                games = [start_game(player1, player2) for player1, player2 in matchmaker.pair_waiting()]
+            for game_data in games:
+                socketio.emit('match_found', game_data, room=game_data['player1_id'])
+                socketio.emit('match_found', game_data, room=game_data['player2_id'])
+        except Exception as e:
+            print(f"Pairing pass failed: {e}")
+
+
+pairing_task = None
+pairing_task_lock = threading.Lock()
+
+
+def ensure_pairing_task():
+    global pairing_task
+    with pairing_task_lock:
+        if pairing_task is None:
+            pairing_task = socketio.start_background_task(pairing_loop)
+
 
 @socketio.on('find_game')
-def handle_find_game():
-    match = matchmaker.find_match(request.sid)
-    
-    if match:
-        player1, player2 = match
-        game_id = str(uuid.uuid4())
-        
-        # Send match found event to both players
-        game_data = {
-            'game_id': game_id,
-            'player1_id': player1['id'],
-            'player2_id': player2['id']
-        }
-        
-        socketio.emit('match_found', game_data, room=player1['id'])
-        socketio.emit('match_found', game_data, room=player2['id'])
+def handle_find_game(data=None):
+    # Only queue the player here; matches are made by the pairing tick
+    if request.sid in rooms_by_player:
+        return  # Already seated; queueing again would pull them out of their game
+    data = data if isinstance(data, dict) else {}
+    rating = data.get('rating', DEFAULT_RATING)
+    if isinstance(rating, bool) or not isinstance(rating, (int, float)) or not math.isfinite(rating):
+        rating = DEFAULT_RATING
+    region = data.get('region', DEFAULT_REGION)
+    if not isinstance(region, str):
+        region = DEFAULT_REGION
+    matchmaker.add_player(request.sid, rating, region)
+    ensure_pairing_task()
+
+@socketio.on('shot')
+def handle_shot(data):
+    room = rooms_by_player.get(request.sid)
+    if room is None:
+        emit('shot_rejected', {'reason': "Not in a game"})
+        return
+    with room.lock:
+        try:
+            snapshot, stroke = room.begin_stroke(request.sid, data)
+        except ValueError as e:
+            emit('shot_rejected', {'game_id': room.room_id, 'reason': str(e)})
+            return
+    try:
+        future = get_shot_pool().submit(resolve_stroke, snapshot, *stroke)
+    except Exception as e:
+        # Pool shut down or broken: release the room so the player can try again
+        print(f"Shot failed in game {room.room_id}: {e}")
+        with room.lock:
+            room.cancel_stroke()
+        emit('shot_rejected', {'game_id': room.room_id, 'reason': "Shot could not be played"})
+        return
+    future.add_done_callback(partial(finish_shot, room, stroke))
+
+@socketio.on('sync')
+def handle_sync():
+    room = rooms_by_player.get(request.sid)
+    if room:
+        with room.lock:
+            emit('game_state', protocol.encode_snapshot(room))
+
+@socketio.on('leave_game')
+def handle_leave_game():
+    room = rooms_by_player.get(request.sid)
+    if room:
+        close_room(room.room_id)
+        socketio.emit('opponent_left', {'game_id': room.room_id}, room=room.room_id)
+        for player_id in room.players:
+            leave_room(room.room_id, sid=player_id)
 
 if __name__ == '__main__':
     socketio.run(app, debug=True,host='0.0.0.0',port=3000)
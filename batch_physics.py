@@ -0,0 +1,290 @@
+import numpy as np
+import physics
+from table_geometry import table_geometry
+
+
+class TableBatch:
+    """
+    Structure-of-arrays ball state for one or more independent tables.
+
+    Every per-ball field is a contiguous float64 array of shape (tables, balls),
+    with ball 0 the cue ball and ball i the i ball. step() advances all tables
+    in one vectorized pass using the same rules as BallState.move, so AI and
+    analysis code can roll out thousands of shots at once. Updates are applied
+    phase by phase for the whole table rather than ball by ball, so results
+    track the scalar engine closely but are not bit-identical to it.
+    """
+
+    def __init__(self, tables, balls=10, width=physics.TABLE_WIDTH, table_height=physics.TABLE_HEIGHT,
+                 edge_width=physics.EDGE_WIDTH, pocket_radius=physics.POCKET_RADIUS,
+                 ball_radius=physics.BALL_RADIUS, acceleration=physics.ACCELERATION):
+        shape = (tables, balls)
+        self.x = np.zeros(shape)
+        self.y = np.zeros(shape)
+        self.vx = np.zeros(shape)
+        self.vy = np.zeros(shape)
+        self.rot_x = np.zeros(shape)
+        self.rot_y = np.zeros(shape)
+        self.top_spin = np.zeros(shape)
+        self.side_spin = np.zeros(shape)
+        self.spin_x = np.ones(shape)                 # BallState.spin_direction_x
+        self.spin_y = np.zeros(shape)                # BallState.spin_direction_y
+        self.target_angle = np.full(shape, np.nan)   # BallState.initial_target_angle, nan when unset
+        self.in_game = np.ones(shape, dtype=bool)
+        self.first_hit = np.full(tables, -1)         # First ball the cue ball touched, -1 for none
+
+        self.ball_radius = ball_radius
+        self.acceleration = acceleration
+        self.rotational_acceleration = acceleration * 0.2
+        self.geometry = table_geometry(width, table_height, edge_width, pocket_radius, ball_radius)
+        self.min_x = self.geometry.min_x
+        self.max_x = self.geometry.max_x
+        self.min_y = self.geometry.min_y
+        self.max_y = self.geometry.max_y
+
+        # Same check points and capture radius as BallState.move
+        self.pockets = np.array(self.geometry.pockets)
+        self.capture_radius_sq = self.geometry.capture_radius ** 2
+
+        # Every unordered pair once, lower index acting as the striking ball
+        self.pair_i, self.pair_j = np.triu_indices(balls, k=1)
+
+    @property
+    def tables(self):
+        return self.x.shape[0]
+
+    @property
+    def balls(self):
+        return self.x.shape[1]
+
+    @classmethod
+    def from_engine(cls, engine, tables=1):
+        """Copy the balls of a PhysicsEngine into every table of a new batch"""
+        cue_ball = engine.cue_ball
+        batch = cls(tables, len(engine.balls), cue_ball.width, cue_ball.height, cue_ball.edge_width,
+                    cue_ball.pocket_radius, cue_ball.radius, cue_ball.acceleration)
+        for index, ball in enumerate(engine.balls):
+            batch.x[:, index] = ball.x
+            batch.y[:, index] = ball.y
+            batch.vx[:, index] = ball.speed_x
+            batch.vy[:, index] = ball.speed_y
+            batch.rot_x[:, index] = ball.rotational_speed_x
+            batch.rot_y[:, index] = ball.rotational_speed_y
+            batch.top_spin[:, index] = ball.top_spin
+            batch.side_spin[:, index] = ball.side_spin
+            batch.spin_x[:, index] = ball.spin_direction_x
+            batch.spin_y[:, index] = ball.spin_direction_y
+            batch.target_angle[:, index] = ball.initial_target_angle if ball.has_target_angle else np.nan
+            batch.in_game[:, index] = ball.in_game
+        return batch
+
+    def write_back(self, engine, table=0):
+        """Copy one table of the batch into the balls of a PhysicsEngine"""
+        for index, ball in enumerate(engine.balls):
+            ball.x = float(self.x[table, index])
+            ball.y = float(self.y[table, index])
+            ball.speed_x = float(self.vx[table, index])
+            ball.speed_y = float(self.vy[table, index])
+            ball.rotational_speed_x = float(self.rot_x[table, index])
+            ball.rotational_speed_y = float(self.rot_y[table, index])
+            ball.top_spin = float(self.top_spin[table, index])
+            ball.side_spin = float(self.side_spin[table, index])
+            ball.spin_direction_x = float(self.spin_x[table, index])
+            ball.spin_direction_y = float(self.spin_y[table, index])
+            target_angle = float(self.target_angle[table, index])
+            ball.has_target_angle = not np.isnan(target_angle)
+            if ball.has_target_angle:
+                ball.initial_target_angle = target_angle
+            ball.in_game = bool(self.in_game[table, index])
+
+    def apply_shot(self, angle, power, top_spin=0.0, side_spin=0.0):
+        """Strike the cue ball on every table. Arguments are scalars or arrays of shape (tables,)"""
+        power = np.asarray(power, dtype=float)
+        self.vx[:, 0] = power * np.cos(angle)
+        self.vy[:, 0] = power * np.sin(angle)
+        self.top_spin[:, 0] = np.asarray(top_spin) * power/15
+        self.side_spin[:, 0] = np.asarray(side_spin) * power/35
+        self.first_hit[:] = -1
+
+    def moving(self):
+        """Boolean mask of shape (tables, balls) for in-game balls that are still moving"""
+        return self.in_game & ((self.vx != 0) | (self.vy != 0) | (self.rot_x != 0) | (self.rot_y != 0))
+
+    def are_all_balls_stopped(self):
+        """Boolean array of shape (tables,)"""
+        return ~self.moving().any(axis=1)
+
+    def run_until_stopped(self, max_steps=10000, dt=1.0):
+        """Step dt frames at a time until every table is at rest; returns the number of steps taken"""
+        steps = 0
+        while steps < max_steps and not self.are_all_balls_stopped().all():
+            self.step(dt)
+            steps += 1
+        return steps
+
+    def step(self, dt=1.0):
+        """Advance every ball on every table by dt frames, as PhysicsEngine.step(dt) does"""
+        self._apply_spin_effects(dt)
+        self._apply_friction(dt)
+
+        active = self.in_game.copy()
+        self.x += np.where(active, (self.vx + self.rot_x) * dt, 0.0)
+        self.y += np.where(active, (self.vy + self.rot_y) * dt, 0.0)
+
+        self._resolve_collisions()
+        self._capture_pocketed(active)
+        self._rebound_cushions(active)
+
+    def _apply_spin_effects(self, dt):
+        speed = np.hypot(self.vx, self.vy)
+        moving = self.in_game & (speed > 0)
+
+        # Top/back spin turns into rotational velocity along the initial direction
+        start_roll = moving & (self.top_spin != 0) & (self.rot_x == 0) & (self.rot_y == 0)
+        if start_roll.any():
+            safe_speed = np.where(moving, speed, 1.0)
+            magnitude = np.abs(self.top_spin) * 3 * np.sign(self.top_spin)
+            self.spin_x = np.where(start_roll, self.vx / safe_speed, self.spin_x)
+            self.spin_y = np.where(start_roll, self.vy / safe_speed, self.spin_y)
+            self.rot_x = np.where(start_roll, magnitude * self.spin_x, self.rot_x)
+            self.rot_y = np.where(start_roll, magnitude * self.spin_y, self.rot_y)
+            self.top_spin = np.where(start_roll, 0.0, self.top_spin)
+
+        # Side spin deflects the ball once, then curves it back towards the target line
+        swerving = moving & (self.side_spin != 0)
+        self.target_angle = np.where(self.in_game & ~swerving, np.nan, self.target_angle)
+        if swerving.any():
+            deflection = np.arcsin(np.clip(self.side_spin, -1.0, 1.0))
+            angle = np.arctan2(self.vy, self.vx)
+            first = swerving & np.isnan(self.target_angle)
+            self.target_angle = np.where(first, angle, self.target_angle)
+            new_angle = np.where(first, angle - deflection, angle + 0.05 * deflection * dt)
+            self.vx = np.where(swerving, speed * np.cos(new_angle), self.vx)
+            self.vy = np.where(swerving, speed * np.sin(new_angle), self.vy)
+
+    def _apply_friction(self, dt):
+        # Sliding friction: decelerate along the direction of travel, never past zero
+        speed = np.hypot(self.vx, self.vy)
+        safe_speed = np.where(speed > 0, speed, 1.0)
+        acceleration = self.acceleration * dt
+        self.vx = np.sign(self.vx) * np.maximum(np.abs(self.vx) - acceleration * np.abs(self.vx) / safe_speed, 0.0)
+        self.vy = np.sign(self.vy) * np.maximum(np.abs(self.vy) - acceleration * np.abs(self.vy) / safe_speed, 0.0)
+
+        # Rotational friction uses the direction the spin was applied in
+        rolling = (self.rot_x != 0) | (self.rot_y != 0)
+        rot_acc_x = np.where(rolling, self.rotational_acceleration * np.abs(self.spin_x) * dt, 0.0)
+        rot_acc_y = np.where(rolling, self.rotational_acceleration * np.abs(self.spin_y) * dt, 0.0)
+        self.rot_x = np.sign(self.rot_x) * np.maximum(np.abs(self.rot_x) - rot_acc_x, 0.0)
+        self.rot_y = np.sign(self.rot_y) * np.maximum(np.abs(self.rot_y) - rot_acc_y, 0.0)
+
+    def _resolve_collisions(self):
+        i, j = self.pair_i, self.pair_j
+        contact = 2 * self.ball_radius
+        dx = self.x[:, j] - self.x[:, i]
+        dy = self.y[:, j] - self.y[:, i]
+        # As in PhysicsEngine.candidate_pairs, a pair where both balls are at
+        # rest is skipped, so a freshly racked table is never nudged apart
+        moving = self.moving()
+        candidate = self.in_game[:, i] & self.in_game[:, j] & (moving[:, i] | moving[:, j])
+        touching = (dx * dx + dy * dy <= contact * contact) & candidate
+
+        # Resolve touching pairs one at a time so chained contacts see updated velocities
+        for pair in np.flatnonzero(touching.any(axis=0)):
+            self._collide_pair(i[pair], j[pair], candidate[:, pair])
+
+    def _collide_pair(self, a, b, candidate):
+        dx = self.x[:, b] - self.x[:, a]
+        dy = self.y[:, b] - self.y[:, a]
+        distance = np.hypot(dx, dy)
+        hit = (distance <= 2 * self.ball_radius) & candidate
+        if not hit.any():
+            return
+
+        safe_distance = np.where(distance > 0, distance, 1.0)
+        nx = np.where(distance > 0, dx / safe_distance, 1.0)
+        ny = np.where(distance > 0, dy / safe_distance, 0.0)
+
+        if a == 0:
+            # Cue ball contact: record the first hit and hand over part of the spin
+            self.first_hit = np.where(hit & (self.first_hit < 0), b, self.first_hit)
+            self.top_spin[:, b] = np.where(hit, self.top_spin[:, 0] * 0.3, self.top_spin[:, b])
+            self.side_spin[:, b] = np.where(hit, self.side_spin[:, 0] * 0.3, self.side_spin[:, b])
+            self.top_spin[:, 0] = np.where(hit, self.top_spin[:, 0] * 0.7, self.top_spin[:, 0])
+            self.side_spin[:, 0] = np.where(hit, self.side_spin[:, 0] * 0.7, self.side_spin[:, 0])
+
+        # Equal masses: exchange the velocity components along the collision normal
+        v1_parallel = self.vx[:, a] * nx + self.vy[:, a] * ny
+        v2_parallel = self.vx[:, b] * nx + self.vy[:, b] * ny
+        exchange = v2_parallel - v1_parallel
+        v1x = self.vx[:, a] + exchange * nx
+        v1y = self.vy[:, a] + exchange * ny
+        v2x = self.vx[:, b] - exchange * nx
+        v2y = self.vy[:, b] - exchange * ny
+
+        # Side spin throws the striking ball off its outgoing line
+        side = self.side_spin[:, a]
+        throw = side * 0.2
+        cos_t, sin_t = np.cos(throw), np.sin(throw)
+        thrown = side != 0
+        v1x, v1y = (np.where(thrown, v1x * cos_t - v1y * sin_t, v1x),
+                    np.where(thrown, v1x * sin_t + v1y * cos_t, v1y))
+
+        self.vx[:, a] = np.where(hit, v1x, self.vx[:, a])
+        self.vy[:, a] = np.where(hit, v1y, self.vy[:, a])
+        self.vx[:, b] = np.where(hit, v2x, self.vx[:, b])
+        self.vy[:, b] = np.where(hit, v2y, self.vy[:, b])
+
+        # Transfer some spin to the other ball, then damp the striker's
+        self.top_spin[:, b] += np.where(hit, self.top_spin[:, a] * 0.3, 0.0)
+        self.side_spin[:, b] += np.where(hit, self.side_spin[:, a] * 0.3, 0.0)
+        self.top_spin[:, a] = np.where(hit, self.top_spin[:, a] * 0.7, self.top_spin[:, a])
+        self.side_spin[:, a] = np.where(hit, self.side_spin[:, a] * 0.7, self.side_spin[:, a])
+
+        # Separate balls to prevent sticking
+        overlap = np.where(hit, 2 * self.ball_radius - distance + 0.01, 0.0)
+        self.x[:, a] -= overlap/2 * nx
+        self.y[:, a] -= overlap/2 * ny
+        self.x[:, b] += overlap/2 * nx
+        self.y[:, b] += overlap/2 * ny
+
+    def _capture_pocketed(self, active):
+        dx = self.x[..., None] - self.pockets[:, 0]
+        dy = self.y[..., None] - self.pockets[:, 1]
+        pocketed = ((dx * dx + dy * dy) <= self.capture_radius_sq).any(axis=-1)
+        self.in_game &= ~(active & pocketed)
+
+    def _rebound_cushions(self, active):
+        spinning = self.side_spin != 0
+
+        left = active & (self.x < self.min_x)
+        right = active & ~left & (self.x > self.max_x)
+        side_x = left | right
+        if side_x.any():
+            self.x = np.where(left, self.min_x, np.where(right, self.max_x, self.x))
+            self.vx = np.where(side_x, -self.vx, self.vx)
+            english = self.side_spin * 3 * np.abs(self.vx)
+            self.vy = np.where(left & spinning, self.vy - english, self.vy)
+            self.vy = np.where(right & spinning, self.vy + english, self.vy)
+            self.side_spin = np.where(side_x, self.side_spin * 0.3, self.side_spin)
+            self.rot_x = np.where(side_x, -self.rot_x, self.rot_x)
+            self.spin_x = np.where(side_x, -self.spin_x, self.spin_x)
+
+        spinning = self.side_spin != 0
+        top = active & (self.y < self.min_y)
+        bottom = active & ~top & (self.y > self.max_y)
+        side_y = top | bottom
+        if side_y.any():
+            self.y = np.where(top, self.min_y, np.where(bottom, self.max_y, self.y))
+            self.vy = np.where(side_y, -self.vy, self.vy)
+            english = self.side_spin * 3 * np.abs(self.vy)
+            self.vx = np.where(top & spinning, self.vx + english, self.vx)
+            self.vx = np.where(bottom & spinning, self.vx - english, self.vx)
+            self.side_spin = np.where(side_y, self.side_spin * 0.3, self.side_spin)
+            self.rot_y = np.where(side_y, -self.rot_y, self.rot_y)
+            self.spin_y = np.where(side_y, -self.spin_y, self.spin_y)
+
+        # Cushion contact absorbs part of the rotational energy
+        on_cushion = active & ((self.x <= self.min_x) | (self.x >= self.max_x) |
+                               (self.y <= self.min_y) | (self.y >= self.max_y))
+        self.rot_x = np.where(on_cushion, self.rot_x * 0.8, self.rot_x)
+        self.rot_y = np.where(on_cushion, self.rot_y * 0.8, self.rot_y)
@@ -0,0 +1,355 @@
+"""
+Benchmarks for the physics, AI and rendering hot paths.
+
+Every scenario starts from a fixed seed, so two runs on the same build play
+exactly the same shots and only the timings differ. Each timing is the best
+of --repeat runs. Results are written as JSON for tracking across releases:
+
+    python benchmark.py --output results.json
+    python benchmark.py --scenario break --scenario cluster --repeat 5
+"""
+import argparse
+import contextlib
+import json
+import math
+import os
+import platform
+import random
+import sys
+import time
+
+# Frames are drawn off-screen; must be set before pygame opens a display
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+from physics import apply_shot, create_table
+from ai_player import AIPlayer, best_placement
+from rules import settle_shot
+from shot_resolver import resolve_shot
+from event_physics import ContinuousPhysicsEngine
+
+# Bumped when a scenario changes, so results of different versions are not compared
+FORMAT_VERSION = 1
+DEFAULT_SEED = 9
+DEFAULT_REPEATS = 5
+DEFAULT_OUTPUT = 'benchmark.json'
+
+BREAK_POWER = 20
+CLUSTER_SHOTS = 8
+RUN_OUT_SHOTS = 40  # Shot limit for the run-out
+RUN_OUT_DISTANCE = 60  # Cue ball to target ball when placing for a run-out shot
+PLACEMENT_LAYOUTS = 10
+FRAMES = 300
+MAX_STEPS = 20000  # Per shot, in case a shot never comes to rest
+
+
+def _best_of(repeats, run):
+    """Run run() repeats times; returns (fastest time in seconds, result of the last run)"""
+    best = float('inf')
+    result = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = run()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def _rate(count, seconds):
+    return count / seconds if seconds > 0 else 0.0
+
+
+def _break_table(seed):
+    """Fresh rack from setup_rack with the cue ball on the head string"""
+    engine = create_table(rng=random.Random(seed))
+    geometry = engine.cue_ball.geometry
+    engine.cue_ball.x, engine.cue_ball.y = geometry.kitchen_x, geometry.height / 2
+    return engine
+
+
+def _cluster_table():
+    """All nine balls packed in a 3x3 block, just apart, in the middle of the table"""
+    engine = create_table(rng=random.Random(0))
+    geometry = engine.cue_ball.geometry
+    spacing = 2 * geometry.ball_radius + 0.05
+    for index, ball in enumerate(engine.numbered_balls):
+        ball.x = geometry.width / 2 + (index % 3 - 1) * spacing
+        ball.y = geometry.height / 2 + (index // 3 - 1) * spacing
+    engine.cue_ball.x, engine.cue_ball.y = geometry.kitchen_x, geometry.height / 2
+    return engine
+
+
+def _aim(cue_ball, ball):
+    return math.atan2(ball.y - cue_ball.y, ball.x - cue_ball.x)
+
+
+def _play_strokes(make_table, strokes):
+    """Play each stroke on a fresh table with the fixed-step engine; returns the total steps"""
+    steps = 0
+    for angle, power in strokes:
+        engine = make_table()
+        apply_shot(engine.cue_ball, angle, power)
+        engine.wake()
+        steps += engine.run_until_stopped(MAX_STEPS)
+    return steps
+
+
+def _resolve_strokes(make_table, strokes):
+    for angle, power in strokes:
+        engine = make_table()
+        resolve_shot(ContinuousPhysicsEngine(engine.cue_ball, engine.numbered_balls), angle, power)
+
+
+def _stroke_metrics(make_table, strokes, repeats):
+    step_time, steps = _best_of(repeats, lambda: _play_strokes(make_table, strokes))
+    # Table setup is included in both timings; it is small next to a shot
+    resolve_time, _ = _best_of(repeats, lambda: _resolve_strokes(make_table, strokes))
+    return {
+        'shots': len(strokes),
+        'steps': steps,
+        'steps_per_second': _rate(steps, step_time),
+        'fixed_step_shots_per_second': _rate(len(strokes), step_time),
+        'event_driven_shots_per_second': _rate(len(strokes), resolve_time),
+    }
+
+
+def bench_break(seed, repeats):
+    """The break shot on the rack from setup_rack, at full power into the 1 ball"""
+    table = _break_table(seed)
+    angle = _aim(table.cue_ball, table.numbered_balls[0])
+    return _stroke_metrics(lambda: _break_table(seed), [(angle, BREAK_POWER)], repeats)
+
+
+def bench_cluster(seed, repeats):
+    """Hard shots into a tight block of balls, where every step has many contacts"""
+    rng = random.Random(seed)
+    table = _cluster_table()
+    centre = _aim(table.cue_ball, table.numbered_balls[4])
+    strokes = [(centre + rng.uniform(-0.05, 0.05), rng.uniform(12, BREAK_POWER)) for _ in range(CLUSTER_SHOTS)]
+    return _stroke_metrics(_cluster_table, strokes, repeats)
+
+
+def _place_for_pot(cue_ball, target_ball, numbered_balls):
+    """Put the cue ball on the line from the nearest open pocket through the target, behind it"""
+    geometry = cue_ball.geometry
+    target_x, target_y = target_ball.x, target_ball.y
+    pockets = sorted(range(len(geometry.pockets)),
+                     key=lambda index: math.dist(geometry.pockets[index], (target_x, target_y)))
+    for index in pockets:
+        pocket_x, pocket_y = geometry.pockets[index]
+        approach = math.atan2(pocket_y - target_y, pocket_x - target_x)
+        if not geometry.accepts(index, approach):
+            continue
+        x = target_x - RUN_OUT_DISTANCE * math.cos(approach)
+        y = target_y - RUN_OUT_DISTANCE * math.sin(approach)
+        if not (geometry.min_x <= x <= geometry.max_x and geometry.min_y <= y <= geometry.max_y):
+            continue
+        if all(math.hypot(x - ball.x, y - ball.y) >= cue_ball.radius + ball.radius
+               for ball in numbered_balls if ball.in_game):
+            cue_ball.x, cue_ball.y = x, y
+            return
+
+
+def _run_out(seed):
+    """
+    One player runs the rack with ball in hand on every shot: the cue ball is
+    set behind the target ball and the heuristic AI picks the stroke, played
+    on the fixed-step engine until the 9 drops or RUN_OUT_SHOTS are taken.
+    Returns (AI seconds, physics seconds, shots, steps, balls pocketed,
+    whether the rack was cleared).
+    """
+    random.seed(seed)  # find_random_valid_position draws from the module rng
+    rng = random.Random(seed)
+    engine = _break_table(seed)
+    cue_ball, numbered_balls = engine.cue_ball, engine.numbered_balls
+    geometry = cue_ball.geometry
+    ai_player = AIPlayer(time_budget=0)
+    target = 1
+    ai_time = physics_time = 0.0
+    steps = shots = pocketed = 0
+    game_over = False
+
+    while shots < RUN_OUT_SHOTS:
+        target_ball = numbered_balls[target - 1]
+        _place_for_pot(cue_ball, target_ball, numbered_balls)
+        start = time.perf_counter()
+        shot = ai_player.calculate_shot(cue_ball, target_ball, numbered_balls, list(geometry.pockets),
+                                        geometry.ball_radius)
+        ai_time += time.perf_counter() - start
+        if shot is None or shot[0] is None:
+            shot = _aim(cue_ball, target_ball), 10, 0, 0
+        angle, power, top_spin, side_spin = shot
+
+        for ball in engine.balls:
+            ball.collision_order.clear()
+        on_table = sum(ball.in_game for ball in numbered_balls)
+        start = time.perf_counter()
+        apply_shot(cue_ball, angle, power, top_spin, side_spin)
+        engine.wake()
+        steps += engine.run_until_stopped(MAX_STEPS)
+        physics_time += time.perf_counter() - start
+        shots += 1
+
+        first_hit = cue_ball.collision_order[0].number if cue_ball.collision_order else None
+        pocketed += on_table - sum(ball.in_game for ball in numbered_balls)
+        _, game_over, target = settle_shot(cue_ball, numbered_balls, target, first_hit, rng)
+        if game_over:
+            break
+    return ai_time, physics_time, shots, steps, pocketed, game_over
+
+
+def bench_run_out(seed, repeats):
+    """A full rack played shot after shot: AI decisions plus physics to rest"""
+    runs = [_run_out(seed) for _ in range(repeats)]
+    _, _, shots, steps, pocketed, cleared = runs[-1]
+    ai_time = min(run[0] for run in runs)
+    physics_time = min(run[1] for run in runs)
+    return {
+        'shots': shots,
+        'steps': steps,
+        'balls_pocketed': pocketed,
+        'cleared': cleared,
+        'steps_per_second': _rate(steps, physics_time),
+        'shots_per_second': _rate(shots, physics_time),
+        'ai_decisions_per_second': _rate(shots, ai_time),
+    }
+
+
+def _game(seed):
+    """A practice Game on the dummy display, or None when pygame is missing"""
+    try:
+        import pygame
+    except ImportError:
+        return None
+    from game import Game
+    pygame.init()
+    return Game(dirty_rects=False, rack_seed=seed)
+
+
+def bench_ball_in_hand(seed, repeats):
+    """AI cue ball placement on broken racks, with the placement cache cleared each time"""
+    game = _game(seed)
+    if game is None:
+        return {'skipped': "pygame is not installed"}
+    layouts = []
+    for index in range(PLACEMENT_LAYOUTS):
+        table = _break_table(seed + index)
+        apply_shot(table.cue_ball, _aim(table.cue_ball, table.numbered_balls[0]), BREAK_POWER)
+        table.wake()
+        table.run_until_stopped(MAX_STEPS)
+        layouts.append([(ball.x, ball.y, ball.in_game) for ball in table.numbered_balls])
+    ai_player = AIPlayer(time_budget=0)
+
+    def place_all():
+        random.seed(seed)
+        placements = []
+        for layout in layouts:
+            for ball, (x, y, in_game) in zip(game.numbered_balls, layout):
+                ball.x, ball.y, ball.in_game = x, y, in_game
+            game.current_target_ball = next((ball.number for ball in game.numbered_balls if ball.in_game), 9)
+            ai_player.cache.clear()
+            placements.append(ai_player.find_legal_cue_ball_position(game, False))
+        return placements
+
+    seconds, _ = _best_of(repeats, place_all)
+    return {
+        'placements': len(layouts),
+        'vectorized': best_placement is not None,
+        'placements_per_second': _rate(len(layouts), seconds),
+    }
+
+
+def bench_frames(seed, repeats):
+    """Full redraws of a practice game while the break plays out, physics included"""
+    game = _game(seed)
+    if game is None:
+        return {'skipped': "pygame is not installed"}
+    import pygame
+
+    def play():
+        game.rack_rng = random.Random(seed)
+        for ball in [game.cue_ball] + game.numbered_balls:
+            ball.reset()
+        game.setup_rack()
+        geometry = game.geometry
+        game.cue_ball.x, game.cue_ball.y = geometry.kitchen_x, geometry.height / 2
+        game.take_shot(_aim(game.cue_ball, game.numbered_balls[0]), BREAK_POWER)
+        balls = [game.cue_ball] + game.numbered_balls
+        frame_times = []
+        for _ in range(FRAMES):
+            start = time.perf_counter()
+            game.accumulator += 1.0 / game.FRAME_RATE
+            game.advance_physics()
+            game.draw_pool_table()
+            for ball in balls:
+                ball.draw(game.screen, game.alpha)
+            game.draw_portal()
+            pygame.display.flip()
+            frame_times.append(time.perf_counter() - start)
+        return sorted(frame_times)
+
+    runs = [play() for _ in range(repeats)]
+    frame_times = min(runs, key=sum)
+    return {
+        'frames': FRAMES,
+        'physics_rate': game.PHYSICS_RATE,
+        'mean_frame_ms': 1000 * sum(frame_times) / len(frame_times),
+        'p95_frame_ms': 1000 * frame_times[int(0.95 * (len(frame_times) - 1))],
+        'max_frame_ms': 1000 * frame_times[-1],
+    }
+
+
+SCENARIOS = {
+    'break': bench_break,
+    'cluster': bench_cluster,
+    'run_out': bench_run_out,
+    'ball_in_hand': bench_ball_in_hand,
+    'frames': bench_frames,
+}
+
+
+def run(scenarios=None, seed=DEFAULT_SEED, repeats=DEFAULT_REPEATS):
+    """Run the named scenarios (all by default); returns the results document"""
+    results = {}
+    # The game and AI print progress; keep stdout for the results
+    with contextlib.redirect_stdout(sys.stderr):
+        for name in scenarios or SCENARIOS:
+            start = time.perf_counter()
+            results[name] = SCENARIOS[name](seed, repeats)
+            results[name]['wall_seconds'] = time.perf_counter() - start
+    return {
+        'format_version': FORMAT_VERSION,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'seed': seed,
+        'repeats': repeats,
+        'results': results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the physics, AI and rendering hot paths")
+    parser.add_argument('--output', '-o', default=DEFAULT_OUTPUT, help="JSON file to write ('-' for stdout)")
+    parser.add_argument('--scenario', '-s', action='append', choices=sorted(SCENARIOS),
+                        help="Scenario to run; repeat for several (default: all)")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEATS, help="Runs per timing; the best is kept")
+    args = parser.parse_args(argv)
+
+    document = run(args.scenario, args.seed, max(1, args.repeat))
+    text = json.dumps(document, indent=2, sort_keys=True)
+    if args.output == '-':
+        print(text)
+    else:
+        with open(args.output, 'w') as file:
+            file.write(text + '\n')
+        for name, metrics in document['results'].items():
+            summary = ', '.join(f"{key} {value:.1f}" if isinstance(value, float) else f"{key} {value}"
+                                for key, value in metrics.items())
+            print(f"{name}: {summary}", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,65 @@
+import pygame
+
+
+class DirtyRenderer:
+    """
+    Tracks which parts of the screen changed between frames so only those
+    regions are pushed to the display.
+
+    Each frame the game describes every element that can change with
+    track(name, signature, rects) before drawing anything: a value that
+    differs whenever the element looks different, and the screen areas it
+    covers. If nothing differs from the last presented frame, needs_redraw()
+    is False and the frame can be skipped entirely. Otherwise the game draws
+    the scene as usual and present() updates only the old and new areas of
+    the elements that changed.
+    """
+
+    def __init__(self):
+        self.presented = 0  # Frames sent to the display
+        self.skipped = 0    # Frames where nothing changed
+        self._previous = {}  # name -> (signature, rects) of the last presented frame
+        self._current = {}
+        self._full = True
+
+    def invalidate(self):
+        """Present the whole screen next frame, e.g. after the window was exposed"""
+        self._full = True
+
+    def begin_frame(self):
+        self._current = {}
+
+    def track(self, name, signature, rects=()):
+        """Record the state an element will be drawn in this frame and the areas it covers"""
+        self._current[name] = (signature, [pygame.Rect(rect) for rect in rects])
+
+    def needs_redraw(self):
+        return self._full or self._current != self._previous
+
+    def dirty_rects(self):
+        rects = []
+        for name in self._current.keys() | self._previous.keys():
+            old = self._previous.get(name, (None, []))
+            new = self._current.get(name, (None, []))
+            if old != new:
+                rects.extend(old[1])
+                rects.extend(new[1])
+        return [rect for rect in rects if rect.width > 0 and rect.height > 0]
+
+    def present(self):
+        """Push this frame's changes to the display; returns the rectangles updated, or None for a full flip"""
+        if self._full:
+            pygame.display.flip()
+            rects = None
+        else:
+            rects = self.dirty_rects()
+            if rects:
+                pygame.display.update(rects)
+        self._previous = self._current
+        self._full = False
+        self.presented += 1
+        return rects
+
+    def skip(self):
+        """Count a frame that was not drawn because nothing changed"""
+        self.skipped += 1
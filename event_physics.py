@@ -0,0 +1,526 @@
+import heapq
+import itertools
+import math
+from collections import namedtuple
+from physics import PhysicsEngine
+
+# A logged event. kind is "collision" (other is the second ball's number),
+# "cushion" (other is "left", "right", "top" or "bottom"), "pocket" (other is
+# the pocket index) or "rest" (other is None).
+Event = namedtuple('Event', 'time kind ball other')
+
+# Times closer than this, in frames, count as the same frame boundary
+TIME_TOLERANCE = 1e-10
+
+# Contact times are polished until they are known to this many frames; at the
+# fastest shot speeds that is well under a thousandth of a pixel
+ROOT_TOLERANCE = 1e-6
+
+# Distance a ball is pushed past a cushion so BallState.check_cushions sees the
+# contact with its strict comparisons
+CUSHION_EPSILON = 1e-9
+
+# Contacts that are already touching only count if they approach faster than
+# this; slower relative motion is rounding noise from an earlier contact
+APPROACH_TOLERANCE = 1e-6
+
+# Cap on events processed by one call, guarding against degenerate contact chains
+MAX_EVENTS = 100000
+
+# Horizon used when a trajectory never changes on its own (zero friction)
+MAX_HORIZON = 1e6
+
+
+def _evaluate(coeffs, t):
+    value = 0.0
+    for coeff in coeffs:
+        value = value * t + coeff
+    return value
+
+
+def _derivative(coeffs):
+    degree = len(coeffs) - 1
+    return [coeff * (degree - index) for index, coeff in enumerate(coeffs[:-1])]
+
+
+def _trim(coeffs):
+    index = 0
+    while index < len(coeffs) - 1 and abs(coeffs[index]) < 1e-15:
+        index += 1
+    return coeffs[index:]
+
+
+def _quadratic_root(coeffs, lo, hi):
+    """Root of a linear or quadratic polynomial inside [lo, hi], or None if rounding put it outside"""
+    if len(coeffs) == 2:
+        roots = (-coeffs[1] / coeffs[0],)
+    else:
+        a, b, c = coeffs
+        discriminant = b * b - 4 * a * c
+        if discriminant < 0:
+            return None
+        # Numerically stable form: never subtract two numbers of the same sign
+        q = -0.5 * (b + math.copysign(math.sqrt(discriminant), b))
+        roots = (q / a, c / q) if q != 0 else (-b / (2 * a),)
+    for root in roots:
+        if lo <= root <= hi:
+            return root
+    return None
+
+
+def _polish(coeffs, derivative, lo, hi, lo_positive, tolerance):
+    """
+    Root of a polynomial that changes sign once on [lo, hi]. Newton steps are
+    kept inside the bracket, falling back to bisection when a step leaves it,
+    and every step moves at least half the tolerance so the bracket closes.
+    Returns the end of the final bracket past the sign change.
+    """
+    t = (lo + hi) / 2
+    while hi - lo > tolerance:
+        value = _evaluate(coeffs, t)
+        if value == 0:
+            return t
+        if (value > 0) == lo_positive:
+            lo = t
+        else:
+            hi = t
+        slope = _evaluate(derivative, t)
+        step = t - value / slope if slope != 0 else None
+        if step is None or not lo < step < hi:
+            step = (lo + hi) / 2
+        elif abs(step - t) < tolerance / 2:
+            step = min(max(t + math.copysign(tolerance / 2, step - t), lo), hi)
+        t = step
+    return hi
+
+
+def _crossings(coeffs, lo, hi, tolerance=ROOT_TOLERANCE):
+    """
+    Sign changes of a polynomial (coefficients highest power first) on [lo, hi],
+    yielded in order as (time, rising) tuples. The interval is split at the
+    turning points, found by recursing on the derivative, and the root on each
+    monotonic piece is taken from the quadratic formula up to degree 2 and
+    polished with _polish above that, to within tolerance. Turning points are
+    polished to TIME_TOLERANCE, since a grazing contact can dip below zero
+    for less than ROOT_TOLERANCE. Callers that stop at the first crossing
+    they need skip the work for the later ones.
+    """
+    coeffs = _trim(coeffs)
+    degree = len(coeffs) - 1
+    if degree < 1:
+        return
+
+    derivative = _derivative(coeffs)
+    if degree == 1:
+        turning = ()
+    elif degree == 2:
+        vertex = -coeffs[1] / (2 * coeffs[0])
+        turning = (vertex,) if lo < vertex < hi else ()
+    else:
+        turning = (t for t, _ in _crossings(derivative, lo, hi, TIME_TOLERANCE))
+
+    left = lo
+    left_positive = _evaluate(coeffs, lo) > 0
+    for right in itertools.chain(turning, (hi,)):
+        right_positive = _evaluate(coeffs, right) > 0
+        if left_positive != right_positive:
+            root = _quadratic_root(coeffs, left, right) if degree <= 2 else None
+            if root is None:
+                root = _polish(coeffs, derivative, left, right, left_positive, tolerance)
+            yield root, right_positive
+        left, left_positive = right, right_positive
+
+
+def _first_entry(coeffs, horizon):
+    """Earliest time in [0, horizon] where the polynomial drops from positive to zero or below"""
+    if coeffs[-1] <= 0 and coeffs[-2] < -APPROACH_TOLERANCE:
+        return 0.0
+    for t, rising in _crossings(coeffs, 0.0, horizon):
+        if not rising:
+            return t
+    return None
+
+
+def _first_quadratic_entry(a, b, c, horizon):
+    """
+    _first_entry for a*t^2 + b*t + c, straight from the quadratic formula. The
+    polynomial falls through zero at its smaller root when it opens upwards
+    and at its larger root when it opens downwards.
+    """
+    if c <= 0 and b < -APPROACH_TOLERANCE:
+        return 0.0
+    if abs(a) < 1e-15:
+        root = -c / b if b < 0 and c > 0 else None
+    else:
+        discriminant = b * b - 4 * a * c
+        if discriminant <= 0:
+            return None
+        q = -0.5 * (b + math.copysign(math.sqrt(discriminant), b))
+        first, second = sorted((q / a, c / q)) if q != 0 else (-b / (2 * a),) * 2
+        if a > 0:
+            root = first if c > 0 else None
+        else:
+            root = second
+    if root is None or not 0 < root <= horizon:
+        return None
+    return root
+
+
+class ContinuousPhysicsEngine(PhysicsEngine):
+    """
+    Event-driven engine. Between events every ball decelerates at a constant
+    rate along its sliding and rolling directions, so its path is a quadratic
+    in time. The engine solves for the exact time of the next ball-ball,
+    ball-cushion or ball-pocket contact, or of a ball coming to rest, and
+    jumps straight to it instead of advancing a frame at a time. Fast balls
+    cannot tunnel through each other and contacts need no separation push.
+
+    Time is measured in frames, so step() still advances one frame and the
+    engine can replace PhysicsEngine in the game loop. The event queue is
+    kept from one step to the next and only rebuilt after wake(), so a step
+    costs nothing beyond the events it reaches. run_until_stopped() resolves
+    a whole shot in one pass. Balls curving under side spin change
+    direction every frame, so their segments end at each frame boundary.
+    """
+
+    def __init__(self, cue_ball, numbered_balls):
+        super().__init__(cue_ball, numbered_balls)
+        self.time = 0.0
+        self.events = []
+        self._queue = []
+        self._sequence = 0
+        self._versions = [0] * len(self.balls)
+        # Finite while a ball is moving, so _predict can keep _moving counted
+        self._path_end = [math.inf] * len(self.balls)
+
+    def wake(self):
+        """Recount the moving balls and predict every event again before the next step"""
+        super().wake()
+        self._stale = True
+
+    def step(self, dt=1.0):
+        """Advance every ball by dt frames, resolving contacts at their exact times"""
+        self.advance(dt)
+
+    def advance(self, duration):
+        end = self.time + duration
+        if self._stale:
+            self._rebuild()
+        self._process(end)
+        self._advance_balls(end - self.time)
+        self.time = end
+
+    def run_until_stopped(self, max_events=MAX_EVENTS):
+        """Jump from event to event until every ball is at rest; returns the number of events"""
+        self._rebuild()
+        return self._process(math.inf, max_events)
+
+    def _process(self, end, max_events=MAX_EVENTS):
+        processed = 0
+        while self._queue and processed < max_events:
+            t, _, kind, first, second, first_version, second_version = self._queue[0]
+            if t > end:
+                break
+            heapq.heappop(self._queue)
+            if self._versions[first] != first_version:
+                continue
+            if second_version is not None and self._versions[second] != second_version:
+                continue
+
+            self._advance_balls(t - self.time)
+            self.time = t
+            changed = self._resolve(kind, first, second)
+            processed += 1
+            for index in changed:
+                self._versions[index] += 1
+            self._predict(changed)
+        return processed
+
+    def _rebuild(self):
+        """Start spin effects for moving balls and predict every event from scratch"""
+        self._queue = []
+        for ball in self.balls:
+            self._kick(ball)
+        self._versions = [version + 1 for version in self._versions]
+        self._path_end = [math.inf] * len(self.balls)
+        self._moving = 0
+        self._predict(range(len(self.balls)))
+        self._stale = False
+
+    def _kick(self, ball):
+        if ball.in_game:
+            ball.convert_top_spin()
+            ball.apply_side_spin(curve=False)
+
+    def _push(self, t, kind, first, second=None):
+        """Queue a predicted event. second is a ball index for collisions, otherwise a detail for the log"""
+        second_version = self._versions[second] if kind == 'collision' else None
+        self._sequence += 1
+        heapq.heappush(self._queue, (t, self._sequence, kind, first, second, self._versions[first], second_version))
+
+    def _kinematics(self, ball):
+        """Velocity, acceleration and segment length of a ball's current quadratic path"""
+        vel_x = ball.speed_x + ball.rotational_speed_x
+        vel_y = ball.speed_y + ball.rotational_speed_y
+        acc_x = acc_y = 0.0
+        segment = math.inf
+
+        speed = math.hypot(ball.speed_x, ball.speed_y)
+        if speed > 0 and ball.sliding_acceleration > 0:
+            acc_x -= ball.sliding_acceleration * ball.speed_x / speed
+            acc_y -= ball.sliding_acceleration * ball.speed_y / speed
+            segment = speed / ball.sliding_acceleration
+            if ball.side_spin != 0 and ball.has_target_angle:
+                # Side spin curves the path once per frame
+                segment = min(segment, math.floor(self.time + TIME_TOLERANCE) + 1 - self.time)
+
+        rotation = math.hypot(ball.rotational_speed_x, ball.rotational_speed_y)
+        if rotation > 0 and ball.rotational_acceleration > 0:
+            acc_x -= ball.rotational_acceleration * ball.rotational_speed_x / rotation
+            acc_y -= ball.rotational_acceleration * ball.rotational_speed_y / rotation
+            segment = min(segment, rotation / ball.rotational_acceleration)
+
+        return vel_x, vel_y, acc_x, acc_y, segment
+
+    def _predict(self, indices):
+        balls = self.balls
+        changed = set(indices)
+        paths = {}  # Ball index -> _kinematics, which stays fixed until the next event
+
+        def path_of(index):
+            path = paths.get(index)
+            if path is None:
+                path = paths[index] = self._kinematics(balls[index])
+            return path
+
+        for index in changed:
+            ball = balls[index]
+            was_moving = self._path_end[index] < math.inf
+            if not ball.in_game or not ball.is_moving():
+                self._path_end[index] = math.inf
+                self._moving -= was_moving
+                continue
+            self._moving += not was_moving
+            path = path_of(index)
+            segment = path[4]
+            if segment < math.inf:
+                self._push(self.time + segment, 'segment', index)
+            # The path ends at the first cushion contact too, so pockets and
+            # other balls only need checking up to there
+            horizon = self._predict_cushions(index, ball, path, min(segment, MAX_HORIZON))
+            self._path_end[index] = self.time + horizon
+            self._predict_pockets(index, ball, path, horizon)
+
+        for index in changed:
+            ball = balls[index]
+            if not ball.in_game:
+                continue
+            for other_index, other_ball in enumerate(balls):
+                if other_index == index or not other_ball.in_game:
+                    continue
+                if other_index in changed and other_index < index:
+                    continue  # Pair already predicted from the other side
+                if not ball.is_moving() and not other_ball.is_moving():
+                    continue  # Both at rest
+                horizon = min(self._path_end[index], self._path_end[other_index], self.time + MAX_HORIZON) - self.time
+                if horizon <= 0:
+                    continue
+                t = _pair_contact_time(ball, other_ball, path_of(index), path_of(other_index), horizon)
+                if t is not None:
+                    if ball.number < other_ball.number:
+                        self._push(self.time + t, 'collision', index, other_index)
+                    else:
+                        self._push(self.time + t, 'collision', other_index, index)
+
+    def _predict_cushions(self, index, ball, path, horizon):
+        """Queue the first contact with each cushion; returns the earliest, or horizon if none"""
+        vel_x, vel_y, acc_x, acc_y, _ = path
+        geometry = ball.geometry
+        bounds = (
+            ('left', 0.5 * acc_x, vel_x, ball.x - geometry.min_x),
+            ('right', -0.5 * acc_x, -vel_x, geometry.max_x - ball.x),
+            ('top', 0.5 * acc_y, vel_y, ball.y - geometry.min_y),
+            ('bottom', -0.5 * acc_y, -vel_y, geometry.max_y - ball.y),
+        )
+        earliest = horizon
+        for cushion, a, b, c in bounds:
+            t = _first_quadratic_entry(a, b, c, horizon)
+            if t is not None:
+                self._push(self.time + t, 'cushion', index, cushion)
+                earliest = min(earliest, t)
+        return earliest
+
+    def _predict_pockets(self, index, ball, path, horizon):
+        vel_x, vel_y, acc_x, acc_y, _ = path
+        capture_radius = ball.geometry.capture_radius
+        for pocket, (pocket_x, pocket_y) in enumerate(ball.geometry.pockets):
+            if ball.check_pocket(pocket_x, pocket_y, capture_radius):
+                self._push(self.time, 'pocket', index, pocket)
+                continue
+            t = _quadratic_path_contact(ball.x - pocket_x, ball.y - pocket_y, vel_x, vel_y,
+                                        acc_x, acc_y, capture_radius, horizon)
+            if t is not None:
+                self._push(self.time + t, 'pocket', index, pocket)
+
+    def _advance_balls(self, dt):
+        if dt <= 0:
+            return
+        for ball in self.balls:
+            if ball.in_game:
+                _advance_ball(ball, dt)
+
+    def _resolve(self, kind, first, second):
+        """Apply an event at the current time; returns the indices of balls whose path changed"""
+        balls = self.balls
+        ball = balls[first]
+
+        if kind == 'collision':
+            other_ball = balls[second]
+            dx, dy = other_ball.x - ball.x, other_ball.y - ball.y
+            distance = math.hypot(dx, dy)
+            normal_x, normal_y = (dx / distance, dy / distance) if distance > 0 else (1.0, 0.0)
+            ball.resolve_collision(other_ball, normal_x, normal_y)
+            _hand_over_rolling(ball, other_ball, normal_x, normal_y)
+            self._kick(ball)
+            self._kick(other_ball)
+            self._log('collision', ball, other_ball.number)
+            return (first, second)
+
+        if kind == 'pocket':
+            ball.in_game = False
+            self._log('pocket', ball, second)
+            return (first,)
+
+        if kind == 'cushion':
+            # The fixed-step engine tests pockets before clamping to the cushion,
+            # so a ball one frame past the cushion near a pocket still drops
+            x, y = ball.x, ball.y
+            ball.x += ball.speed_x + ball.rotational_speed_x
+            ball.y += ball.speed_y + ball.rotational_speed_y
+            ball.check_pockets()
+            ball.x, ball.y = x, y
+            if not ball.in_game:
+                self._log('pocket', ball, None)
+                return (first,)
+
+            geometry = ball.geometry
+            if second == 'left':
+                ball.x = min(ball.x, geometry.min_x - CUSHION_EPSILON)
+            elif second == 'right':
+                ball.x = max(ball.x, geometry.max_x + CUSHION_EPSILON)
+            elif second == 'top':
+                ball.y = min(ball.y, geometry.min_y - CUSHION_EPSILON)
+            else:
+                ball.y = max(ball.y, geometry.max_y + CUSHION_EPSILON)
+            ball.check_cushions()
+            self._kick(ball)
+            self._log('cushion', ball, second)
+            return (first,)
+
+        # End of a quadratic segment: a component stopped, or side spin curves the path
+        if ball.side_spin != 0 and ball.has_target_angle and \
+                abs(self.time - round(self.time)) < TIME_TOLERANCE:
+            ball.apply_spin_effects()
+        else:
+            self._kick(ball)
+        if not ball.is_moving():
+            self._log('rest', ball, None)
+        return (first,)
+
+    def _log(self, kind, ball, other):
+        self.events.append(Event(self.time, kind, ball.number, other))
+
+
+def _pair_contact_time(ball, other_ball, path, other_path, horizon):
+    """First time two balls on the given _kinematics paths touch, or None within horizon"""
+    vel_x, vel_y, acc_x, acc_y, _ = path
+    other_vel_x, other_vel_y, other_acc_x, other_acc_y, _ = other_path
+    rel_vel_x, rel_vel_y = other_vel_x - vel_x, other_vel_y - vel_y
+    rel_acc_x, rel_acc_y = other_acc_x - acc_x, other_acc_y - acc_y
+    return _quadratic_path_contact(other_ball.x - ball.x, other_ball.y - ball.y, rel_vel_x, rel_vel_y,
+                                   rel_acc_x, rel_acc_y, ball.radius + other_ball.radius, horizon)
+
+
+def _quadratic_path_contact(offset_x, offset_y, vel_x, vel_y, acc_x, acc_y, radius, horizon):
+    """
+    First time a point moving as offset + vel*t + acc*t^2/2 comes within radius of
+    the origin, or None if that does not happen within horizon.
+    """
+    # Up to horizon the path strays at most |acc|*horizon^2/8 from the chord
+    # between its ends, so a chord that clears the radius by more than that
+    # rules out contact without solving the quartic
+    if horizon < MAX_HORIZON:
+        end_x = offset_x + (vel_x + 0.5 * acc_x * horizon) * horizon
+        end_y = offset_y + (vel_y + 0.5 * acc_y * horizon) * horizon
+        chord_x, chord_y = end_x - offset_x, end_y - offset_y
+        length_sq = chord_x * chord_x + chord_y * chord_y
+        along = -(offset_x * chord_x + offset_y * chord_y) / length_sq if length_sq > 0 else 0.0
+        along = min(max(along, 0.0), 1.0)
+        clearance = math.hypot(offset_x + along * chord_x, offset_y + along * chord_y) - radius
+        if clearance > math.hypot(acc_x, acc_y) * horizon * horizon / 8:
+            return None
+    half_x, half_y = 0.5 * acc_x, 0.5 * acc_y
+    coeffs = [
+        half_x * half_x + half_y * half_y,
+        2 * (half_x * vel_x + half_y * vel_y),
+        vel_x * vel_x + vel_y * vel_y + 2 * (half_x * offset_x + half_y * offset_y),
+        2 * (vel_x * offset_x + vel_y * offset_y),
+        offset_x * offset_x + offset_y * offset_y - radius * radius,
+    ]
+    return _first_entry(coeffs, horizon)
+
+
+def _hand_over_rolling(ball, other_ball, normal_x, normal_y):
+    """
+    resolve_collision only exchanges sliding velocity, so a ball rolling into
+    the other can still be closing after the contact. The fixed-step engine
+    then pushes the pair apart every frame; here the rolling component along
+    the contact normal is handed to the other ball as sliding velocity instead.
+    """
+    closing = ((ball.speed_x + ball.rotational_speed_x - other_ball.speed_x - other_ball.rotational_speed_x) * normal_x +
+               (ball.speed_y + ball.rotational_speed_y - other_ball.speed_y - other_ball.rotational_speed_y) * normal_y)
+    if closing <= 0:
+        return
+
+    rolling_in = ball.rotational_speed_x * normal_x + ball.rotational_speed_y * normal_y
+    if rolling_in > 0:
+        ball.rotational_speed_x -= rolling_in * normal_x
+        ball.rotational_speed_y -= rolling_in * normal_y
+        other_ball.speed_x += rolling_in * normal_x
+        other_ball.speed_y += rolling_in * normal_y
+
+    other_rolling_in = other_ball.rotational_speed_x * normal_x + other_ball.rotational_speed_y * normal_y
+    if other_rolling_in < 0:
+        other_ball.rotational_speed_x -= other_rolling_in * normal_x
+        other_ball.rotational_speed_y -= other_rolling_in * normal_y
+        ball.speed_x += other_rolling_in * normal_x
+        ball.speed_y += other_rolling_in * normal_y
+
+
+def _advance_ball(ball, dt):
+    """Move a ball along its current path, decelerating each velocity component to rest"""
+    speed = math.hypot(ball.speed_x, ball.speed_y)
+    if speed > 0:
+        travel = dt if ball.sliding_acceleration <= 0 else min(dt, speed / ball.sliding_acceleration)
+        remaining = speed - ball.sliding_acceleration * travel
+        distance = speed * travel - 0.5 * ball.sliding_acceleration * travel * travel
+        ball.x += ball.speed_x / speed * distance
+        ball.y += ball.speed_y / speed * distance
+        if remaining <= TIME_TOLERANCE:
+            ball.speed_x = ball.speed_y = 0.0
+        else:
+            ball.speed_x *= remaining / speed
+            ball.speed_y *= remaining / speed
+
+    rotation = math.hypot(ball.rotational_speed_x, ball.rotational_speed_y)
+    if rotation > 0:
+        travel = dt if ball.rotational_acceleration <= 0 else min(dt, rotation / ball.rotational_acceleration)
+        remaining = rotation - ball.rotational_acceleration * travel
+        distance = rotation * travel - 0.5 * ball.rotational_acceleration * travel * travel
+        ball.x += ball.rotational_speed_x / rotation * distance
+        ball.y += ball.rotational_speed_y / rotation * distance
+        if remaining <= TIME_TOLERANCE:
+            ball.rotational_speed_x = ball.rotational_speed_y = 0.0
+        else:
+            ball.rotational_speed_x *= remaining / rotation
+            ball.rotational_speed_y *= remaining / rotation
@@ -1,13 +1,27 @@
 import pygame
-import random
 import math
+import random
 from ball import Ball
 from stick import Stick
 from portal import Portal
 from ai_player import AIPlayer
+from ai_worker import AISearch
+from dirty_renderer import DirtyRenderer
+from sprite_cache import text_cache
+from profiler import Profiler
+import physics
+from table_geometry import table_geometry
+from physics import PhysicsEngine, apply_shot
+from event_physics import ContinuousPhysicsEngine
+from replay import Replay
+from rules import settle_shot
+
+# Longest frame time fed to the physics, so a stall doesn't queue up a burst of steps
+MAX_FRAME_TIME = 0.25
 
 class Game:
-    def __init__(self, mode="practice"):
+    def __init__(self, mode="practice", continuous_physics=False, dirty_rects=True,
+                 physics_rate=240, frame_rate=60, rack_seed=None, replay_path=None, profiler=None):
         # Constants
         self.WIDTH, self.TABLE_HEIGHT = 800, 400
         self.HEIGHT = 600
@@ -16,8 +30,16 @@ class Game:
         self.DIAMOND_SIZE = 5
         self.BALL_RADIUS = 8
         self.FRICTION_COEFFICIENT = 0.99
+        # Physics advances in fixed steps at PHYSICS_RATE whatever the display
+        # manages; FRAME_RATE caps rendering (0 for uncapped)
+        self.PHYSICS_RATE = physics_rate
+        self.FRAME_RATE = frame_rate
+        self.MAX_STEPS_PER_FRAME = max(1, physics_rate // 15)
         self.offset = self.POCKET_RADIUS / math.sqrt(2)
         self.buffer_HEIGHT = self.POCKET_RADIUS
+        # Pockets, cushions, spots and diamonds, shared with the physics and AI
+        self.geometry = table_geometry(self.WIDTH, self.TABLE_HEIGHT, self.EDGE_WIDTH,
+                                       self.POCKET_RADIUS, self.BALL_RADIUS)
 
         self.portal = Portal(self.WIDTH, self.HEIGHT, self.TABLE_HEIGHT)
 
@@ -59,36 +81,119 @@ class Game:
         self.player2_score = 0
 
         self.mode = mode
-        self.ai_player = AIPlayer() if mode == "ai" else None
+        self.ai_player = AIPlayer(physics_rate=physics_rate) if mode == "ai" else None
+        # Shot search runs on worker processes so the frame loop never waits for it;
+        # both plan on the same physics steps the game runs
+        self.ai_search = AISearch(physics_rate=physics_rate) if mode == "ai" else None
         self.ai_thinking_timer = 0
         self.ai_shot_phase = "thinking" 
         self.break_shot_taken = False
 
-        self.pockets = [
-            (self.EDGE_WIDTH + self.offset, self.EDGE_WIDTH + self.offset),  # Top left
-            (self.WIDTH/2, self.EDGE_WIDTH),                                 # Top middle
-            (self.WIDTH - self.EDGE_WIDTH - self.offset, self.EDGE_WIDTH + self.offset),  # Top right
-            (self.EDGE_WIDTH + self.offset, self.TABLE_HEIGHT - self.EDGE_WIDTH - self.offset),  # Bottom left
-            (self.WIDTH/2, self.TABLE_HEIGHT - self.EDGE_WIDTH),                          # Bottom middle
-            (self.WIDTH - self.EDGE_WIDTH - self.offset, self.TABLE_HEIGHT - self.EDGE_WIDTH - self.offset)  # Bottom right
-        ]
+        self.pockets = list(self.geometry.pockets)
 
         # Initialize pygame and create screen
         pygame.init()
         self.screen = pygame.display.set_mode((self.WIDTH, self.HEIGHT))
         self.font = pygame.font.Font(None, 36)
+        self.table_surface = None  # Pre-rendered static table layer, built on first draw
+        self.table_surface_key = None
+        # Only changed regions are presented, and frames where nothing changed are skipped
+        self.renderer = DirtyRenderer() if dirty_rects else None
+        # Per-phase frame timings; F3 shows them over the table
+        self.profiler = profiler or Profiler.from_environment()
         resized_screen = pygame.transform.scale(self.screen, (1920,1080)) 
         self.screen.blit(resized_screen, (0, 0))
 
+        # Every rack is shuffled from this seed, so together with the recorded
+        # shots it reproduces the whole session
+        self.rack_seed = random.getrandbits(32) if rack_seed is None else rack_seed
+        self.rack_rng = random.Random(self.rack_seed)
+        self.replay = Replay(self.rack_seed, physics_rate, continuous_physics)
+        self.replay_path = replay_path
+
         # Create game objects
         self.create_balls()
+        # The event-driven engine resolves contacts at their exact times, so
+        # full-power shots cannot tunnel through balls or pocket check points
+        engine = ContinuousPhysicsEngine if continuous_physics else PhysicsEngine
+        self.physics = engine(self.cue_ball, self.numbered_balls)
         self.stick = Stick()
         self.setup_rack()
 
+        self.clock = pygame.time.Clock()
+        self.accumulator = 0.0  # Real time not yet simulated, in seconds
+        self.alpha = 1.0  # How far the display is between the last two physics steps
+
 
     def add_message(self, message):
         self.portal.add_message(message)
 
+    def advance_physics(self):
+        """Run as many fixed physics steps as the time accumulated since the last frame covers"""
+        step_time = 1.0 / self.PHYSICS_RATE
+        step_frames = physics.SIMULATION_RATE / self.PHYSICS_RATE
+        balls = [self.cue_ball] + self.numbered_balls
+        steps = 0
+        while self.accumulator >= step_time and steps < self.MAX_STEPS_PER_FRAME:
+            for ball in balls:
+                ball.previous_x, ball.previous_y = ball.x, ball.y
+            self.physics.step(step_frames)
+            self.accumulator -= step_time
+            steps += 1
+
+        # Under load, drop the time we could not catch up on: the game slows
+        # down instead of falling further behind every frame
+        if steps == self.MAX_STEPS_PER_FRAME:
+            self.accumulator = min(self.accumulator, step_time)
+        self.alpha = self.accumulator / step_time
+        return steps
+
+    def track_scene(self, mouse_pos):
+        """Describe everything that can change on screen this frame to the dirty-rect renderer"""
+        renderer = self.renderer
+        for ball in [self.cue_ball] + self.numbered_balls:
+            x, y = ball.draw_position(self.alpha)
+            center = (int(x), int(y))
+            rect = (center[0] - ball.radius - 1, center[1] - ball.radius - 1, ball.radius * 2 + 3, ball.radius * 2 + 3)
+            renderer.track(('ball', ball.number), (center, ball.in_game, ball.number_angle, ball.is_moving()),
+                           [rect] if ball.in_game else [])
+
+        portal = self.portal
+        portal_state = (self.player1_score, self.player2_score, self.current_player, tuple(portal.messages),
+                        portal.current_spin, tuple(ball.in_game for ball in self.numbered_balls))
+        renderer.track('portal', portal_state, [(0, self.TABLE_HEIGHT, self.WIDTH, self.HEIGHT - self.TABLE_HEIGHT)])
+
+        # Same conditions as the drawing code in run()
+        stick_state = None
+        stick_rects = []
+        if self.cue_ball.speed_x == 0 and self.cue_ball.speed_y == 0 and not self.resetting_cue_ball and \
+                self.cue_ball.in_game and self.are_all_balls_stopped([self.cue_ball] + self.numbered_balls):
+            angle = math.atan2(mouse_pos[1] - self.cue_ball.y, mouse_pos[0] - self.cue_ball.x)
+            stick_state = (int(self.cue_ball.x), int(self.cue_ball.y), angle, self.stick.current_pullback,
+                           self.stick.striking, self.stick.strike_position, self.stick.power)
+            stick_rects = self.stick.bounds(self.cue_ball, angle, portal)
+        renderer.track('stick', stick_state, stick_rects)
+
+        ghost_state = None
+        if self.resetting_cue_ball:
+            mouse_x, mouse_y = pygame.mouse.get_pos()
+            if self.is_valid_cue_position(mouse_x, mouse_y, self.cue_ball, self.numbered_balls, self.is_initial_placement):
+                ghost_state = (mouse_x, mouse_y)
+        radius = self.cue_ball.radius
+        renderer.track('ghost', ghost_state,
+                       [(ghost_state[0] - radius, ghost_state[1] - radius, radius * 2, radius * 2)] if ghost_state else [])
+
+        renderer.track('foul', self.foul, [(self.WIDTH - 100, 10, 100, 30)] if self.foul else [])
+
+        cursor_rects = []
+        if mouse_pos[1] < self.TABLE_HEIGHT:
+            size = self.BALL_RADIUS + 2
+            cursor_rects.append((int(mouse_pos[0]) - size, int(mouse_pos[1]) - size, size * 2 + 1, size * 2 + 1))
+        renderer.track('cursor', (tuple(mouse_pos), self.resetting_cue_ball), cursor_rects)
+
+        overlay_rect = self.profiler.overlay_rect()
+        renderer.track('profiler', self.profiler.overlay_version, [overlay_rect] if overlay_rect else [])
+
     def draw_portal(self):
         self.portal.draw(self.screen, self.player1_score, self.player2_score, 
              self.current_player, self.numbered_balls)
@@ -117,14 +222,24 @@ class Game:
 
     # Function to draw the pool table
     def draw_pool_table(self):
+      # The table never changes, so it is drawn once and blitted every frame.
+      # It is redrawn only if the geometry or screen size changes.
+      key = (self.geometry, self.screen.get_size())
+      if self.table_surface is None or self.table_surface_key != key:
+          self.table_surface = pygame.Surface(self.screen.get_size()).convert()
+          self.render_table(self.table_surface)
+          self.table_surface_key = key
+      self.screen.blit(self.table_surface, (0, 0))
+
+    def render_table(self, surface):
       # Draw the self.BLUE surface
-      self.screen.fill(self.BLUE)
+      surface.fill(self.BLUE)
 
       # Draw the edges
-      pygame.draw.rect(self.screen, self.BROWN, (0, 0, self.WIDTH, self.EDGE_WIDTH))
-      pygame.draw.rect(self.screen, self.BROWN, (0, self.TABLE_HEIGHT-self.EDGE_WIDTH, self.WIDTH, self.EDGE_WIDTH))
-      pygame.draw.rect(self.screen, self.BROWN, (0, 0, self.EDGE_WIDTH, self.TABLE_HEIGHT))
-      pygame.draw.rect(self.screen, self.BROWN, (self.WIDTH-self.EDGE_WIDTH, 0, self.EDGE_WIDTH, self.TABLE_HEIGHT))
+      pygame.draw.rect(surface, self.BROWN, (0, 0, self.WIDTH, self.EDGE_WIDTH))
+      pygame.draw.rect(surface, self.BROWN, (0, self.TABLE_HEIGHT-self.EDGE_WIDTH, self.WIDTH, self.EDGE_WIDTH))
+      pygame.draw.rect(surface, self.BROWN, (0, 0, self.EDGE_WIDTH, self.TABLE_HEIGHT))
+      pygame.draw.rect(surface, self.BROWN, (self.WIDTH-self.EDGE_WIDTH, 0, self.EDGE_WIDTH, self.TABLE_HEIGHT))
 
       # Buffer color (slightly lighter self.BLUE to represent a raised surface)
       BUFFER_COLOR = (0, 0, 220)  # Slightly darker self.BLUE for the buffer border
@@ -139,7 +254,7 @@ class Game:
 
       # Function to draw a diamond
       def draw_diamond(x, y, size, color):
-          pygame.draw.polygon(self.screen, color, [(x, y-size), (x+size, y), (x, y+size), (x-size, y)])
+          pygame.draw.polygon(surface, color, [(x, y-size), (x+size, y), (x, y+size), (x-size, y)])
 
       # Function to draw a buffer
       def draw_buffer(start_x, start_y, length, is_vertical=False, is_top=False):
@@ -155,10 +270,10 @@ class Game:
                       (start_x, start_y + length)  # Bottom left
                   ]
                   # Round corners for the right side
-                  pygame.draw.circle(self.screen, BUFFER_COLOR, 
+                  pygame.draw.circle(surface, BUFFER_COLOR, 
                                    (int(start_x + self.buffer_HEIGHT), int(start_y + self.offset)), 
                                    corner_radius)
-                  pygame.draw.circle(self.screen, BUFFER_COLOR, 
+                  pygame.draw.circle(surface, BUFFER_COLOR, 
                                    (int(start_x + self.buffer_HEIGHT), int(start_y + length - self.offset)), 
                                    corner_radius)
               else:
@@ -169,10 +284,10 @@ class Game:
                       (start_x - self.buffer_HEIGHT, start_y + length - self.offset)  # Bottom left
                   ]
                   # Round corners for the left side
-                  pygame.draw.circle(self.screen, BUFFER_COLOR, 
+                  pygame.draw.circle(surface, BUFFER_COLOR, 
                                    (int(start_x - self.buffer_HEIGHT), int(start_y + self.offset)), 
                                    corner_radius)
-                  pygame.draw.circle(self.screen, BUFFER_COLOR, 
+                  pygame.draw.circle(surface, BUFFER_COLOR, 
                                    (int(start_x - self.buffer_HEIGHT), int(start_y + length - self.offset)), 
                                    corner_radius)
           else:
@@ -184,10 +299,10 @@ class Game:
                       (start_x + length, start_y)  # Top right
                   ]
                   # Round corners for the bottom side
-                  pygame.draw.circle(self.screen, BUFFER_COLOR, 
+                  pygame.draw.circle(surface, BUFFER_COLOR, 
                                    (int(start_x + self.offset), int(start_y + self.buffer_HEIGHT)), 
                                    corner_radius)
-                  pygame.draw.circle(self.screen, BUFFER_COLOR, 
+                  pygame.draw.circle(surface, BUFFER_COLOR, 
                                    (int(start_x + length - self.offset), int(start_y + self.buffer_HEIGHT)), 
                                    corner_radius)
               else:
@@ -198,14 +313,14 @@ class Game:
                       (start_x + length - self.offset, start_y - self.buffer_HEIGHT)  # Top right
                   ]
                   # Round corners for the top side
-                  pygame.draw.circle(self.screen, BUFFER_COLOR, 
+                  pygame.draw.circle(surface, BUFFER_COLOR, 
                                    (int(start_x + self.offset), int(start_y - self.buffer_HEIGHT)), 
                                    corner_radius)
-                  pygame.draw.circle(self.screen, BUFFER_COLOR, 
+                  pygame.draw.circle(surface, BUFFER_COLOR, 
                                    (int(start_x + length - self.offset), int(start_y - self.buffer_HEIGHT)), 
                                    corner_radius)
 
-          pygame.draw.polygon(self.screen, BUFFER_COLOR, points)
+          pygame.draw.polygon(surface, BUFFER_COLOR, points)
 
           # Draw the inner part (slightly smaller)
           if is_vertical:
@@ -239,7 +354,7 @@ class Game:
                       (start_x + length - self.offset - 1, start_y - self.buffer_HEIGHT + 1)
                   ]
 
-          pygame.draw.polygon(self.screen, BUFFER_INNER_COLOR, inner_points)
+          pygame.draw.polygon(surface, BUFFER_INNER_COLOR, inner_points)
       # Buffer calls:
       # Draw buffers for top edge
       draw_buffer(self.EDGE_WIDTH + 2*self.offset, self.EDGE_WIDTH, 
@@ -263,60 +378,28 @@ class Game:
 
 
       # Draw the pockets
-      # For each corner pocket, start from inner edge intersection and self.offset the center
-
-      # Top-left corner pocket
-      pygame.draw.circle(self.screen, self.BLACK, 
-                        (self.EDGE_WIDTH + self.offset, self.EDGE_WIDTH + self.offset), 
-                        self.POCKET_RADIUS)
-
-      # Top-right corner pocket
-      pygame.draw.circle(self.screen, self.BLACK, 
-                        (self.WIDTH - self.EDGE_WIDTH - self.offset, self.EDGE_WIDTH + self.offset), 
-                        self.POCKET_RADIUS)
-
-      # Bottom-left corner pocket
-      pygame.draw.circle(self.screen, self.BLACK, 
-                        (self.EDGE_WIDTH + self.offset, self.TABLE_HEIGHT - self.EDGE_WIDTH - self.offset), 
-                        self.POCKET_RADIUS)
-
-      # Bottom-right corner pocket
-      pygame.draw.circle(self.screen, self.BLACK, 
-                        (self.WIDTH - self.EDGE_WIDTH - self.offset, self.TABLE_HEIGHT - self.EDGE_WIDTH - self.offset), 
-                        self.POCKET_RADIUS)
-
-      # Top middle pocket
-      pygame.draw.circle(self.screen, self.BLACK, (self.WIDTH // 2, self.EDGE_WIDTH), self.POCKET_RADIUS)
-
-      # Bottom middle pocket
-      pygame.draw.circle(self.screen, self.BLACK, (self.WIDTH // 2, self.TABLE_HEIGHT - self.EDGE_WIDTH), self.POCKET_RADIUS)
-
+      for pocket in self.geometry.pockets:
+          pygame.draw.circle(surface, self.BLACK, pocket, self.POCKET_RADIUS)
 
       # Draw the diamond spots
-      for i in range(3):
-          draw_diamond(self.EDGE_WIDTH/2 + (self.WIDTH/2 - self.EDGE_WIDTH*2)/4 * (i+1), self.EDGE_WIDTH/2, self.DIAMOND_SIZE, self.WHITE)
-          draw_diamond(self.WIDTH - self.EDGE_WIDTH/2 - (self.WIDTH/2 - self.EDGE_WIDTH*2)/4 * (i+1), self.EDGE_WIDTH/2, self.DIAMOND_SIZE, self.WHITE)
-
-          draw_diamond(self.EDGE_WIDTH/2 + (self.WIDTH/2 - self.EDGE_WIDTH*2)/4 * (i+1), self.TABLE_HEIGHT - self.EDGE_WIDTH/2, self.DIAMOND_SIZE, self.WHITE)
-          draw_diamond(self.WIDTH - self.EDGE_WIDTH/2 - (self.WIDTH/2 - self.EDGE_WIDTH*2)/4 * (i+1), self.TABLE_HEIGHT - self.EDGE_WIDTH/2, self.DIAMOND_SIZE, self.WHITE)
-          draw_diamond(self.EDGE_WIDTH/2, self.EDGE_WIDTH/2 + (self.TABLE_HEIGHT-self.EDGE_WIDTH*2)/4 * (i+1), self.DIAMOND_SIZE, self.WHITE)
-          draw_diamond(self.WIDTH-self.EDGE_WIDTH/2, self.EDGE_WIDTH/2 + (self.TABLE_HEIGHT-self.EDGE_WIDTH*2)/4 * (i+1), self.DIAMOND_SIZE, self.WHITE)
-
+      for x, y in self.geometry.diamonds:
+          draw_diamond(x, y, self.DIAMOND_SIZE, self.WHITE)
 
       # Draw the head string
-      head_string_x = int(self.EDGE_WIDTH + (self.WIDTH-self.EDGE_WIDTH*2-self.POCKET_RADIUS*2)/8 * 2)
-      pygame.draw.line(self.screen, self.WHITE, 
+      head_string_x = int(self.geometry.kitchen_x)
+      pygame.draw.line(surface, self.WHITE, 
                       (head_string_x, self.EDGE_WIDTH + self.buffer_HEIGHT), 
                       (head_string_x, self.TABLE_HEIGHT - self.EDGE_WIDTH - self.buffer_HEIGHT), 2)
 
       # Draw the foot spot
-      pygame.draw.circle(self.screen, self.WHITE, (int(self.WIDTH - self.EDGE_WIDTH - (self.WIDTH-self.EDGE_WIDTH*2-self.POCKET_RADIUS*2)/8 * 2), int(self.TABLE_HEIGHT/2)), self.DIAMOND_SIZE)
+      foot_x, foot_y = self.geometry.foot_spot
+      pygame.draw.circle(surface, self.WHITE, (int(foot_x), int(foot_y)), self.DIAMOND_SIZE)
 
 
     def create_balls(self):
         # Create cue ball
         self.cue_ball = Ball(
-            self.EDGE_WIDTH + (self.WIDTH-self.EDGE_WIDTH*2-self.POCKET_RADIUS*2)/8 * 2,
+            self.geometry.kitchen_x,
             self.EDGE_WIDTH + self.buffer_HEIGHT + self.BALL_RADIUS,
             self.BALL_RADIUS, self.WHITE, self.WIDTH, self.TABLE_HEIGHT,
             self.EDGE_WIDTH, self.POCKET_RADIUS, self.offset,
@@ -338,80 +421,36 @@ class Game:
 
 
     def setup_rack(self):
-      # Position for the apex ball (9 ball)
-      apex_x = self.WIDTH - self.EDGE_WIDTH - (self.WIDTH-self.EDGE_WIDTH*2-self.POCKET_RADIUS*2)/8 * 2
-      apex_y = self.TABLE_HEIGHT/2
-      ball_spacing = self.BALL_RADIUS * 2  # Slightly larger spacing to prevent overlapping
-
-      # Calculate the total self.TABLE_HEIGHT needed for 5 balls
-      total_HEIGHT = ball_spacing * 4  # Space for 5 balls vertically
-      start_y = apex_y - total_HEIGHT/2  # Start from the top
-
-      # Set the 9 ball position (center of the rack)
-      self.numbered_balls[8].x = apex_x  # 9 ball (index 8)
-      self.numbered_balls[8].y = apex_y  # Center position
-
-      # Available balls for random placement (excluding 1 and 9)
-      available_balls = self.numbered_balls[1:8]  # balls 2-8
-      random.shuffle(available_balls)
-
-      # Place two random balls in the same vertical line as 9 ball
-      available_balls[0].x = apex_x
-      available_balls[0].y = apex_y - ball_spacing  # One ball above 9
-      available_balls[1].x = apex_x
-      available_balls[1].y = apex_y + ball_spacing  # One ball below 9
-
-      # Row self.offset for the diamond shape
-      row_offset = ball_spacing * math.sin(math.pi/3)  # 60 degree angle
-
-      # Place two balls on each side (maintaining diamond shape)
-      available_balls[2].x = apex_x - row_offset
-      available_balls[2].y = apex_y - ball_spacing/2
-
-      available_balls[3].x = apex_x - row_offset
-      available_balls[3].y = apex_y + ball_spacing/2
+      physics.setup_rack(self.numbered_balls, self.WIDTH, self.TABLE_HEIGHT,
+                         self.EDGE_WIDTH, self.POCKET_RADIUS, self.BALL_RADIUS, self.rack_rng)
 
-      available_balls[4].x = apex_x + row_offset
-      available_balls[4].y = apex_y - ball_spacing/2
-
-      available_balls[5].x = apex_x + row_offset
-      available_balls[5].y = apex_y + ball_spacing/2
-
-      # Place 1 ball at the back left
-      self.numbered_balls[0].x = apex_x - row_offset * 2  # 1 ball
-      self.numbered_balls[0].y = apex_y  # Same self.TABLE_HEIGHT as 9 ball
-
-      # Place remaining ball at the back right
-      remaining_ball = available_balls[6]
-      remaining_ball.x = apex_x + row_offset * 2
-      remaining_ball.y = apex_y  # Same self.TABLE_HEIGHT as 9 ball
+    def take_shot(self, angle, power, top_spin=0.0, side_spin=0.0):
+        """Strike the cue ball and record the stroke in the replay"""
+        self.replay.record(self.cue_ball, angle, power, top_spin, side_spin, getattr(self.physics, 'time', 0.0))
+        apply_shot(self.cue_ball, angle, power, top_spin, side_spin)
+        self.physics.wake()
 
     # Modify the main game loop to handle all balls
     def are_all_balls_stopped(self,balls):
-      return all(ball.speed_x == 0 and ball.speed_y == 0 and ball.rotational_speed_x==0 and ball.rotational_speed_y==0 for ball in balls if ball.in_game)
+      # The engine keeps count of its moving balls
+      return self.physics.are_all_balls_stopped()
 
 
-    def check_foul(self, cue_ball, numbered_balls):
-        self.foul = False
-
-        if not self.cue_ball.in_game:
-            self.foul = True
+    def report_foul(self, first_hit, cue_ball_pocketed):
+        """Tell the players why the last shot was a foul"""
+        if cue_ball_pocketed:
             self.add_message("Foul: Cue ball pocketed")
-            return
-
-        if not self.cue_ball.collision_order:
-            self.foul = True
+        elif first_hit is None:
             self.add_message("Foul: No ball hit")
-            return
-
-        first_hit = self.cue_ball.collision_order[0]
-        if first_hit.number != self.current_target_ball:
-            self.foul = True
+        else:
             self.add_message(f"Foul: Ball {self.current_target_ball} not hit first")
 
     def handle_game_logic(self, cue_ball, numbered_balls):
-        self.check_foul(cue_ball, numbered_balls)
+        """Apply the 9-ball rules through rules.settle_shot, then update turns and messages"""
+        first_hit = self.cue_ball.collision_order[0].number if self.cue_ball.collision_order else None
+        cue_ball_pocketed = not self.cue_ball.in_game
 
+        # Count before settle_shot, which re-racks after a win
         current_ball_count = sum(ball.in_game for ball in self.numbered_balls)
         any_ball_pocketed = current_ball_count < self.ball_left
         self.ball_left = current_ball_count
@@ -420,17 +459,19 @@ class Game:
         for ball in self.numbered_balls:
             ball.collision_order.clear()
 
+        self.foul, game_over, target = settle_shot(self.cue_ball, self.numbered_balls, self.current_target_ball,
+                                                   first_hit, self.rack_rng)
+
         if self.foul:
+            self.report_foul(first_hit, cue_ball_pocketed)
             self.current_player = 3 - self.current_player
             self.resetting_cue_ball = True
             # The initial placement should only be true if the break shot hasn't been taken
             self.is_initial_placement = not self.break_shot_taken
-            if not self.numbered_balls[8].in_game:
-                self.numbered_balls[8].spot([self.cue_ball] + [b for b in self.numbered_balls if b.in_game])
-        elif not self.numbered_balls[8].in_game:
-            self.game_over = True
+        elif game_over:
             self.add_message(f"Game Over! Player {self.current_player} wins!")
-            self.reset_game(self.cue_ball, self.numbered_balls)
+            # settle_shot has already re-racked the balls
+            self.reset_game_state()
         else:
             if not any_ball_pocketed:
                 self.current_player = 3 - self.current_player
@@ -444,17 +485,15 @@ class Game:
                 self.ai_shot_phase = "thinking"
                 self.ai_thinking_timer = 0
 
-        if not self.numbered_balls[self.current_target_ball - 1].in_game:
-            for i in range(self.current_target_ball, 10):
-                if i == 9 or self.numbered_balls[i - 1].in_game:
-                    self.current_target_ball = i
-                    self.add_message(f"New target ball: {self.current_target_ball}")
-                    break
+        if target != self.current_target_ball and not game_over:
+            self.add_message(f"New target ball: {target}")
+        self.current_target_ball = target
 
-        if not self.cue_ball.in_game:
-            self.cue_ball.reset()
+        # Re-spotted and re-racked balls rejoin the simulation
+        self.physics.wake()
 
-    def reset_game(self, cue_ball, numbered_balls):
+    def reset_game_state(self):
+      """Turn and score state for a new game, leaving the balls alone"""
       self.game_over = False
       self.foul = False
       self.resetting_cue_ball = True
@@ -463,12 +502,6 @@ class Game:
       self.ball_left = 9  # Reset ball count
       self.is_initial_placement = True
 
-      self.cue_ball.reset()
-      for ball in self.numbered_balls:
-          ball.reset()
-
-      self.setup_rack()
-
     def is_valid_cue_position(self, x, y, cue_ball, other_balls, is_initial=False):
       # Basic boundary checks
       if (y < self.EDGE_WIDTH + self.buffer_HEIGHT + self.cue_ball.radius or 
@@ -478,7 +511,7 @@ class Game:
       # For initial placement or breaking shot:
       # Only allow placement in the "kitchen" (behind head string)
       if is_initial:
-          head_string_x = self.EDGE_WIDTH + (self.WIDTH-self.EDGE_WIDTH*2-self.POCKET_RADIUS*2)/8 * 2
+          head_string_x = self.geometry.kitchen_x
           if x > head_string_x or x < self.EDGE_WIDTH + self.buffer_HEIGHT + self.cue_ball.radius:
               return False
       else:
@@ -512,9 +545,12 @@ class Game:
 
         # Get AI shot calculations once
         if self.ai_shot_phase == "thinking":
-            self._calculate_ai_shot()
+            if self.ai_thinking_timer == 0:
+                self._start_ai_search()
+            elif self.ai_search.pending():
+                self._collect_ai_shot()
             self.ai_thinking_timer += 1
-            if self.ai_thinking_timer > 60:
+            if self.ai_thinking_timer > 60 and not self.ai_search.pending():
                 self.ai_shot_phase = "aiming"
                 self.ai_thinking_timer = 0
                 self.stick.visible = True
@@ -551,15 +587,20 @@ class Game:
                 self.ai_thinking_timer = 0
                 self.ai_shot_phase = "thinking"
 
-    def _calculate_ai_shot(self):
-        """Helper method to calculate AI shot parameters"""
+    def _start_ai_search(self):
+        """Send a snapshot of the table to the AI workers, once per turn"""
         target_ball = self.numbered_balls[self.current_target_ball - 1]
-        self.ai_shot_params = self.ai_player.calculate_shot(
-            self.cue_ball, target_ball, self.numbered_balls, 
-            self.pockets, self.BALL_RADIUS
-        )
+        self.ai_shot_params = None
+        self.ai_search.start(self.cue_ball, target_ball, self.numbered_balls, self.pockets)
+
+    def _collect_ai_shot(self):
+        """Pick up the AI shot parameters if the workers have finished"""
+        shot = self.ai_search.poll()
+        if shot is None:
+            return
+        self.ai_shot_params = shot
 
-        if self.ai_shot_params is not None:  # if angle is not None
+        if self.ai_shot_params[0] is not None:  # if angle is not None
             angle = self.ai_shot_params[0]
             distance = 100
             self.ai_mouse_pos = (
@@ -572,64 +613,81 @@ class Game:
     
     def run(self):
         # Main game loop
+        profiler = self.profiler
         while self.running:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    self.running = False
-
-                elif event.type == pygame.MOUSEBUTTONDOWN:
-                    mouse_pos = event.pos
-                    result = self.handle_portal_click(mouse_pos)
-                    if result == "menu":
-                        return "menu"
-
-                    # Only handle mouse clicks for ball placement if it's not AI's turn
-                    if not (self.mode == "ai" and self.current_player == 2):
-                        dx = mouse_pos[0] - self.portal.spin_circle_center[0]
-                        dy = mouse_pos[1] - self.portal.spin_circle_center[1]
-                        if math.sqrt(dx**2 + dy**2) <= self.portal.SPIN_CIRCLE_RADIUS:
-                            self.portal.handle_spin_input(mouse_pos)
-                            continue
-
-                        mouse_x, mouse_y = pygame.mouse.get_pos()
-
-                        if self.resetting_cue_ball:
-                            if self.is_valid_cue_position(mouse_x, mouse_y, self.cue_ball, self.numbered_balls, self.is_initial_placement):
-                                self.cue_ball.x, self.cue_ball.y = mouse_x, mouse_y
-                                self.ball_placement_confirmed = True
-                                if self.is_initial_placement: 
-                                    self.is_initial_placement = False
-
-                        elif self.cue_ball.speed_x == 0 and self.cue_ball.speed_y == 0 and not self.resetting_cue_ball:
-                            if self.cue_ball.in_game:
-                                self.mouse_pressed = True
-                                self.stick.start_charging()
-
-                elif event.type == pygame.MOUSEMOTION:
-                    if pygame.mouse.get_pressed()[0]:
+            with profiler.scope('wait'):
+                self.accumulator += min(self.clock.tick(self.FRAME_RATE) / 1000, MAX_FRAME_TIME)
+
+            with profiler.scope('events'):
+                for event in pygame.event.get():
+                    if event.type == pygame.QUIT:
+                        self.running = False
+
+                    elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                        profiler.toggle_overlay()
+
+                    elif event.type == pygame.VIDEOEXPOSE:
+                        if self.renderer:
+                            self.renderer.invalidate()
+
+                    elif event.type == pygame.MOUSEBUTTONDOWN:
                         mouse_pos = event.pos
-                        dx = mouse_pos[0] - self.portal.spin_circle_center[0]
-                        dy = mouse_pos[1] - self.portal.spin_circle_center[1]
-                        if math.sqrt(dx**2 + dy**2) <= self.portal.SPIN_CIRCLE_RADIUS:
-                            self.portal.handle_spin_input(mouse_pos)
-
-                elif event.type == pygame.MOUSEBUTTONUP:
-                    if self.resetting_cue_ball and self.ball_placement_confirmed:
-                        # Confirm ball placement
-                        self.resetting_cue_ball = False
-                        self.ball_placement_confirmed = False
-                        self.foul = False
-                        self.shot_taken = False
-                        print("Ready to shoot")
-
-                    elif self.mouse_pressed and self.cue_ball.speed_x == 0 and self.cue_ball.speed_y == 0 and not self.resetting_cue_ball:
-                        # Shot release
-                        self.mouse_pressed = False
-                        self.shot_ready = True
+                        result = self.handle_portal_click(mouse_pos)
+                        if result == "menu":
+                            if self.ai_search:
+                                self.ai_search.shutdown()
+                            if self.replay_path:
+                                self.replay.save(self.replay_path)
+                            return "menu"
+
+                        # Only handle mouse clicks for ball placement if it's not AI's turn
+                        if not (self.mode == "ai" and self.current_player == 2):
+                            dx = mouse_pos[0] - self.portal.spin_circle_center[0]
+                            dy = mouse_pos[1] - self.portal.spin_circle_center[1]
+                            if math.sqrt(dx**2 + dy**2) <= self.portal.SPIN_CIRCLE_RADIUS:
+                                self.portal.handle_spin_input(mouse_pos)
+                                continue
+
+                            mouse_x, mouse_y = pygame.mouse.get_pos()
+
+                            if self.resetting_cue_ball:
+                                if self.is_valid_cue_position(mouse_x, mouse_y, self.cue_ball, self.numbered_balls, self.is_initial_placement):
+                                    self.cue_ball.x, self.cue_ball.y = mouse_x, mouse_y
+                                    self.ball_placement_confirmed = True
+                                    if self.is_initial_placement: 
+                                        self.is_initial_placement = False
+
+                            elif self.cue_ball.speed_x == 0 and self.cue_ball.speed_y == 0 and not self.resetting_cue_ball:
+                                if self.cue_ball.in_game:
+                                    self.mouse_pressed = True
+                                    self.stick.start_charging()
+
+                    elif event.type == pygame.MOUSEMOTION:
+                        if pygame.mouse.get_pressed()[0]:
+                            mouse_pos = event.pos
+                            dx = mouse_pos[0] - self.portal.spin_circle_center[0]
+                            dy = mouse_pos[1] - self.portal.spin_circle_center[1]
+                            if math.sqrt(dx**2 + dy**2) <= self.portal.SPIN_CIRCLE_RADIUS:
+                                self.portal.handle_spin_input(mouse_pos)
+
+                    elif event.type == pygame.MOUSEBUTTONUP:
+                        if self.resetting_cue_ball and self.ball_placement_confirmed:
+                            # Confirm ball placement
+                            self.resetting_cue_ball = False
+                            self.ball_placement_confirmed = False
+                            self.foul = False
+                            self.shot_taken = False
+                            print("Ready to shoot")
+
+                        elif self.mouse_pressed and self.cue_ball.speed_x == 0 and self.cue_ball.speed_y == 0 and not self.resetting_cue_ball:
+                            # Shot release
+                            self.mouse_pressed = False
+                            self.shot_ready = True
 
             # Handle AI turn
             if self.mode == "ai" and self.current_player == 2:
-                self.handle_ai_turn()
+                with profiler.scope('ai'):
+                    self.handle_ai_turn()
                 mouse_pos = getattr(self, 'ai_mouse_pos', pygame.mouse.get_pos())
             else:
                 mouse_pos = pygame.mouse.get_pos()
@@ -650,18 +708,12 @@ class Game:
                         if self.ai_shot_params is not None:
                             angle, power, top_spin, side_spin = self.ai_shot_params
                             if angle is not None:
-                                self.cue_ball.speed_x = power * math.cos(angle)
-                                self.cue_ball.speed_y = power * math.sin(angle)
-                                self.cue_ball.top_spin = top_spin * power/15
-                                self.cue_ball.side_spin = side_spin * power/35
+                                self.take_shot(angle, power, top_spin, side_spin)
                 else:
                     # Human player shot code...
                     mouse_x, mouse_y = mouse_pos
                     angle = math.atan2(mouse_y - self.cue_ball.y, mouse_x - self.cue_ball.x)
-                    self.cue_ball.speed_x = self.stick.power * math.cos(angle)
-                    self.cue_ball.speed_y = self.stick.power * math.sin(angle)
-                    self.cue_ball.top_spin = self.portal.current_spin[0]*self.stick.power/15
-                    self.cue_ball.side_spin = self.portal.current_spin[1]*self.stick.power/35
+                    self.take_shot(angle, self.stick.power, *self.portal.current_spin)
 
                 if not self.break_shot_taken:
                     self.break_shot_taken = True
@@ -672,9 +724,8 @@ class Game:
 
 
             # Update all balls
-            self.cue_ball.move(self.numbered_balls)
-            for ball in self.numbered_balls:
-                ball.move([self.cue_ball] + [b for b in self.numbered_balls if b != ball])
+            with profiler.scope('physics'):
+                self.advance_physics()
 
             if self.stick.striking:
                 self.stick.update_strike()
@@ -684,19 +735,26 @@ class Game:
                     angle = math.atan2(mouse_y - self.cue_ball.y, mouse_x - self.cue_ball.x)
 
                     # Apply the shot
-                    self.cue_ball.speed_x = self.stick.power * math.cos(angle)
-                    self.cue_ball.speed_y = self.stick.power * math.sin(angle)
-                    self.cue_ball.top_spin = self.portal.current_spin[0]*self.stick.power/15
-                    self.cue_ball.side_spin = self.portal.current_spin[1]*self.stick.power/35
+                    self.take_shot(angle, self.stick.power, *self.portal.current_spin)
 
                     self.shot_taken = True
 
             # Modify the drawing section:
-            self.draw_pool_table()
-            for ball in self.numbered_balls:
-                ball.draw(self.screen)
-            self.cue_ball.draw(self.screen)
-            self.draw_portal()
+            if self.renderer:
+                with profiler.scope('track'):
+                    self.renderer.begin_frame()
+                    self.track_scene(mouse_pos)
+            redraw = self.renderer is None or self.renderer.needs_redraw()
+
+            if redraw:
+                with profiler.scope('table'):
+                    self.draw_pool_table()
+                with profiler.scope('balls'):
+                    for ball in self.numbered_balls:
+                        ball.draw(self.screen, self.alpha)
+                    self.cue_ball.draw(self.screen, self.alpha)
+                with profiler.scope('portal'):
+                    self.draw_portal()
 
 
             # Modify the game logic handling:
@@ -705,7 +763,7 @@ class Game:
                 self.shot_taken = False
 
             # Ball placement visualization during reset
-            if self.resetting_cue_ball:
+            if redraw and self.resetting_cue_ball:
                 mouse_x, mouse_y = pygame.mouse.get_pos()
                 if self.is_valid_cue_position(mouse_x, mouse_y, self.cue_ball, self.numbered_balls,self.is_initial_placement):
                     temp_surface = pygame.Surface((self.cue_ball.radius*2, self.cue_ball.radius*2), pygame.SRCALPHA)
@@ -718,19 +776,29 @@ class Game:
                     self.stick.visible = True
                     mouse_x, mouse_y = mouse_pos
                     angle = math.atan2(mouse_y - self.cue_ball.y, mouse_x - self.cue_ball.x)
-                    self.stick.draw(self.screen, self.cue_ball, mouse_pos, angle, self.portal)
-
-            # Display current player and self.foul status
-            font = pygame.font.Font(None, 36)
-
-            if self.foul:
-                self.foul_text = font.render("Foul", True, (255, 0, 0))
-                self.screen.blit(self.foul_text, (self.WIDTH - 100, 10))
-
-            self.draw_custom_cursor(self.screen, mouse_pos)
-
-
-            pygame.display.flip()
-            pygame.time.Clock().tick(60)
+                    if redraw:
+                        self.stick.draw(self.screen, self.cue_ball, mouse_pos, angle, self.portal)
+
+            if redraw:
+                # Display current player and self.foul status
+                if self.foul:
+                    self.foul_text = text_cache.render(self.font, "Foul", (255, 0, 0))
+                    self.screen.blit(self.foul_text, (self.WIDTH - 100, 10))
+
+                self.draw_custom_cursor(self.screen, mouse_pos)
+                profiler.draw_overlay(self.screen)
+
+            with profiler.scope('present'):
+                if self.renderer is None:
+                    pygame.display.flip()
+                elif redraw:
+                    self.renderer.present()
+                else:
+                    self.renderer.skip()
+            profiler.end_frame()
 
+        if self.ai_search:
+            self.ai_search.shutdown()
+        if self.replay_path:
+            self.replay.save(self.replay_path)
         pygame.quit()
@@ -0,0 +1,149 @@
+import math
+import random
+import threading
+from collections import namedtuple
+import physics
+from ai_worker import snapshot_table, restore_table
+from event_physics import ContinuousPhysicsEngine
+from rules import settle_shot
+from shot_resolver import resolve_shot
+
+# Stroke limits, matching the stick and spin selector on the client
+MIN_POWER = 5
+MAX_POWER = 20
+
+# What a finished stroke changed, for protocol.encode_shot_update. stroke is
+# (cue x, cue y, angle, power, top_spin, side_spin), changed the numbers of the
+# balls whose resting state differs and events the engine's event log.
+ShotOutcome = namedtuple('ShotOutcome', 'shot player stroke events frames changed foul game_over')
+
+
+def resolve_stroke(snapshot, angle, power, top_spin, side_spin):
+    """
+    Pool entry point: play one stroke on a TableSnapshot to rest with the
+    event-driven engine. Returns (resting balls as (x, y, in_game, top_spin,
+    side_spin) tuples, event log, first ball hit, frames until rest).
+    """
+    cue_ball, numbered_balls = restore_table(snapshot)
+    result = resolve_shot(ContinuousPhysicsEngine(cue_ball, numbered_balls), angle, power, top_spin, side_spin)
+    balls = [(ball.x, ball.y, ball.in_game, ball.top_spin, ball.side_spin) for ball in result.balls]
+    return balls, [tuple(event) for event in result.events], result.first_hit, result.frames
+
+
+class GameRoom:
+    """
+    Authoritative state of one online game. Clients only send stroke inputs;
+    the server plays them on headless physics and broadcasts what changed.
+    Methods are called from the socket handlers and from the shot pool's
+    callback thread, so they are guarded by lock.
+    """
+
+    def __init__(self, room_id, players, seed=None):
+        self.room_id = room_id
+        self.players = list(players)  # Socket ids, player 1 first
+        self.seed = random.getrandbits(32) if seed is None else seed
+        self.rng = random.Random(self.seed)
+        engine = physics.create_table(rng=self.rng)
+        self.cue_ball = engine.cue_ball
+        self.numbered_balls = engine.numbered_balls
+        self.balls = engine.balls
+        self.geometry = self.cue_ball.geometry
+        self.current_player = 1
+        self.target = 1
+        self.scores = [0, 0]
+        self.ball_in_hand = True
+        self.initial_placement = True  # Break: cue ball goes behind the head string
+        self.shot_number = 0
+        self.pending = False  # A stroke is being resolved
+        self.lock = threading.Lock()
+
+    def player_number(self, sid):
+        return self.players.index(sid) + 1 if sid in self.players else None
+
+    def begin_stroke(self, sid, data):
+        """
+        Check a stroke from a client and lock the room for it. Returns the
+        snapshot to resolve it on and the stroke as (angle, power, top_spin,
+        side_spin), or raises ValueError with the reason it was refused.
+        """
+        if self.pending:
+            raise ValueError("A shot is already being played")
+        if self.player_number(sid) != self.current_player:
+            raise ValueError("Not your turn")
+
+        angle = _number(data, 'angle')
+        power = min(max(_number(data, 'power'), MIN_POWER), MAX_POWER)
+        top_spin = min(max(_number(data, 'top_spin', 0.0), -1.0), 1.0)
+        side_spin = min(max(_number(data, 'side_spin', 0.0), -1.0), 1.0)
+
+        if self.ball_in_hand:
+            x, y = _number(data, 'cue_x'), _number(data, 'cue_y')
+            if not self.valid_placement(x, y):
+                raise ValueError("Illegal cue ball position")
+            self.cue_ball.x, self.cue_ball.y = x, y
+
+        self.pending = True
+        return snapshot_table(self.cue_ball, self.numbered_balls), (angle, power, top_spin, side_spin)
+
+    def cancel_stroke(self):
+        self.pending = False
+
+    def finish_stroke(self, stroke, result):
+        """Apply a resolved stroke and the rules; returns the ShotOutcome to broadcast"""
+        balls, events, first_hit, frames = result
+        before = [(ball.x, ball.y, ball.in_game) for ball in self.balls]
+        for ball, (x, y, in_game, top_spin, side_spin) in zip(self.balls, balls):
+            ball.x, ball.y, ball.in_game = x, y, in_game
+            ball.top_spin, ball.side_spin = top_spin, side_spin
+            ball.speed_x = ball.speed_y = 0.0
+
+        left_before = sum(in_game for _, _, in_game in before[1:])
+        pocketed = left_before > sum(ball.in_game for ball in self.numbered_balls)
+        shooter = self.current_player
+        foul, game_over, self.target = settle_shot(self.cue_ball, self.numbered_balls, self.target,
+                                                   first_hit, self.rng)
+
+        # Turn order as in Game.handle_game_logic
+        if foul:
+            self.current_player = 3 - shooter
+            self.ball_in_hand = True
+        elif game_over:
+            self.scores[shooter - 1] += 1
+            self.current_player = 1
+            self.ball_in_hand = True
+        else:
+            if not pocketed:
+                self.current_player = 3 - shooter
+            self.ball_in_hand = False
+        self.initial_placement = game_over
+
+        self.shot_number += 1
+        self.pending = False
+        # Only the balls whose resting state changed, plus the stroke so
+        # clients can animate it themselves
+        changed = [ball.number for ball, old in zip(self.balls, before) if (ball.x, ball.y, ball.in_game) != old]
+        return ShotOutcome(self.shot_number, shooter, (before[0][0], before[0][1]) + tuple(stroke),
+                           events, frames, changed, foul, game_over)
+
+    def valid_placement(self, x, y):
+        """Same checks as Game.is_valid_cue_position"""
+        geometry = self.geometry
+        if not (geometry.min_y <= y <= geometry.max_y and geometry.min_x <= x <= geometry.max_x):
+            return False
+        if self.initial_placement and x > geometry.kitchen_x:
+            return False
+        return all(math.hypot(x - ball.x, y - ball.y) >= self.cue_ball.radius + ball.radius
+                   for ball in self.numbered_balls if ball.in_game)
+
+
+def _number(data, name, default=None):
+    value = data.get(name, default) if isinstance(data, dict) else None
+    if value is None or isinstance(value, bool):
+        raise ValueError("Missing or invalid %s" % name)
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        raise ValueError("Missing or invalid %s" % name)
+    if not math.isfinite(value):
+        raise ValueError("Missing or invalid %s" % name)
+    return value
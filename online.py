@@ -1,44 +1,185 @@
-import socketio
+import os
+import queue
+import random
+import threading
+from collections import deque
 from threading import Event
+import socketio
+import protocol
+
+# Server to connect to; BILLIARDS_SERVER_URL overrides it
+DEFAULT_SERVER_URL = 'https://z3qgq6jj.cdpad.io/'
+
+# Backoff between connection attempts, in seconds, doubling up to the maximum
+RECONNECT_DELAY = 0.5
+RECONNECT_DELAY_MAX = 10
+
+# Sends of one message tried while connected before it is given up on
+MAX_SEND_ATTEMPTS = 5
+
+# Inbound events kept for the game loop; the oldest are dropped beyond this
+MAX_INBOUND_EVENTS = 256
+
+# Server events forwarded to the game loop; binary payloads arrive decoded
+# by protocol.decode
+FORWARDED_EVENTS = ('shot_result', 'shot_rejected', 'game_state', 'opponent_left')
+
 
 class OnlineGameConnection:
-    def __init__(self):
-        self.sio = socketio.Client()
+    """
+    Socket.IO connection run on its own thread, so the pygame loop never
+    waits on the network. connect() returns at once; the network thread
+    keeps trying with exponential backoff and the client reconnects by
+    itself if the link drops. Server events land in a bounded queue that
+    the game loop drains each frame with poll_events(), and outgoing
+    messages are queued for the network thread to send.
+    """
+
+    def __init__(self, url=None):
+        self.url = url or os.environ.get('BILLIARDS_SERVER_URL', DEFAULT_SERVER_URL)
+        self.sio = socketio.Client(reconnection=True, reconnection_delay=RECONNECT_DELAY,
+                                   reconnection_delay_max=RECONNECT_DELAY_MAX)
         self.match_found = Event()
         self.game_data = None
+        self.status = 'idle'  # idle, connecting, connected, reconnecting or closed
+        self.retry_delay = 0  # Seconds until the next attempt while connecting
+        self.searching = False  # Ask for a match again after every (re)connect
+        # deque appends and pops are atomic, so the two threads share it without a lock
+        self.inbound = deque(maxlen=MAX_INBOUND_EVENTS)
+        self.outbound = queue.Queue()
+        self._stop = Event()
+        self._thread = None
         self.setup_events()
 
     def setup_events(self):
         @self.sio.on('connect')
         def on_connect():
             print("Connected to server")
+            self.status = 'connected'
+            if self.searching and not self.match_found.is_set():
+                self.outbound.put(('find_game', None))
+            self.inbound.append(('connected', None))
+
+        @self.sio.on('disconnect')
+        def on_disconnect(*args):
+            if not self._stop.is_set():
+                self.status = 'reconnecting'
+            self.inbound.append(('disconnected', None))
 
         @self.sio.on('match_found')
         def on_match_found(data):
+            if isinstance(data, dict) and isinstance(data.get('state'), (bytes, bytearray)):
+                data = dict(data, state=protocol.decode(data['state']))
             self.game_data = data
+            self.searching = False
             self.match_found.set()
+            self.inbound.append(('match_found', data))
 
         @self.sio.on('connect_error')
-        def on_connect_error():
+        def on_connect_error(*args):
             print("Connection failed!")
 
+        for name in FORWARDED_EVENTS:
+            self.sio.on(name, self._forwarder(name))
+
+    def _forwarder(self, name):
+        def forward(data=None):
+            if isinstance(data, (bytes, bytearray)):
+                try:
+                    data = protocol.decode(data)
+                except ValueError as e:
+                    print(f"Dropped {name}: {e}")
+                    return
+            self.inbound.append((name, data))
+        return forward
+
     def connect(self):
-        try:
-            self.sio.connect('https://z3qgq6jj.cdpad.io/')
-        except Exception as e:
-            print(f"Connection error: {e}")
-            raise
+        """Start connecting in the background; returns immediately"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self.status = 'connecting'
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        delay = RECONNECT_DELAY
+        while not self._stop.is_set():
+            try:
+                self.sio.connect(self.url, wait_timeout=5)
+                if self._stop.is_set():  # Cancelled while connecting
+                    self.sio.disconnect()
+                break
+            except Exception as e:
+                print(f"Connection error: {e}")
+                self.retry_delay = delay
+                self._stop.wait(delay * random.uniform(0.5, 1.0))
+                delay = min(delay * 2, RECONNECT_DELAY_MAX)
+        self.retry_delay = 0
+
+        # Send queued messages in order; the client's own reconnection handles
+        # drops, and a message is only taken off the queue once it is sent
+        pending = None
+        attempts = 0
+        while not self._stop.is_set():
+            if not self.sio.connected:
+                self._stop.wait(0.1)
+                continue
+            if pending is None:
+                try:
+                    pending = self.outbound.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                attempts = 0
+            name, data = pending
+            try:
+                if data is None:
+                    self.sio.emit(name)
+                else:
+                    self.sio.emit(name, data)
+            except Exception as e:
+                attempts += 1
+                if attempts < MAX_SEND_ATTEMPTS:
+                    print(f"Send failed, retrying: {e}")
+                    self._stop.wait(RECONNECT_DELAY)
+                    continue
+                print(f"Dropped {name} after {attempts} failed sends: {e}")
+            pending = None
 
     def disconnect(self):
+        self._stop.set()
+        self.searching = False
+        self.status = 'closed'
         try:
             self.sio.disconnect()
         except:
             pass
         self.match_found.clear()
+        while not self.outbound.empty():
+            self.outbound.get_nowait()
+
+    def send(self, name, data=None):
+        """Queue a message for the server; dropped if the connection is never made"""
+        self.outbound.put((name, data))
 
     def find_match(self):
         self.match_found.clear()
-        self.sio.emit('find_game')
+        self.searching = True
+        if self.sio.connected:
+            self.send('find_game')
+
+    def send_shot(self, angle, power, top_spin=0.0, side_spin=0.0, cue_position=None):
+        shot = {'angle': angle, 'power': power, 'top_spin': top_spin, 'side_spin': side_spin}
+        if cue_position is not None:
+            shot['cue_x'], shot['cue_y'] = cue_position
+        self.send('shot', shot)
+
+    def poll_events(self, limit=None):
+        """Take the server events received since the last call, oldest first, as (name, data) pairs"""
+        events = []
+        while self.inbound and (limit is None or len(events) < limit):
+            events.append(self.inbound.popleft())
+        return events
 
     def is_match_found(self):
         return self.match_found.is_set()
@@ -8,17 +8,24 @@ class OnlineGame:
 
     def run(self):
         running = True
+        clock = pygame.time.Clock()
         while running:
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
                     running = False
                 # Handle other events
 
+            # Server messages that arrived since the last frame; never blocks
+            for name, data in self.connection.poll_events():
+                if name == 'opponent_left':
+                    running = False
+
             # Game logic here
 
             # Render game here
 
             pygame.display.flip()
-            pygame.time.Clock().tick(60)
+            clock.tick(60)
 
+        self.connection.disconnect()
         return "menu"  # Retu
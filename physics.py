@@ -0,0 +1,574 @@
+import math
+import random
+from table_geometry import table_geometry
+
+# Default table dimensions, matching the constants used by Game
+TABLE_WIDTH = 800
+TABLE_HEIGHT = 400
+EDGE_WIDTH = 20
+POCKET_RADIUS = 15
+BALL_RADIUS = 8
+ACCELERATION = 0.05
+# Speeds and friction are per frame at this rate
+SIMULATION_RATE = 60
+
+
+class BallState:
+    """Physical state of a single ball. Has no rendering dependencies."""
+
+    # Fixed fields keep instances small and attribute access in the step loop fast
+    __slots__ = (
+        'x', 'y', 'radius', 'speed_x', 'speed_y', 'acceleration', 'acceleration_x', 'acceleration_y',
+        'width', 'height', 'edge_width', 'pocket_radius', 'offset', 'buffer_height', 'mass', 'in_game',
+        'collision_order', 'initial_x', 'initial_y', 'geometry', 'foot_spot_x', 'foot_spot_y', 'number',
+        'top_spin', 'side_spin', 'spin_decay', 'spin_effect_strength', 'rotational_speed_x',
+        'rotational_speed_y', 'sliding_acceleration', 'rotational_acceleration', 'spin_direction_x',
+        'spin_direction_y', 'initial_target_angle', 'has_target_angle',
+    )
+
+    def __init__(self, x, y, radius, width, height, edge_width, pocket_radius, offset, acceleration, number=0):
+        self.x = x
+        self.y = y
+        self.radius = radius
+        self.speed_x = 0.0
+        self.speed_y = 0.0
+        self.acceleration = acceleration
+        self.acceleration_x = acceleration
+        self.acceleration_y = acceleration
+        self.width = width
+        self.height = height
+        self.edge_width = edge_width
+        self.pocket_radius = pocket_radius
+        self.offset = offset
+        self.buffer_height = pocket_radius
+        self.mass = 1  # Add mass for momentum calculations
+        self.in_game = True  # New flag to control drawing and movement
+        self.collision_order = []
+        self.initial_x = x
+        self.initial_y = y
+        # Pockets, cushion bounds and spots, shared by every ball on the table
+        self.geometry = table_geometry(width, height, edge_width, pocket_radius, radius)
+        self.foot_spot_x, self.foot_spot_y = self.geometry.foot_spot
+        self.number=number
+        self.top_spin = 0.0    # Range: -1.0 (back spin) to 1.0 (top spin)
+        self.side_spin = 0.0   # Range: -1.0 (left spin) to 1.0 (right spin)
+        self.spin_decay = 0.98 # Spin decay factor
+        self.spin_effect_strength = 0.3 # Adjustable coefficient for spin effects
+        self.rotational_speed_x = 0.0  # Rotational velocity in x direction
+        self.rotational_speed_y = 0.0  # Rotational velocity in y direction
+        self.sliding_acceleration = acceleration  # Sliding friction
+        self.rotational_acceleration = acceleration * 0.2  # Much smaller for rotation
+        # Unit vector of the direction of motion when top/back spin took hold
+        self.spin_direction_x = 1.0
+        self.spin_direction_y = 0.0
+        # Shot line side spin curves back towards, set while the ball moves with side spin
+        self.initial_target_angle = 0.0
+        self.has_target_angle = False
+
+    def spot(self, other_balls):
+        self.x = self.foot_spot_x
+        self.y = self.foot_spot_y
+        self.speed_x = 0
+        self.speed_y = 0
+        self.in_game = True
+        self.collision_order.clear()
+
+        # Check if the spot is occupied
+        while any(((self.x - ball.x)**2 + (self.y - ball.y)**2) <= (2*self.radius)**2 for ball in other_balls if ball != self and ball.in_game):
+            # Move the ball back towards the center of the table
+            self.y -= self.radius
+            if self.y < self.radius:  # If we've reached the top of the table
+                self.y = self.height - self.radius  # Move to the bottom
+                self.x -= self.radius  # and shift left
+
+        # Ensure the ball is on the table
+        self.x = max(self.edge_width + self.radius, min(self.x, self.width - self.edge_width - self.radius))
+        self.y = max(self.edge_width + self.radius, min(self.y, self.height - self.edge_width - self.radius))
+
+    def copy_state(self):
+        """Plain BallState with the same physical state, leaving collision_order empty"""
+        state = BallState(self.x, self.y, self.radius, self.width, self.height, self.edge_width,
+                          self.pocket_radius, self.offset, self.acceleration, self.number)
+        for name in ('speed_x', 'speed_y', 'acceleration_x', 'acceleration_y', 'buffer_height', 'mass',
+                     'in_game', 'initial_x', 'initial_y', 'foot_spot_x', 'foot_spot_y', 'top_spin',
+                     'side_spin', 'spin_decay', 'spin_effect_strength', 'rotational_speed_x',
+                     'rotational_speed_y', 'sliding_acceleration', 'rotational_acceleration', 'spin_direction_x',
+                     'spin_direction_y', 'initial_target_angle', 'has_target_angle'):
+            setattr(state, name, getattr(self, name))
+        return state
+
+    def is_moving(self):
+        return (self.speed_x != 0 or self.speed_y != 0 or
+                self.rotational_speed_x != 0 or self.rotational_speed_y != 0)
+
+    def apply_spin_effects(self, dt=1.0):
+        if not self.in_game:
+            return
+
+        self.convert_top_spin()
+        self.apply_side_spin(dt=dt)
+
+    def convert_top_spin(self):
+        """Turn top/back spin into rotational velocity once the ball starts moving"""
+        # Handle top/back spin as before
+        if self.top_spin != 0 and self.rotational_speed_x == 0 and self.rotational_speed_y == 0:
+            velocity_mag = math.sqrt(self.speed_x**2 + self.speed_y**2)
+            if velocity_mag > 0:
+                self.spin_direction_x = self.speed_x / velocity_mag
+                self.spin_direction_y = self.speed_y / velocity_mag
+                rotational_magnitude = abs(self.top_spin) * 3
+                self.rotational_speed_x = rotational_magnitude * self.spin_direction_x
+                self.rotational_speed_y = rotational_magnitude * self.spin_direction_y
+                if self.top_spin < 0:
+                    self.rotational_speed_x *= -1
+                    self.rotational_speed_y *= -1
+                self.top_spin=0
+
+    def apply_side_spin(self, curve=True, dt=1.0):
+        """Deflect the ball when side spin is first applied, then curve it back by dt frames' worth"""
+        # Handle side spin - initial deflection when speed is first applied
+        velocity_mag = math.sqrt(self.speed_x**2 + self.speed_y**2) if self.side_spin != 0 else 0.0
+        if velocity_mag > 0:
+            if not self.has_target_angle:
+                # Store the initial target angle when spin is first applied
+                self.initial_target_angle = math.atan2(self.speed_y, self.speed_x)
+                self.has_target_angle = True
+
+                # Apply initial deflection: turn the velocity by asin(side_spin),
+                # whose sine is the spin itself, keeping its magnitude
+                # Negative side spin (left) starts right of target line
+                # Positive side spin (right) starts left of target line
+                cos_deflection = math.sqrt(1 - self.side_spin**2)
+                sin_deflection = self.side_spin
+                self.speed_x, self.speed_y = (self.speed_x * cos_deflection + self.speed_y * sin_deflection,
+                                              self.speed_y * cos_deflection - self.speed_x * sin_deflection)
+            elif curve:
+                # Apply curve force toward target line
+                curve_strength = 0.05  # Adjust for curve intensity
+
+                # Apply rotational force to curve back to target line
+                rotation_angle = curve_strength * math.asin(self.side_spin) * dt
+                cos_rotation = math.cos(rotation_angle)
+                sin_rotation = math.sin(rotation_angle)
+                new_speed_x = self.speed_x * cos_rotation - self.speed_y * sin_rotation
+                new_speed_y = self.speed_x * sin_rotation + self.speed_y * cos_rotation
+
+                # Normalize to maintain speed
+                current_mag = math.sqrt(new_speed_x**2 + new_speed_y**2)
+                self.speed_x = new_speed_x * velocity_mag / current_mag
+                self.speed_y = new_speed_y * velocity_mag / current_mag
+        else:
+            self.has_target_angle = False
+
+
+    def move(self, other_balls=None):
+        if not self.in_game:
+            return
+
+        self.integrate()
+
+        # Check for collisions with other balls before moving
+        if other_balls:
+            for ball in other_balls:
+                if ball != self and ball.in_game:
+                        self.check_ball_collision(ball)
+
+        self.check_boundaries()
+
+    def integrate(self, dt=1.0):
+        """Apply spin and friction, then advance the position by dt frames (one by default)"""
+        if not self.in_game:
+            return
+
+        self.apply_spin_effects(dt)
+
+        # Update translational speeds with sliding friction, split along the direction of travel
+        velocity_mag = math.sqrt(self.speed_x**2 + self.speed_y**2)
+        if velocity_mag > 0:
+            acc_x = self.sliding_acceleration * abs(self.speed_x) / velocity_mag * dt
+            acc_y = self.sliding_acceleration * abs(self.speed_y) / velocity_mag * dt
+            self.speed_x = self.update_speed(self.speed_x, acc_x)
+            self.speed_y = self.update_speed(self.speed_y, acc_y)
+
+        # Update rotational speeds with rotational friction, split along the spin direction
+        if self.rotational_speed_x != 0 or self.rotational_speed_y != 0:
+            rot_acc_x = self.rotational_acceleration * abs(self.spin_direction_x) * dt
+            rot_acc_y = self.rotational_acceleration * abs(self.spin_direction_y) * dt
+            self.rotational_speed_x = self.update_speed(self.rotational_speed_x, rot_acc_x)
+            self.rotational_speed_y = self.update_speed(self.rotational_speed_y, rot_acc_y)
+
+        # Update position using both translational and rotational velocities
+        self.x += (self.speed_x + self.rotational_speed_x) * dt
+        self.y += (self.speed_y + self.rotational_speed_y) * dt
+
+    def check_boundaries(self):
+        """Capture the ball if it reached a pocket and rebound it off the cushions"""
+        if not self.in_game:
+            return
+
+        self.update_acceleration()
+        self.check_pockets()
+        self.check_cushions()
+
+    def pocket_check_points(self):
+        return self.geometry.pockets
+
+    def check_pockets(self):
+        capture_radius = self.geometry.capture_radius
+        for x, y in self.geometry.pockets:
+            if self.check_pocket(x, y, capture_radius):
+                self.in_game = False  # Remove the ball from the game
+                break
+
+    def check_cushions(self):
+        geometry = self.geometry
+        # Check for collisions with buffers
+        if self.x < geometry.min_x:
+            self.x = geometry.min_x
+            self.speed_x = -self.speed_x  # Normal rebound
+            if self.side_spin != 0:
+                # Add velocity in the direction parallel to the rail (y direction)
+                self.speed_y -= self.side_spin*3 * abs(self.speed_x)  # More spin effect for faster hits
+                self.side_spin*=0.3
+            self.rotational_speed_x = -self.rotational_speed_x
+            # Mirror the spin direction to reflect new rotation direction
+            self.spin_direction_x = -self.spin_direction_x
+
+
+
+        elif self.x > geometry.max_x:
+            self.x = geometry.max_x
+            self.speed_x = -self.speed_x
+            if self.side_spin != 0:
+                self.speed_y += self.side_spin *3* abs(self.speed_x)
+                self.side_spin*=0.3
+            self.rotational_speed_x = -self.rotational_speed_x
+            self.spin_direction_x = -self.spin_direction_x
+
+        if self.y < geometry.min_y:
+            self.y = geometry.min_y
+            self.speed_y = -self.speed_y
+            if self.side_spin != 0:
+                self.speed_x += self.side_spin *3* abs(self.speed_y)
+                self.side_spin*=0.3
+            self.rotational_speed_y = -self.rotational_speed_y
+            # Mirror the spin direction to reflect new rotation direction
+            self.spin_direction_y = -self.spin_direction_y
+
+        elif self.y > geometry.max_y:
+            self.y = geometry.max_y
+            self.speed_y = -self.speed_y
+            if self.side_spin != 0:
+                self.speed_x -= self.side_spin *3* abs(self.speed_y)
+                self.side_spin*=0.3
+            self.rotational_speed_y = -self.rotational_speed_y
+            self.spin_direction_y = -self.spin_direction_y
+
+        # Optional: Add some energy loss during buffer collision
+        buffer_absorption = 0.8  # Adjust this value to control energy loss
+        if self.x <= geometry.min_x or self.x >= geometry.max_x or \
+           self.y <= geometry.min_y or self.y >= geometry.max_y:
+            self.rotational_speed_x *= buffer_absorption
+            self.rotational_speed_y *= buffer_absorption
+
+
+    def check_ball_collision(self, other_ball):
+        # Calculate distance between ball centers
+        dx = other_ball.x - self.x
+        dy = other_ball.y - self.y
+        distance = math.sqrt(dx**2 + dy**2)
+
+        # Check if balls are colliding
+        if distance <= (self.radius + other_ball.radius):
+            # Unit collision normal; coincident centres separate along x
+            normal_x, normal_y = (dx / distance, dy / distance) if distance > 0 else (1.0, 0.0)
+
+            self.resolve_collision(other_ball, normal_x, normal_y)
+
+            # Separate balls to prevent sticking
+            overlap = self.radius + other_ball.radius - distance+0.01
+            self.x -= overlap/2 * normal_x
+            self.y -= overlap/2 * normal_y
+            other_ball.x += overlap/2 * normal_x
+            other_ball.y += overlap/2 * normal_y
+
+    def resolve_collision(self, other_ball, normal_x, normal_y):
+        """Exchange momentum and spin with a touching ball; the unit normal points from self to other_ball"""
+        if self.number == 0:  # Cue ball
+
+            # Transfer some spin to the target ball
+            spin_transfer = 0.3  # 30% spin transfer
+            other_ball.top_spin = self.top_spin * spin_transfer
+            other_ball.side_spin = self.side_spin * spin_transfer
+
+            # Reduce cue ball spin after collision
+            self.top_spin *= (1 - spin_transfer)
+            self.side_spin *= (1 - spin_transfer)
+
+            self.collision_order.append(other_ball)
+            other_ball.collision_order.append(self)
+
+        # Calculate initial velocities
+        v1x = self.speed_x
+        v1y = self.speed_y
+        v2x = other_ball.speed_x
+        v2y = other_ball.speed_y
+
+        # Decompose velocities along the collision axis and perpendicular to it
+        v1_parallel = v1x * normal_x + v1y * normal_y
+        v1_perpendicular = -v1x * normal_y + v1y * normal_x
+        v2_parallel = v2x * normal_x + v2y * normal_y
+        v2_perpendicular = -v2x * normal_y + v2y * normal_x
+
+        # Calculate new velocities using conservation of momentum and kinetic energy
+        new_v1_parallel = ((self.mass - other_ball.mass) * v1_parallel + 2 * other_ball.mass * v2_parallel) / (self.mass + other_ball.mass)
+        new_v2_parallel = ((other_ball.mass - self.mass) * v2_parallel + 2 * self.mass * v1_parallel) / (self.mass + other_ball.mass)
+
+        # Reconstruct velocities
+        self.speed_x = new_v1_parallel * normal_x - v1_perpendicular * normal_y
+        self.speed_y = new_v1_parallel * normal_y + v1_perpendicular * normal_x
+        other_ball.speed_x = new_v2_parallel * normal_x - v2_perpendicular * normal_y
+        other_ball.speed_y = new_v2_parallel * normal_y + v2_perpendicular * normal_x
+
+        # After calculating new velocities, modify them based on spin
+        if abs(self.side_spin) > 0:
+            # Turn the outgoing velocity by an angle set by side spin
+            spin_deflection = self.side_spin * 0.2
+            cos_deflection = math.cos(spin_deflection)
+            sin_deflection = math.sin(spin_deflection)
+            self.speed_x, self.speed_y = (self.speed_x * cos_deflection - self.speed_y * sin_deflection,
+                                          self.speed_x * sin_deflection + self.speed_y * cos_deflection)
+
+        # Transfer some spin to the other ball
+        other_ball.top_spin += self.top_spin * 0.3
+        other_ball.side_spin += self.side_spin * 0.3
+
+        # Reduce spin after collision
+        self.top_spin *= 0.7
+        self.side_spin *= 0.7
+
+
+        # Update acceleration based on new velocities
+        self.update_acceleration()
+        other_ball.update_acceleration()
+
+    def update_acceleration(self):
+        """Split the deceleration into x and y parts along the direction of travel"""
+        velocity_mag = math.sqrt(self.speed_x**2 + self.speed_y**2)
+        if velocity_mag > 0:
+            self.acceleration_x = self.acceleration * abs(self.speed_x) / velocity_mag
+            self.acceleration_y = self.acceleration * abs(self.speed_y) / velocity_mag
+        else:
+            # No direction at rest; put it all along x
+            self.acceleration_x = self.acceleration
+            self.acceleration_y = 0.0
+
+    def check_pocket(self, x, y, radius):
+        return (self.x - x) ** 2 + (self.y - y) ** 2 <= radius ** 2
+
+    def update_speed(self, speed, acceleration):
+        if speed > 0:
+            return max(0, speed - acceleration)
+        elif speed < 0:
+            return min(0, speed + acceleration)
+        else:
+            return 0
+
+    def reset(self):
+        self.x = self.initial_x
+        self.y = self.initial_y
+        self.speed_x = 0
+        self.speed_y = 0
+        self.rotational_speed_x = 0.0
+        self.rotational_speed_y = 0.0
+        self.in_game = True
+        self.collision_order.clear()
+
+
+class PhysicsEngine:
+    """
+    Owns the balls on a table and advances them one step at a time. Speeds
+    and friction are per frame at SIMULATION_RATE; step(dt) advances dt
+    frames, so a caller running physics faster passes a fraction of a frame.
+
+    Only the active balls are integrated and checked against the cushions
+    and pockets. A ball leaves the active set one step after it comes to
+    rest, once a step no longer changes it, and rejoins when a moving ball
+    reaches it. Code that changes balls between steps (a strike, a re-spot,
+    a re-rack) must call wake() so they are picked up again.
+    """
+
+    def __init__(self, cue_ball, numbered_balls):
+        self.cue_ball = cue_ball
+        self.numbered_balls = numbered_balls
+        self.balls = [cue_ball] + numbered_balls
+        # Kept between frames so the per-frame sort runs on nearly sorted data
+        self._sweep_order = list(self.balls)
+        self.wake()
+
+    def wake(self):
+        """Make every ball on the table active again and recount the moving ones"""
+        self._active = [ball for ball in self.balls if ball.in_game]
+        self._active_set = set(self._active)
+        self._moving = sum(1 for ball in self._active if ball.is_moving())
+
+    def step(self, dt=1.0):
+        """Advance every active ball by dt frames"""
+        active = self._active
+        if not active:
+            return  # Everything is at rest and a step would change nothing
+        was_moving = [ball.is_moving() for ball in active]
+        for ball in active:
+            ball.integrate(dt)
+
+        active_set = self._active_set
+        for ball, other_ball in self.candidate_pairs():
+            # A resting ball near a moving one joins the active set before it can be hit
+            for touched in (ball, other_ball):
+                if touched not in active_set:
+                    active_set.add(touched)
+                    active.append(touched)
+                    was_moving.append(False)
+            ball.check_ball_collision(other_ball)
+
+        # A ball that was at rest for the whole step has reached a state the
+        # step leaves unchanged, so it can be skipped from now on
+        self._active = []
+        moving = 0
+        for ball, moved in zip(active, was_moving):
+            ball.check_boundaries()
+            if not ball.in_game:
+                continue
+            if ball.is_moving():
+                moving += 1
+                self._active.append(ball)
+            elif moved:
+                self._active.append(ball)
+        self._active_set = set(self._active)
+        self._moving = moving
+
+    def candidate_pairs(self):
+        """
+        Sort-and-sweep broad phase along x. Returns each pair of overlapping
+        in-game balls once, skipping pairs where both balls are at rest. The
+        ball with the lower number comes first, so the cue ball always acts
+        as the striker in check_ball_collision.
+        """
+        order = self._sweep_order
+        order.sort(key=_sweep_start)
+        count = len(order)
+        pairs = []
+
+        for index in range(count):
+            ball = order[index]
+            if not ball.in_game:
+                continue
+            sweep_end = ball.x + ball.radius
+            ball_moving = ball.is_moving()
+
+            for other_index in range(index + 1, count):
+                other_ball = order[other_index]
+                if other_ball.x - other_ball.radius > sweep_end:
+                    break
+                if not other_ball.in_game:
+                    continue
+                if not ball_moving and not other_ball.is_moving():
+                    continue
+                if abs(other_ball.y - ball.y) > ball.radius + other_ball.radius:
+                    continue
+                if ball.number < other_ball.number:
+                    pairs.append((ball, other_ball))
+                else:
+                    pairs.append((other_ball, ball))
+
+        return pairs
+
+    def are_all_balls_stopped(self):
+        return self._moving == 0
+
+    def run_until_stopped(self, max_steps=10000, dt=1.0):
+        """Step dt frames at a time until every ball is at rest; returns the number of steps taken"""
+        steps = 0
+        while steps < max_steps and not self.are_all_balls_stopped():
+            self.step(dt)
+            steps += 1
+        return steps
+
+
+def _sweep_start(ball):
+    return ball.x - ball.radius
+
+
+def apply_shot(cue_ball, angle, power, top_spin=0.0, side_spin=0.0):
+    """Strike the cue ball. Spin values are the -1..1 inputs from the spin selector."""
+    cue_ball.speed_x = power * math.cos(angle)
+    cue_ball.speed_y = power * math.sin(angle)
+    cue_ball.top_spin = top_spin * power/15
+    cue_ball.side_spin = side_spin * power/35
+
+
+def setup_rack(numbered_balls, width=TABLE_WIDTH, table_height=TABLE_HEIGHT,
+               edge_width=EDGE_WIDTH, pocket_radius=POCKET_RADIUS, ball_radius=BALL_RADIUS, rng=random):
+    """Place the nine balls in a diamond on the foot spot, 1 at the front and 9 in the middle"""
+    # Position for the apex ball (9 ball)
+    apex_x, apex_y = table_geometry(width, table_height, edge_width, pocket_radius, ball_radius).foot_spot
+    ball_spacing = ball_radius * 2  # Slightly larger spacing to prevent overlapping
+
+    # Set the 9 ball position (center of the rack)
+    numbered_balls[8].x = apex_x  # 9 ball (index 8)
+    numbered_balls[8].y = apex_y  # Center position
+
+    # Available balls for random placement (excluding 1 and 9)
+    available_balls = numbered_balls[1:8]  # balls 2-8
+    rng.shuffle(available_balls)
+
+    # Place two random balls in the same vertical line as 9 ball
+    available_balls[0].x = apex_x
+    available_balls[0].y = apex_y - ball_spacing  # One ball above 9
+    available_balls[1].x = apex_x
+    available_balls[1].y = apex_y + ball_spacing  # One ball below 9
+
+    # Row offset for the diamond shape
+    row_offset = ball_spacing * math.sin(math.pi/3)  # 60 degree angle
+
+    # Place two balls on each side (maintaining diamond shape)
+    available_balls[2].x = apex_x - row_offset
+    available_balls[2].y = apex_y - ball_spacing/2
+
+    available_balls[3].x = apex_x - row_offset
+    available_balls[3].y = apex_y + ball_spacing/2
+
+    available_balls[4].x = apex_x + row_offset
+    available_balls[4].y = apex_y - ball_spacing/2
+
+    available_balls[5].x = apex_x + row_offset
+    available_balls[5].y = apex_y + ball_spacing/2
+
+    # Place 1 ball at the back left
+    numbered_balls[0].x = apex_x - row_offset * 2  # 1 ball
+    numbered_balls[0].y = apex_y  # Same height as 9 ball
+
+    # Place remaining ball at the back right
+    remaining_ball = available_balls[6]
+    remaining_ball.x = apex_x + row_offset * 2
+    remaining_ball.y = apex_y  # Same height as 9 ball
+
+
+def create_table(width=TABLE_WIDTH, table_height=TABLE_HEIGHT, edge_width=EDGE_WIDTH,
+                 pocket_radius=POCKET_RADIUS, ball_radius=BALL_RADIUS, acceleration=ACCELERATION,
+                 rng=random):
+    """Build a headless engine with the cue ball in the kitchen and a fresh rack"""
+    geometry = table_geometry(width, table_height, edge_width, pocket_radius, ball_radius)
+    offset = geometry.offset
+    cue_ball = BallState(
+        geometry.kitchen_x, geometry.min_y,
+        ball_radius, width, table_height, edge_width, pocket_radius, offset,
+        acceleration=acceleration, number=0
+    )
+    numbered_balls = [
+        BallState(0, 0, ball_radius, width, table_height, edge_width, pocket_radius, offset,
+                  acceleration=acceleration, number=i)
+        for i in range(1, 10)
+    ]
+    setup_rack(numbered_balls, width, table_height, edge_width, pocket_radius, ball_radius, rng)
+    return PhysicsEngine(cue_ball, numbered_balls)
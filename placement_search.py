@@ -0,0 +1,94 @@
+import numpy as np
+
+# Same weights and constants as AIPlayer.evaluate_position
+IDEAL_DISTANCE = 200
+DISTANCE_WEIGHT = 0.3
+ANGLE_WEIGHT = 0.3
+CENTER_WEIGHT = 0.2
+BLOCKED_PENALTY = 0.5
+
+
+def score_positions(x, y, target, blockers, pockets, table_width, table_height, path_tolerance):
+    """
+    evaluate_position for whole arrays of candidate cue ball positions at once.
+    target is (x, y), blockers an (n, 2) array of the other balls still on the
+    table and pockets an (m, 2) array.
+    """
+    target_x, target_y = target
+    distance_to_target = np.hypot(x - target_x, y - target_y)
+    score = DISTANCE_WEIGHT * (1 - np.abs(distance_to_target - IDEAL_DISTANCE) / IDEAL_DISTANCE)
+
+    # Straightest pot into any pocket
+    cue_to_target = np.arctan2(target_y - y, target_x - x)
+    target_to_pocket = np.arctan2(pockets[:, 1] - target_y, pockets[:, 0] - target_x)
+    angle_diff = np.abs((target_to_pocket - cue_to_target[..., np.newaxis] + np.pi) % (2 * np.pi) - np.pi)
+    score += ANGLE_WEIGHT * (1 - angle_diff / np.pi).max(axis=-1)
+
+    distance_to_center = np.hypot(x - table_width / 2, y - table_height / 2)
+    score += CENTER_WEIGHT * (1 - distance_to_center / (table_width / 2))
+
+    if len(blockers):
+        # Same line test as AIPlayer.is_shot_blocked, for every position and ball together
+        direction_x = ((target_x - x) / np.maximum(distance_to_target, 1e-12))[..., np.newaxis]
+        direction_y = ((target_y - y) / np.maximum(distance_to_target, 1e-12))[..., np.newaxis]
+        dx = blockers[:, 0] - x[..., np.newaxis]
+        dy = blockers[:, 1] - y[..., np.newaxis]
+        across = np.abs(dx * direction_y - dy * direction_x)
+        along = dx * direction_x + dy * direction_y
+        blocked = ((across < path_tolerance) & (along > 0) & (along < distance_to_target[..., np.newaxis])).any(axis=-1)
+        score -= np.where(blocked, BLOCKED_PENALTY, 0.0)
+    return score
+
+
+def valid_positions(x, y, balls, min_distance):
+    """Mask of positions that do not overlap any ball in the (n, 2) array balls"""
+    if not len(balls):
+        return np.ones(np.shape(x), dtype=bool)
+    distance = np.hypot(balls[:, 0] - x[..., np.newaxis], balls[:, 1] - y[..., np.newaxis])
+    return (distance >= min_distance).all(axis=-1)
+
+
+def best_placement(bounds, target, balls, blockers, pockets, table_width, table_height,
+                   min_distance, path_tolerance, columns=200, rows=100, coarse_step=4, candidates=8):
+    """
+    Best legal cue ball position on a columns x rows grid spanning bounds
+    (min_x, max_x, min_y, max_y). Every coarse_step-th grid point is scored
+    first, then the full-resolution points around the best few coarse cells.
+    All checks and scores for a pass are computed as arrays at once. Returns
+    (x, y, score), or None when no grid point is legal.
+    """
+    min_x, max_x, min_y, max_y = bounds
+    balls = np.asarray(balls, dtype=float).reshape(-1, 2)
+    blockers = np.asarray(blockers, dtype=float).reshape(-1, 2)
+    pockets = np.asarray(pockets, dtype=float).reshape(-1, 2)
+    grid_x, grid_y = np.meshgrid(np.linspace(min_x, max_x, columns), np.linspace(min_y, max_y, rows), indexing='ij')
+
+    def scores(x, y):
+        score = score_positions(x, y, target, blockers, pockets, table_width, table_height, path_tolerance)
+        return np.where(valid_positions(x, y, balls, min_distance), score, -np.inf)
+
+    # Coarse pass
+    coarse = scores(grid_x[::coarse_step, ::coarse_step], grid_y[::coarse_step, ::coarse_step]).ravel()
+    count = min(candidates, coarse.size)
+    best = np.argpartition(-coarse, count - 1)[:count]
+    best = best[np.isfinite(coarse[best])]
+
+    # Fine pass over the neighbourhood of each surviving coarse cell, or the
+    # whole grid if no coarse point was legal
+    if len(best):
+        window = np.zeros(grid_x.shape, dtype=bool)
+        coarse_rows = grid_x[::coarse_step, ::coarse_step].shape[1]
+        for cell in best:
+            column, row = divmod(int(cell), coarse_rows)
+            column, row = column * coarse_step, row * coarse_step
+            window[max(column - coarse_step, 0):column + coarse_step + 1,
+                   max(row - coarse_step, 0):row + coarse_step + 1] = True
+    else:
+        window = np.ones(grid_x.shape, dtype=bool)
+
+    x, y = grid_x[window], grid_y[window]
+    fine = scores(x, y)
+    index = int(np.argmax(fine))
+    if fine[index] == -np.inf:
+        return None
+    return float(x[index]), float(y[index]), float(fine[index])
@@ -1,5 +1,6 @@
 import pygame
 import math
+from sprite_cache import text_cache
 
 class Portal:
     def __init__(self, width, height, table_height):
@@ -73,7 +74,7 @@ class Portal:
                 # Draw white inner circle
                 pygame.draw.circle(screen, self.WHITE, (ball_x, ball_y), self.INNER_CIRCLE_RADIUS)
                 # Draw ball number in black
-                number_text = self.ball_font.render(str(i + 1), True, self.BLACK)
+                number_text = text_cache.render(self.ball_font, str(i + 1), self.BLACK)
                 number_rect = number_text.get_rect(center=(ball_x, ball_y))
                 screen.blit(number_text, number_rect)
             else:
@@ -108,7 +109,7 @@ class Portal:
         message_x = self.WIDTH // 2
         message_y = self.BALL_STATUS_Y + self.BALL_STATUS_RADIUS * 2 + 10  # Position below ball status
         for message in self.messages:
-            text = self.font.render(message, True, self.WHITE)
+            text = text_cache.render(self.font, message, self.WHITE)
             screen.blit(text, (message_x - text.get_width()//2, message_y))
             message_y += 25
 
@@ -155,18 +156,18 @@ class Portal:
         text_y = self.PORTAL_Y + (self.SCOREBOARD_HEIGHT - self.font.get_height())//2
 
         # Draw Player 1 text (centered in left section)
-        player1_text = self.font.render("Player 1", True, self.BLACK)
+        player1_text = text_cache.render(self.font, "Player 1", self.BLACK)
         player1_x = (self.SIDE_SECTION_WIDTH - player1_text.get_width())//2
         screen.blit(player1_text, (player1_x, text_y))
 
         # Draw scores and frame number in middle section
         score_text = f"{player1_score} (1) {player2_score}"
-        score_surface = self.font.render(score_text, True, self.WHITE)
+        score_surface = text_cache.render(self.font, score_text, self.WHITE)
         score_x = self.SIDE_SECTION_WIDTH + (self.MIDDLE_SECTION_WIDTH - score_surface.get_width())//2
         screen.blit(score_surface, (score_x, text_y))
 
         # Draw Player 2 text (centered in right section)
-        player2_text = self.font.render("Player 2", True, self.BLACK)
+        player2_text = text_cache.render(self.font, "Player 2", self.BLACK)
         player2_x = self.WIDTH - self.SIDE_SECTION_WIDTH + (self.SIDE_SECTION_WIDTH - player2_text.get_width())//2
         screen.blit(player2_text, (player2_x, text_y))
 
@@ -177,7 +178,7 @@ class Portal:
         self.back_button_rect = pygame.Rect(20, self.PORTAL_Y + self.SCOREBOARD_HEIGHT + 20, 
                                           self.BACK_BUTTON_WIDTH, self.BACK_BUTTON_HEIGHT)
         pygame.draw.rect(screen, self.WHITE, self.back_button_rect)
-        back_text = self.font.render("Back", True, self.BLACK)
+        back_text = text_cache.render(self.font, "Back", self.BLACK)
         screen.blit(back_text, (self.back_button_rect.centerx - back_text.get_width()//2,
                                self.back_button_rect.centery - back_text.get_height()//2))
 
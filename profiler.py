@@ -0,0 +1,241 @@
+import bisect
+import os
+import time
+from collections import deque
+import pygame
+
+# Upper bounds of the histogram buckets, in milliseconds
+BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2, 4, 8, 16, 33, 50, 100, 250)
+
+# Samples kept per scope for the percentiles: ten seconds at 60 fps
+DEFAULT_WINDOW = 600
+
+# Seconds between dumps to the Prometheus file and the log
+DUMP_INTERVAL = 10
+
+# Seconds between overlay text updates, so the numbers stay readable
+OVERLAY_REFRESH = 0.25
+OVERLAY_POSITION = (30, 30)
+OVERLAY_LINE_HEIGHT = 16
+
+
+class Timer:
+    """
+    Durations recorded for one scope: the last window samples for rolling
+    percentiles, plus cumulative histogram counts, total and count for the
+    Prometheus dump.
+    """
+
+    def __init__(self, name, window=DEFAULT_WINDOW):
+        self.name = name
+        self.samples = deque(maxlen=window)
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)  # The last bucket is +Inf
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+        self.buckets[bisect.bisect_left(BUCKETS_MS, seconds * 1000)] += 1
+        self.count += 1
+        self.total += seconds
+
+    def percentiles(self, *fractions):
+        """Rolling percentiles over the window, in seconds; 0 before any sample"""
+        ordered = sorted(self.samples)
+        if not ordered:
+            return [0.0] * len(fractions)
+        return [ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] for fraction in fractions]
+
+
+class _Scope:
+    """Reusable context manager timing one scope; scopes of the same name must not nest"""
+    __slots__ = ('timer', 'start')
+
+    def __init__(self, timer):
+        self.timer = timer
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.timer.add(time.perf_counter() - self.start)
+        return False
+
+
+class _NullScope:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_SCOPE = _NullScope()
+
+
+class Profiler:
+    """
+    Named timing scopes for the phases of a frame:
+
+        with profiler.scope('physics'):
+            ...
+        profiler.end_frame()
+
+    While disabled, scope() hands back a shared no-op context manager and
+    end_frame() returns at once, so the instrumentation can stay in the game
+    loop. When enabled it keeps rolling p50/p95/p99 per scope, can draw them
+    over the game, and every dump_interval seconds writes the histograms to
+    prometheus_path (Prometheus text format) and a summary line to log_path.
+    """
+
+    def __init__(self, enabled=False, window=DEFAULT_WINDOW, prometheus_path=None, log_path=None,
+                 dump_interval=DUMP_INTERVAL):
+        self.enabled = False
+        self.window = window
+        self.prometheus_path = prometheus_path
+        self.log_path = log_path
+        self.dump_interval = dump_interval
+        self.overlay = False
+        self.overlay_version = 0  # Changes whenever the overlay text does
+        self.timers = {}  # name -> Timer, in first-use order
+        self._scopes = {}
+        self._last_frame = None
+        self._next_dump = 0.0
+        self._next_overlay = 0.0
+        self._overlay_font = None
+        self._overlay_lines = []  # Rendered text, rebuilt every OVERLAY_REFRESH
+        self._overlay_rect = None
+        self.set_enabled(enabled)
+
+    @classmethod
+    def from_environment(cls):
+        """
+        Profiler configured from BILLIARDS_PROFILE (enable at start),
+        BILLIARDS_PROFILE_FILE (Prometheus text file) and BILLIARDS_PROFILE_LOG
+        (summary log). Setting either path also enables it.
+        """
+        prometheus_path = os.environ.get('BILLIARDS_PROFILE_FILE') or None
+        log_path = os.environ.get('BILLIARDS_PROFILE_LOG') or None
+        enabled = os.environ.get('BILLIARDS_PROFILE', '') not in ('', '0') or bool(prometheus_path or log_path)
+        return cls(enabled, prometheus_path=prometheus_path, log_path=log_path)
+
+    def set_enabled(self, enabled):
+        self.enabled = enabled
+        self._last_frame = None  # Don't count the time spent disabled as a frame
+        self._next_dump = time.perf_counter() + self.dump_interval
+
+    def toggle_overlay(self):
+        """Show or hide the overlay; showing it turns profiling on"""
+        self.overlay = not self.overlay
+        if self.overlay and not self.enabled:
+            self.set_enabled(True)
+        self.overlay_version += 1
+
+    def timer(self, name):
+        timer = self.timers.get(name)
+        if timer is None:
+            timer = self.timers[name] = Timer(name, self.window)
+        return timer
+
+    def scope(self, name):
+        if not self.enabled:
+            return _NULL_SCOPE
+        scope = self._scopes.get(name)
+        if scope is None:
+            scope = self._scopes[name] = _Scope(self.timer(name))
+        return scope
+
+    def end_frame(self):
+        """Record the time since the previous call as 'frame'; dumps when one is due"""
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        if self._last_frame is not None:
+            self.timer('frame').add(now - self._last_frame)
+        self._last_frame = now
+
+        if (self.prometheus_path or self.log_path) and now >= self._next_dump:
+            self._next_dump = now + self.dump_interval
+            self.dump()
+        if self.overlay and now >= self._next_overlay:
+            self._next_overlay = now + OVERLAY_REFRESH
+            self._refresh_overlay()
+
+    def summary(self):
+        """(name, count, p50, p95, p99) per scope, percentiles in milliseconds"""
+        return [(timer.name, timer.count) + tuple(1000 * value for value in timer.percentiles(0.5, 0.95, 0.99))
+                for timer in self.timers.values()]
+
+    def summary_lines(self):
+        lines = ["%-8s %7s %7s %7s" % ("ms", "p50", "p95", "p99")]
+        for name, _, p50, p95, p99 in self.summary():
+            lines.append("%-8s %7.2f %7.2f %7.2f" % (name[:8], p50, p95, p99))
+        return lines
+
+    def prometheus_text(self):
+        """Every scope as a Prometheus histogram in seconds, plus rolling percentiles as a gauge"""
+        lines = [
+            "# HELP billiards_scope_seconds Time spent in each phase of a frame.",
+            "# TYPE billiards_scope_seconds histogram",
+        ]
+        for timer in self.timers.values():
+            cumulative = 0
+            for bound, count in zip(BUCKETS_MS + (None,), timer.buckets):
+                cumulative += count
+                le = "+Inf" if bound is None else repr(bound / 1000)
+                lines.append('billiards_scope_seconds_bucket{scope="%s",le="%s"} %d' % (timer.name, le, cumulative))
+            lines.append('billiards_scope_seconds_sum{scope="%s"} %r' % (timer.name, timer.total))
+            lines.append('billiards_scope_seconds_count{scope="%s"} %d' % (timer.name, timer.count))
+        lines += [
+            "# HELP billiards_scope_recent_seconds Rolling percentiles over the last %d samples." % self.window,
+            "# TYPE billiards_scope_recent_seconds gauge",
+        ]
+        for timer in self.timers.values():
+            for quantile, value in zip(("0.5", "0.95", "0.99"), timer.percentiles(0.5, 0.95, 0.99)):
+                lines.append('billiards_scope_recent_seconds{scope="%s",quantile="%s"} %r'
+                             % (timer.name, quantile, value))
+        return "\n".join(lines) + "\n"
+
+    def dump(self):
+        """Write the Prometheus file (replaced atomically) and append a summary line to the log"""
+        try:
+            if self.prometheus_path:
+                temporary = self.prometheus_path + '.tmp'
+                with open(temporary, 'w') as file:
+                    file.write(self.prometheus_text())
+                os.replace(temporary, self.prometheus_path)
+            if self.log_path:
+                fields = ' '.join("%s=%.2f/%.2f/%.2f" % (name, p50, p95, p99)
+                                  for name, _, p50, p95, p99 in self.summary())
+                with open(self.log_path, 'a') as file:
+                    file.write("%s p50/p95/p99 ms %s\n" % (time.strftime('%Y-%m-%dT%H:%M:%S'), fields))
+        except OSError as e:
+            print(f"Profile dump failed: {e}")
+
+    def overlay_rect(self):
+        """Screen area the overlay covers, or None while it is hidden"""
+        return self._overlay_rect if self.overlay else None
+
+    def _refresh_overlay(self):
+        if self._overlay_font is None:
+            self._overlay_font = pygame.font.SysFont('monospace', 13)
+        self._overlay_lines = [self._overlay_font.render(line, True, (230, 230, 230))
+                               for line in self.summary_lines()]
+        width = max(text.get_width() for text in self._overlay_lines) + 12
+        self._overlay_rect = pygame.Rect(OVERLAY_POSITION,
+                                         (width, OVERLAY_LINE_HEIGHT * len(self._overlay_lines) + 8))
+        self.overlay_version += 1
+
+    def draw_overlay(self, screen):
+        if not self.overlay or self._overlay_rect is None:
+            return
+        rect = self._overlay_rect
+        panel = pygame.Surface(rect.size, pygame.SRCALPHA)
+        panel.fill((0, 0, 0, 170))
+        screen.blit(panel, rect.topleft)
+        for index, text in enumerate(self._overlay_lines):
+            screen.blit(text, (rect.x + 6, rect.y + 4 + index * OVERLAY_LINE_HEIGHT))
@@ -0,0 +1,270 @@
+import json
+import struct
+import time
+from collections import namedtuple
+from functools import lru_cache
+
+# Binary wire format for online play, little-endian. Every message starts
+# with (VERSION, message type). Positions are fixed-point in 1/64 px, speeds
+# in 1/256 px per frame, spins in 1/127 and event times in 1/256 frame. Ball
+# lists only carry the balls set in a 16-bit mask (bit n for ball n), in
+# ball number order.
+VERSION = 1
+SNAPSHOT = 1
+SHOT_UPDATE = 2
+
+POSITION_SCALE = 64
+SPEED_SCALE = 256
+SPIN_SCALE = 127
+TIME_SCALE = 256
+
+EVENT_KINDS = ('collision', 'cushion', 'pocket', 'rest')
+CUSHIONS = ('left', 'right', 'top', 'bottom')
+_KIND_CODES = {kind: code for code, kind in enumerate(EVENT_KINDS)}
+_CUSHION_CODES = {cushion: code for code, cushion in enumerate(CUSHIONS)}
+NO_OTHER = 255  # 'other' of rest events and of pockets with no index
+
+FOUL_FLAG = 1
+GAME_OVER_FLAG = 2
+BALL_IN_HAND_FLAG = 4
+
+HEADER = struct.Struct('<BB')
+# shot number, current player, target, flags, player 1 and 2 scores, in-game mask
+SNAPSHOT_HEAD = struct.Struct('<IBBBHHH')
+# shot number, shooter, current player, target, flags, scores, cue x, cue y,
+# angle, power, top spin, side spin, frames, changed mask, in-game mask, event count
+SHOT_HEAD = struct.Struct('<IBBBBHHHHffbbIHHH')
+# Each event is packed as <IBBB: time, kind, ball, other
+
+# Decoded messages. Balls are BallRecords; events are (time, kind, ball, other)
+# with other a ball number, a cushion name, a pocket index or None, as in
+# event_physics.Event.
+Snapshot = namedtuple('Snapshot', 'shot current_player target ball_in_hand scores balls')
+ShotUpdate = namedtuple('ShotUpdate', 'shot player current_player target foul game_over ball_in_hand '
+                                      'scores stroke frames balls pocketed events')
+BallRecord = namedtuple('BallRecord', 'number x y speed_x speed_y top_spin side_spin')
+
+
+@lru_cache(maxsize=None)
+def _ball_struct(count):
+    return struct.Struct('<' + 'HHhhbb' * count)
+
+
+@lru_cache(maxsize=None)
+def _position_struct(count):
+    return struct.Struct('<' + 'HH' * count)
+
+
+@lru_cache(maxsize=None)
+def _event_struct(count):
+    return struct.Struct('<' + 'IBBB' * count)
+
+
+def _flags(foul, game_over, ball_in_hand):
+    return (FOUL_FLAG if foul else 0) | (GAME_OVER_FLAG if game_over else 0) | \
+           (BALL_IN_HAND_FLAG if ball_in_hand else 0)
+
+
+def _mask(balls):
+    mask = 0
+    for ball in balls:
+        if ball.in_game:
+            mask |= 1 << ball.number
+    return mask
+
+
+def _numbers(mask):
+    return [number for number in range(16) if mask >> number & 1]
+
+
+def encode_snapshot(room):
+    """Full table and turn state of a GameRoom"""
+    # Values are in range by construction (on the table, below the top stroke
+    # speed, spins within +-1), so they are scaled inline without clamping
+    values = []
+    for ball in room.balls:
+        if ball.in_game:
+            values += (int(ball.x * POSITION_SCALE + 0.5), int(ball.y * POSITION_SCALE + 0.5),
+                       round(ball.speed_x * SPEED_SCALE), round(ball.speed_y * SPEED_SCALE),
+                       round(ball.top_spin * SPIN_SCALE), round(ball.side_spin * SPIN_SCALE))
+    return b''.join((
+        HEADER.pack(VERSION, SNAPSHOT),
+        SNAPSHOT_HEAD.pack(room.shot_number, room.current_player, room.target,
+                           _flags(False, False, room.ball_in_hand), room.scores[0], room.scores[1],
+                           _mask(room.balls)),
+        _ball_struct(len(values) // 6).pack(*values),
+    ))
+
+
+def encode_shot_update(room, outcome):
+    """A GameRoom's ShotOutcome: the stroke, the resting positions that changed and the event log"""
+    cue_x, cue_y, angle, power, top_spin, side_spin = outcome.stroke
+    changed_mask = 0
+    for number in outcome.changed:
+        changed_mask |= 1 << number
+    in_game_mask = _mask(room.balls)
+    moved = [room.balls[number] for number in _numbers(changed_mask & in_game_mask)]
+    positions = []
+    for ball in moved:
+        positions += (int(ball.x * POSITION_SCALE + 0.5), int(ball.y * POSITION_SCALE + 0.5))
+
+    # One flat pack for the whole log
+    events = []
+    for event_time, kind, ball, other in outcome.events:
+        if kind == 'cushion':
+            other = _CUSHION_CODES[other]
+        elif other is None:
+            other = NO_OTHER
+        events += (int(event_time * TIME_SCALE + 0.5), _KIND_CODES[kind], ball, other)
+    event_count = len(outcome.events)
+
+    return b''.join((
+        HEADER.pack(VERSION, SHOT_UPDATE),
+        SHOT_HEAD.pack(outcome.shot, outcome.player, room.current_player, room.target,
+                       _flags(outcome.foul, outcome.game_over, room.ball_in_hand),
+                       room.scores[0], room.scores[1], int(cue_x * POSITION_SCALE + 0.5),
+                       int(cue_y * POSITION_SCALE + 0.5), angle, power, round(top_spin * SPIN_SCALE),
+                       round(side_spin * SPIN_SCALE), int(outcome.frames * TIME_SCALE + 0.5),
+                       changed_mask, in_game_mask, event_count),
+        _position_struct(len(moved)).pack(*positions),
+        _event_struct(event_count).pack(*events),
+    ))
+
+
+def decode(data):
+    """Snapshot or ShotUpdate from a message; raises ValueError if it is malformed or of another version"""
+    try:
+        version, kind = HEADER.unpack_from(data)
+        if version != VERSION:
+            raise ValueError("Unsupported protocol version %d" % version)
+        if kind == SNAPSHOT:
+            return _decode_snapshot(data, HEADER.size)
+        if kind == SHOT_UPDATE:
+            return _decode_shot_update(data, HEADER.size)
+    except (struct.error, IndexError) as e:
+        raise ValueError("Malformed message: %s" % e)
+    raise ValueError("Unknown message type %d" % kind)
+
+
+def _decode_snapshot(data, offset):
+    shot, current_player, target, flags, score1, score2, mask = SNAPSHOT_HEAD.unpack_from(data, offset)
+    offset += SNAPSHOT_HEAD.size
+    numbers = _numbers(mask)
+    values = _ball_struct(len(numbers)).unpack_from(data, offset)
+    balls = tuple(
+        BallRecord(number, values[i] / POSITION_SCALE, values[i + 1] / POSITION_SCALE,
+                   values[i + 2] / SPEED_SCALE, values[i + 3] / SPEED_SCALE,
+                   values[i + 4] / SPIN_SCALE, values[i + 5] / SPIN_SCALE)
+        for number, i in zip(numbers, range(0, len(values), 6))
+    )
+    return Snapshot(shot, current_player, target, bool(flags & BALL_IN_HAND_FLAG), (score1, score2), balls)
+
+
+def _decode_shot_update(data, offset):
+    (shot, player, current_player, target, flags, score1, score2, cue_x, cue_y, angle, power,
+     top_spin, side_spin, frames, changed_mask, in_game_mask, event_count) = SHOT_HEAD.unpack_from(data, offset)
+    offset += SHOT_HEAD.size
+
+    numbers = _numbers(changed_mask & in_game_mask)
+    position_struct = _position_struct(len(numbers))
+    values = position_struct.unpack_from(data, offset)
+    offset += position_struct.size
+    balls = tuple(BallRecord(number, values[i] / POSITION_SCALE, values[i + 1] / POSITION_SCALE, 0.0, 0.0, 0.0, 0.0)
+                  for number, i in zip(numbers, range(0, len(values), 2)))
+    # Balls that changed and are no longer on the table
+    pocketed = tuple(_numbers(changed_mask & ~in_game_mask))
+
+    values = _event_struct(event_count).unpack_from(data, offset)
+    events = []
+    for i in range(0, len(values), 4):
+        kind, other = EVENT_KINDS[values[i + 1]], values[i + 3]
+        if kind == 'cushion':
+            other = CUSHIONS[other]
+        elif other == NO_OTHER:
+            other = None
+        events.append((values[i] / TIME_SCALE, kind, values[i + 2], other))
+
+    stroke = (cue_x / POSITION_SCALE, cue_y / POSITION_SCALE, angle, power,
+              top_spin / SPIN_SCALE, side_spin / SPIN_SCALE)
+    return ShotUpdate(shot, player, current_player, target, bool(flags & FOUL_FLAG),
+                      bool(flags & GAME_OVER_FLAG), bool(flags & BALL_IN_HAND_FLAG), (score1, score2),
+                      stroke, frames / TIME_SCALE, balls, pocketed, tuple(events))
+
+
+def _json_shot_update(room, outcome):
+    """The JSON message the server sent before this format, for the benchmark"""
+    return json.dumps({
+        'game_id': room.room_id,
+        'shot': outcome.shot,
+        'player': outcome.player,
+        'stroke': list(outcome.stroke),
+        'events': [[round(event_time, 3), kind, ball, other] for event_time, kind, ball, other in outcome.events],
+        'frames': outcome.frames,
+        'balls': [[number, room.balls[number].x, room.balls[number].y, room.balls[number].in_game]
+                  for number in outcome.changed],
+        'foul': outcome.foul,
+        'game_over': outcome.game_over,
+        'current_player': room.current_player,
+        'target': room.target,
+        'scores': list(room.scores),
+        'ball_in_hand': room.ball_in_hand,
+    }).encode()
+
+
+def _json_snapshot(room):
+    return json.dumps({
+        'game_id': room.room_id,
+        'shot': room.shot_number,
+        'balls': [[ball.number, ball.x, ball.y, ball.in_game] for ball in room.balls],
+        'current_player': room.current_player,
+        'target': room.target,
+        'scores': list(room.scores),
+        'ball_in_hand': room.ball_in_hand,
+    }).encode()
+
+
+def benchmark(room_counts=(1, 10, 100), repeats=20):
+    """
+    Bytes and encode/decode time per broadcast, binary against JSON, for a
+    break shot in each of n rooms. Returns {rooms: {format: (bytes, encode
+    seconds, decode seconds)}}, totals over all rooms for one broadcast each.
+    """
+    from game_room import GameRoom, resolve_stroke
+
+    # One shared pool of played rooms, so every count encodes the same kind of table
+    played = []
+    for index in range(max(room_counts)):
+        room = GameRoom(str(index), ['a', 'b'], seed=index)
+        snapshot, stroke = room.begin_stroke('a', {'angle': 0.05 * index, 'power': 18,
+                                                   'cue_x': room.geometry.kitchen_x - 40,
+                                                   'cue_y': room.geometry.height / 2})
+        played.append((room, room.finish_stroke(stroke, resolve_stroke(snapshot, *stroke))))
+
+    formats = {
+        'binary': (encode_shot_update, encode_snapshot, decode),
+        'json': (_json_shot_update, _json_snapshot, json.loads),
+    }
+    results = {}
+    for count in room_counts:
+        rooms = played[:count]
+        results[count] = {}
+        for name, (encode_update, encode_state, decode_message) in formats.items():
+            start = time.perf_counter()
+            for _ in range(repeats):
+                messages = [encode_update(room, outcome) for room, outcome in rooms]
+                messages += [encode_state(room) for room, _ in rooms]
+            encoded = time.perf_counter()
+            for _ in range(repeats):
+                for message in messages:
+                    decode_message(message)
+            decoded = time.perf_counter()
+            results[count][name] = (sum(len(message) for message in messages),
+                                    (encoded - start) / repeats, (decoded - encoded) / repeats)
+    return results
+
+
+if __name__ == '__main__':
+    for count, formats in benchmark().items():
+        for name, (size, encode_time, decode_time) in formats.items():
+            print(f"{count:4d} rooms {name:6s} {size:8d} B  encode {encode_time * 1000:7.3f} ms"
+                  f"  decode {decode_time * 1000:7.3f} ms")
@@ -0,0 +1,165 @@
+import random
+import struct
+from collections import namedtuple
+import physics
+from physics import PhysicsEngine, apply_shot
+from event_physics import ContinuousPhysicsEngine
+from rules import settle_shot
+
+# Binary layout, little-endian. The header holds a magic string, the format
+# version, flags (bit 0: continuous physics), the physics rate in Hz, the rack
+# seed and the shot count. Each shot follows as seven doubles; doubles keep
+# the inputs bit-exact, so the re-simulation matches the live game exactly.
+MAGIC = b'9BRP'
+# Bumped whenever the physics changes its results, since older replays would
+# no longer re-simulate to the same game
+VERSION = 4
+HEADER = struct.Struct('<4sBBHQI')
+SHOT = struct.Struct('<7d')
+CONTINUOUS_FLAG = 1
+
+# Guard against a shot that never comes to rest
+MAX_STEPS_PER_SHOT = 200000
+
+# One recorded stroke: where the cue ball stood, the inputs passed to
+# apply_shot, and the engine clock when it was played (only the event-driven
+# engine's side-spin curve depends on it; always 0 for the fixed-step engine)
+Shot = namedtuple('Shot', 'cue_x cue_y angle power top_spin side_spin clock')
+
+
+class Replay:
+    """
+    Everything needed to rebuild a game: the seed of the rack shuffle, the
+    physics settings and every shot played, in order. The rest of the game
+    follows deterministically from these.
+    """
+
+    def __init__(self, seed, physics_rate=physics.SIMULATION_RATE, continuous=False, shots=None):
+        self.seed = seed
+        self.physics_rate = physics_rate
+        self.continuous = continuous
+        self.shots = list(shots or [])
+
+    def record(self, cue_ball, angle, power, top_spin=0.0, side_spin=0.0, clock=0.0):
+        self.shots.append(Shot(cue_ball.x, cue_ball.y, angle, power, top_spin, side_spin, clock))
+
+    def to_bytes(self):
+        flags = CONTINUOUS_FLAG if self.continuous else 0
+        parts = [HEADER.pack(MAGIC, VERSION, flags, self.physics_rate, self.seed, len(self.shots))]
+        parts.extend(SHOT.pack(*shot) for shot in self.shots)
+        return b''.join(parts)
+
+    @classmethod
+    def from_bytes(cls, data):
+        magic, version, flags, physics_rate, seed, count = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Not a version %d replay" % VERSION)
+        if len(data) != HEADER.size + count * SHOT.size:
+            raise ValueError("Replay is truncated or has trailing data")
+        shots = [Shot(*SHOT.unpack_from(data, HEADER.size + index * SHOT.size)) for index in range(count)]
+        return cls(seed, physics_rate, bool(flags & CONTINUOUS_FLAG), shots)
+
+    def save(self, path):
+        with open(path, 'wb') as file:
+            file.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as file:
+            return cls.from_bytes(file.read())
+
+
+class ReplaySimulator:
+    """
+    Headless re-simulation of a Replay at full CPU speed. The table at the
+    start of each shot is checkpointed the first time it is reached, so
+    frame(shot, step) only replays from the nearest earlier checkpoint.
+    """
+
+    def __init__(self, replay):
+        self.replay = replay
+        self.step_frames = physics.SIMULATION_RATE / replay.physics_rate
+        self.rng = random.Random(replay.seed)
+        engine = physics.create_table(rng=self.rng)
+        # (balls, broad-phase order, target ball, rack rng state) at the start of
+        # each shot. The live engine keeps its sweep order from frame to frame,
+        # and the order of touching balls with equal x decides which contact
+        # resolves first, so it is carried over too.
+        self._checkpoints = [(engine.balls, _sweep_numbers(engine), 1, self.rng.getstate())]
+
+    def __len__(self):
+        return len(self.replay.shots)
+
+    def frame(self, shot, step):
+        """Copies of every ball, cue ball first, after step physics steps of the given shot"""
+        engine = self._start(shot)
+        for _ in range(step):
+            if engine.are_all_balls_stopped():
+                break
+            engine.step(self.step_frames)
+        return [ball.copy_state() for ball in engine.balls]
+
+    def play(self, shot):
+        """Play a shot to rest; returns (balls at rest, steps taken)"""
+        engine = self._start(shot)
+        steps = 0
+        while not engine.are_all_balls_stopped() and steps < MAX_STEPS_PER_SHOT:
+            engine.step(self.step_frames)
+            steps += 1
+        return [ball.copy_state() for ball in engine.balls], steps
+
+    def final_table(self):
+        """Balls at the start of the turn after the last shot"""
+        balls = self._checkpoint(len(self.replay.shots))[0]
+        return [ball.copy_state() for ball in balls]
+
+    def _start(self, shot):
+        """Engine over a fresh copy of the table at the start of a shot, with the stroke applied"""
+        balls, order = self._checkpoint(shot)[:2]
+        engine = self._engine([ball.copy_state() for ball in balls], order)
+        self._apply(engine, self.replay.shots[shot])
+        return engine
+
+    def _checkpoint(self, shot):
+        while len(self._checkpoints) <= shot:
+            index = len(self._checkpoints) - 1
+            balls, order, target, rng_state = self._checkpoints[index]
+            engine = self._engine([ball.copy_state() for ball in balls], order)
+            self._apply(engine, self.replay.shots[index])
+            steps = 0
+            while not engine.are_all_balls_stopped() and steps < MAX_STEPS_PER_SHOT:
+                engine.step(self.step_frames)
+                steps += 1
+            # The live game always steps the resting table at least once before
+            # the next shot, which clears the side-spin aim of stopped balls
+            engine.step(self.step_frames)
+            self.rng.setstate(rng_state)
+            target = self._settle(engine, target)
+            self._checkpoints.append((engine.balls, _sweep_numbers(engine), target, self.rng.getstate()))
+        return self._checkpoints[shot]
+
+    def _engine(self, balls, order):
+        engine_class = ContinuousPhysicsEngine if self.replay.continuous else PhysicsEngine
+        engine = engine_class(balls[0], balls[1:])
+        engine._sweep_order = [balls[number] for number in order]
+        return engine
+
+    def _apply(self, engine, shot):
+        cue_ball = engine.cue_ball
+        cue_ball.x, cue_ball.y = shot.cue_x, shot.cue_y
+        if self.replay.continuous:
+            engine.time = shot.clock
+        apply_shot(cue_ball, shot.angle, shot.power, shot.top_spin, shot.side_spin)
+        engine.wake()
+
+    def _settle(self, engine, target):
+        """Same changes to the table as Game.handle_game_logic; returns the next target ball"""
+        cue_ball = engine.cue_ball
+        first_hit = cue_ball.collision_order[0].number if cue_ball.collision_order else None
+        for ball in engine.balls:
+            ball.collision_order.clear()
+        return settle_shot(cue_ball, engine.numbered_balls, target, first_hit, self.rng)[2]
+
+
+def _sweep_numbers(engine):
+    return [ball.number for ball in engine._sweep_order]
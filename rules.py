@@ -0,0 +1,38 @@
+import physics
+
+
+def settle_shot(cue_ball, numbered_balls, target, first_hit, rng):
+    """
+    Apply the 9-ball rules to a table that has come to rest. Local games,
+    replays and server rooms all settle shots here. first_hit is the number of the first ball
+    the cue ball touched, or None. Spots the 9 after a foul, re-racks from
+    rng after a win and returns a pocketed cue ball to its starting spot.
+    Returns (foul, game_over, next target ball).
+    """
+    nine_ball = numbered_balls[8]
+    foul = not cue_ball.in_game or first_hit != target
+    game_over = False
+
+    if foul:
+        if not nine_ball.in_game:
+            nine_ball.spot([cue_ball] + [ball for ball in numbered_balls if ball.in_game])
+    elif not nine_ball.in_game:
+        # Game over: fresh rack for the next game
+        game_over = True
+        target = 1
+        cue_ball.reset()
+        for ball in numbered_balls:
+            ball.reset()
+        geometry = cue_ball.geometry
+        physics.setup_rack(numbered_balls, geometry.width, geometry.height, geometry.edge_width,
+                           geometry.pocket_radius, geometry.ball_radius, rng)
+
+    if not numbered_balls[target - 1].in_game:
+        for number in range(target, 10):
+            if number == 9 or numbered_balls[number - 1].in_game:
+                target = number
+                break
+
+    if not cue_ball.in_game:
+        cue_ball.reset()
+    return foul, game_over, target
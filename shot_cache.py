@@ -0,0 +1,62 @@
+from collections import OrderedDict
+
+# Returned by get() on a miss, since None is a valid cached value
+MISSING = object()
+
+
+class TranspositionCache:
+    """
+    Bounded LRU memo for AI evaluations, keyed on a quantized table layout.
+    Positions are snapped to a grid of quantum pixels, so layouts that differ
+    by less than that share an entry. Once max_entries is reached the least
+    recently used entry is evicted.
+    """
+
+    def __init__(self, max_entries=4096, quantum=0.5):
+        self.max_entries = max_entries
+        self.quantum = quantum
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def key(self, balls, *extra):
+        """Hashable key for the in-game mask and quantized positions of balls, plus any extra values"""
+        quantum = self.quantum
+        mask = 0
+        positions = []
+        for index, ball in enumerate(balls):
+            if ball.in_game:
+                mask |= 1 << index
+                positions.append((round(ball.x / quantum), round(ball.y / quantum)))
+        return (mask, tuple(positions)) + extra
+
+    def quantize(self, value):
+        return round(value / self.quantum)
+
+    def get(self, key):
+        """Cached value for key, or MISSING; a hit marks the entry as recently used"""
+        value = self._entries.get(key, MISSING)
+        if value is MISSING:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
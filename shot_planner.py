@@ -0,0 +1,116 @@
+import math
+import time
+import numpy as np
+from physics import PhysicsEngine, SIMULATION_RATE
+from batch_physics import TableBatch
+
+# Score of a shot that fouls and hands the opponent ball in hand
+FOUL_SCORE = -1.0
+# Score of a legal shot that pockets at least one ball and keeps the turn
+POT_SCORE = 1.0
+# Extra score for legally pocketing the 9 ball, which wins the rack
+WIN_SCORE = 2.0
+# Weight of the cue ball's leave on the next target ball
+POSITION_WEIGHT = 0.3
+
+
+class ShotPlanner:
+    """
+    Monte-Carlo shot search on the real physics. Candidate (angle, power,
+    top_spin, side_spin) tuples are sampled around seed shots, rolled out
+    together on a TableBatch and scored on where the balls actually end up.
+    Batches keep coming until time_budget seconds have passed, and a batch
+    still rolling at the deadline is scored where it stands, so plan()
+    returns within the budget plus one physics step. Rollouts step at
+    physics_rate, the rate the game itself runs its physics at.
+    """
+
+    def __init__(self, time_budget=0.1, batch_size=32, max_frames=400,
+                 angle_spread=0.03, power_spread=0.3, spin_spread=0.5, seed=None,
+                 physics_rate=SIMULATION_RATE):
+        self.time_budget = time_budget
+        self.batch_size = batch_size
+        self.max_frames = max_frames
+        self.step_frames = SIMULATION_RATE / physics_rate
+        self.max_steps = math.ceil(max_frames / self.step_frames)
+        self.angle_spread = angle_spread
+        self.power_spread = power_spread
+        self.spin_spread = spin_spread
+        self.rng = np.random.default_rng(seed)
+        self.rollouts = 0  # Shots simulated by the last plan() call
+
+    def plan(self, cue_ball, target_ball, all_balls, seeds):
+        """
+        Best shot found around the seed shots, as ((angle, power, top_spin,
+        side_spin), score). Returns (None, -inf) when there are no seeds.
+        """
+        seeds = np.array([seed for seed in seeds if seed is not None and seed[0] is not None], dtype=float)
+        if len(seeds) == 0:
+            return None, float('-inf')
+
+        deadline = time.perf_counter() + self.time_budget
+        engine = PhysicsEngine(cue_ball, all_balls)
+        on_table = np.array([ball.in_game for ball in engine.balls])
+        best_shot, best_score = None, float('-inf')
+        self.rollouts = 0
+
+        while True:
+            if best_shot is None:
+                # The first batch always evaluates the seeds themselves
+                shots = np.vstack([seeds, self._sample(seeds, self.batch_size - len(seeds))])
+            else:
+                # Later batches split between the seeds and the best shot so far
+                half = self.batch_size // 2
+                shots = np.vstack([self._sample(seeds, self.batch_size - half),
+                                   self._sample(best_shot[np.newaxis], half)])
+
+            batch = TableBatch.from_engine(engine, len(shots))
+            batch.apply_shot(shots[:, 0], shots[:, 1], shots[:, 2], shots[:, 3])
+            steps = 0
+            while steps < self.max_steps and time.perf_counter() < deadline:
+                if steps % 10 == 0 and batch.are_all_balls_stopped().all():
+                    break
+                batch.step(self.step_frames)
+                steps += 1
+
+            scores = self._score(batch, target_ball.number, on_table)
+            self.rollouts += len(shots)
+            index = int(np.argmax(scores))
+            if scores[index] > best_score:
+                best_shot, best_score = shots[index], float(scores[index])
+
+            if time.perf_counter() >= deadline:
+                break
+
+        return tuple(float(value) for value in best_shot), best_score
+
+    def _sample(self, centres, count):
+        if count <= 0:
+            return np.empty((0, 4))
+        picks = centres[self.rng.integers(len(centres), size=count)]
+        shots = np.empty((count, 4))
+        shots[:, 0] = picks[:, 0] + self.rng.normal(0, self.angle_spread, count)
+        shots[:, 1] = np.clip(picks[:, 1] * (1 + self.rng.uniform(-self.power_spread, self.power_spread, count)), 1, 20)
+        shots[:, 2] = np.clip(picks[:, 2] + self.rng.uniform(-self.spin_spread, self.spin_spread, count), -1, 1)
+        shots[:, 3] = np.clip(picks[:, 3] + self.rng.uniform(-self.spin_spread, self.spin_spread, count), -1, 1)
+        return shots
+
+    def _score(self, batch, target_number, on_table):
+        """Score every table of a rolled-out batch using the game's foul and turn rules"""
+        potted = on_table[1:] & ~batch.in_game[:, 1:]
+        foul = ~batch.in_game[:, 0] | (batch.first_hit != target_number)
+        kept_turn = ~foul & potted.any(axis=1)
+        won = ~foul & potted[:, -1]
+
+        # Leave: closeness of the cue ball to the lowest ball still on the table
+        remaining = batch.in_game.copy()
+        remaining[:, 0] = False
+        next_ball = np.where(remaining.any(axis=1), np.argmax(remaining, axis=1), 0)
+        rows = np.arange(batch.tables)
+        distance = np.hypot(batch.x[rows, next_ball] - batch.x[:, 0], batch.y[rows, next_ball] - batch.y[:, 0])
+        diagonal = np.hypot(batch.max_x - batch.min_x, batch.max_y - batch.min_y)
+        position = POSITION_WEIGHT * np.clip(1 - distance / diagonal, 0, 1)
+
+        return (np.where(foul, FOUL_SCORE, 0.0) +
+                np.where(kept_turn, POT_SCORE + position, 0.0) +
+                np.where(won, WIN_SCORE, 0.0))
@@ -0,0 +1,37 @@
+from collections import namedtuple
+from physics import apply_shot
+from event_physics import ContinuousPhysicsEngine, MAX_EVENTS
+
+# Outcome of a shot played to rest. balls are BallState copies in engine order
+# (cue ball first), events is the engine's event log, first_hit is the number of
+# the first ball the cue ball touched (None for a miss), pocketed lists ball
+# numbers in the order they dropped and frames is the time until the last ball
+# stopped.
+ShotResult = namedtuple('ShotResult', 'balls events first_hit pocketed frames')
+
+
+def copy_table(engine):
+    """ContinuousPhysicsEngine over pygame-free copies of an engine's balls"""
+    copies = {id(ball): ball.copy_state() for ball in engine.balls}
+    for ball in engine.balls:
+        copies[id(ball)].collision_order = [copies[id(other)] for other in ball.collision_order]
+    return ContinuousPhysicsEngine(copies[id(engine.cue_ball)],
+                                   [copies[id(ball)] for ball in engine.numbered_balls])
+
+
+def resolve_shot(engine, angle, power, top_spin=0.0, side_spin=0.0, max_events=MAX_EVENTS):
+    """
+    Play a shot on a copy of the table and jump straight to the resting state.
+    Between events every ball follows an analytic path, so the cost grows with
+    the number of contacts rather than the number of frames. The engine passed
+    in is left untouched.
+    """
+    table = copy_table(engine)
+    cue_ball = table.cue_ball
+    cue_ball.collision_order.clear()
+    apply_shot(cue_ball, angle, power, top_spin, side_spin)
+    table.run_until_stopped(max_events)
+
+    first_hit = cue_ball.collision_order[0].number if cue_ball.collision_order else None
+    pocketed = [event.ball for event in table.events if event.kind == 'pocket']
+    return ShotResult(table.balls, table.events, first_hit, pocketed, table.time)
@@ -0,0 +1,106 @@
+from collections import OrderedDict
+import pygame
+
+# Steps a ball's cos(number_angle) is quantized to over -1..1; a ball at rest
+# (cos 1) always lands exactly on the last step
+ROTATION_STEPS = 32
+
+
+class TextCache:
+    """
+    Rendered text surfaces keyed by font, string and colour. A string is
+    rasterized the first time it is drawn; a changed score or message is a
+    new key, so stale surfaces simply age out of the LRU.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+
+    def render(self, font, text, color, antialias=True):
+        key = (font, text, tuple(color), antialias)
+        surface = self._entries.get(key)
+        if surface is None:
+            surface = font.render(text, antialias, color)
+            self._entries[key] = surface
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        else:
+            self._entries.move_to_end(key)
+        return surface
+
+    def clear(self):
+        self._entries.clear()
+
+
+class BallSprites:
+    """
+    Pre-rendered ball images: the ball, the 9-ball stripe and the number
+    label squashed by the ball's rotation, keyed by number, colour, radius
+    and the quantized rotation step. Blitting one replaces the per-frame
+    circle, font.render and transform.scale calls in Ball.draw.
+    """
+
+    def __init__(self):
+        self._fonts = {}
+        self._sprites = {}
+
+    def font(self, size):
+        """Shared default font of the given size"""
+        font = self._fonts.get(size)
+        if font is None:
+            font = self._fonts[size] = pygame.font.Font(None, size)
+        return font
+
+    def step(self, cos_angle):
+        return round((cos_angle + 1) / 2 * ROTATION_STEPS)
+
+    def sprite(self, number, color, radius, step):
+        key = (number, tuple(color), radius, step)
+        sprite = self._sprites.get(key)
+        if sprite is None:
+            sprite = self._sprites[key] = self._render(number, color, radius, step)
+        return sprite
+
+    def _render(self, number, color, radius, step):
+        # Same drawing as Ball.draw used to do directly on the screen, with the
+        # ball centred at (radius, radius)
+        size = radius * 2 + 1
+        sprite = pygame.Surface((size, size), pygame.SRCALPHA)
+        pygame.draw.circle(sprite, color, (radius, radius), radius)
+        if number == 0:  # Don't draw number on cue ball
+            return sprite
+
+        cos_angle = step / ROTATION_STEPS * 2 - 1
+        if number == 9:  # Add white stripe to 9 ball
+            stripe_rect = pygame.Rect(
+                radius - radius*cos_angle,
+                radius - radius/3*cos_angle,
+                radius * 2*cos_angle,
+                radius * 2/3*cos_angle
+            )
+            pygame.draw.rect(sprite, (0, 0, 0), stripe_rect)
+
+        # Only draw the number if sufficiently visible
+        visibility = abs(cos_angle)
+        if visibility > 0.5:
+            number_text = self.font(int(radius * 1.5)).render(str(number), True, (0, 0, 0))
+            number_rect = number_text.get_rect()
+
+            # Scale the text based on visibility
+            scaled_width = int(number_rect.width * visibility)
+            scaled_height = int(number_rect.height * visibility)
+            scaled_inner = int(radius*2/3 * visibility)
+            if scaled_width > 0 and scaled_height > 0 and scaled_inner > 0:  # Prevent scaling to 0
+                scaled_text = pygame.transform.scale(number_text, (scaled_width, scaled_height))
+                pygame.draw.circle(sprite, (255, 255, 255), (radius, radius), scaled_inner)
+                sprite.blit(scaled_text, scaled_text.get_rect(center=(radius, radius)))
+        return sprite
+
+    def clear(self):
+        self._sprites.clear()
+
+
+# Shared by every Ball and the portal, so each image is rendered once per process
+ball_sprites = BallSprites()
+text_cache = TextCache()
@@ -61,6 +61,21 @@ class Stick:
                 self.striking = False
                 self.visible = False
 
+    def bounds(self, ball, angle, portal):
+        """Screen rectangles covered by draw(): the stick itself and the power indicator"""
+        current_offset = self.strike_position if self.striking else self.current_pullback
+        start_x = ball.x - (self.length + ball.radius + current_offset) * math.cos(angle)
+        start_y = ball.y - (self.length + ball.radius + current_offset) * math.sin(angle)
+        end_x = ball.x - (ball.radius + current_offset) * math.cos(angle)
+        end_y = ball.y - (ball.radius + current_offset) * math.sin(angle)
+        stick_rect = pygame.Rect(min(start_x, end_x), min(start_y, end_y),
+                                 abs(end_x - start_x) + 1, abs(end_y - start_y) + 1)
+        stick_rect.inflate_ip(self.thickness + 2, self.thickness + 2)
+
+        indicator_x = portal.spin_circle_center[0] + portal.SPIN_CIRCLE_RADIUS + 30
+        indicator_y = portal.spin_circle_center[1] + 100//2
+        return [stick_rect, pygame.Rect(indicator_x, indicator_y - 100, 20, 100)]
+
     def draw(self, screen, ball, mouse_pos, angle, portal):
         if not self.visible:
             return
@@ -0,0 +1,102 @@
+import math
+from collections import namedtuple
+from functools import lru_cache
+from types import MappingProxyType
+
+# Largest angle between a ball's approach and a pocket's facing direction that
+# still drops the ball: corner pockets open diagonally, side pockets straight on
+CORNER_ACCEPTANCE = math.pi / 4
+SIDE_ACCEPTANCE = math.pi / 3
+
+_FIELDS = (
+    'width height edge_width pocket_radius ball_radius offset cushion_width '
+    'pockets capture_radius min_x max_x min_y max_y kitchen_x foot_spot diamonds '
+    'pocket_angles acceptance_angles bank_lines pocket_mirrors'
+)
+
+
+class TableGeometry(namedtuple('TableGeometry', _FIELDS)):
+    """
+    Fixed layout of a table, computed once and shared by physics, AI and
+    rendering. Pockets are listed in the order BallState checks them: the
+    four corners (top left, top right, bottom left, bottom right), then the
+    top and bottom side pockets. min_x..max_y bound a ball's centre between
+    the cushions. bank_lines are the cushion lines the AI mirrors bank shots
+    across, and pocket_mirrors[i][cushion] is pocket i mirrored across one.
+    """
+    __slots__ = ()
+
+    def mirror(self, x, y, cushion):
+        """Reflect a point across one of the bank_lines"""
+        position = self.bank_lines[cushion]
+        if cushion in ('top', 'bottom'):
+            return x, 2 * position - y
+        return 2 * position - x, y
+
+    def accepts(self, pocket, approach_angle):
+        """Whether a ball travelling at approach_angle can drop into pocket (an index)"""
+        difference = abs((approach_angle - self.pocket_angles[pocket] + math.pi) % (2 * math.pi) - math.pi)
+        return difference <= self.acceptance_angles[pocket]
+
+
+@lru_cache(maxsize=None)
+def table_geometry(width=800, height=400, edge_width=20, pocket_radius=15, ball_radius=8):
+    """Shared TableGeometry for a set of dimensions; the defaults are the game's table"""
+    offset = pocket_radius / math.sqrt(2)
+    cushion_width = pocket_radius
+    pockets = (
+        (edge_width + offset, edge_width + offset),
+        (width - edge_width - offset, edge_width + offset),
+        (edge_width + offset, height - edge_width - offset),
+        (width - edge_width - offset, height - edge_width - offset),
+        (width // 2, edge_width),
+        (width // 2, height - edge_width)
+    )
+    pocket_angles = (-3 * math.pi / 4, -math.pi / 4, 3 * math.pi / 4, math.pi / 4, -math.pi / 2, math.pi / 2)
+    acceptance_angles = (CORNER_ACCEPTANCE,) * 4 + (SIDE_ACCEPTANCE,) * 2
+
+    # One diamond per quarter of each rail section, between the pockets
+    diamonds = []
+    for i in range(1, 4):
+        along_width = (width / 2 - edge_width * 2) / 4 * i
+        along_height = (height - edge_width * 2) / 4 * i
+        diamonds += [
+            (edge_width / 2 + along_width, edge_width / 2),
+            (width - edge_width / 2 - along_width, edge_width / 2),
+            (edge_width / 2 + along_width, height - edge_width / 2),
+            (width - edge_width / 2 - along_width, height - edge_width / 2),
+            (edge_width / 2, edge_width / 2 + along_height),
+            (width - edge_width / 2, edge_width / 2 + along_height),
+        ]
+
+    # Cushion lines used for bank shots, at the corner pocket centres
+    bank_lines = MappingProxyType({
+        'top': edge_width + offset,
+        'bottom': height - edge_width - offset,
+        'left': edge_width + offset,
+        'right': width - edge_width - offset,
+    })
+    pocket_mirrors = tuple(
+        MappingProxyType({
+            'top': (x, 2 * bank_lines['top'] - y),
+            'bottom': (x, 2 * bank_lines['bottom'] - y),
+            'left': (2 * bank_lines['left'] - x, y),
+            'right': (2 * bank_lines['right'] - x, y),
+        })
+        for x, y in pockets
+    )
+
+    spot_distance = (width - edge_width * 2 - pocket_radius * 2) / 8 * 2
+    return TableGeometry(
+        width=width, height=height, edge_width=edge_width, pocket_radius=pocket_radius,
+        ball_radius=ball_radius, offset=offset, cushion_width=cushion_width,
+        pockets=pockets, capture_radius=pocket_radius + 8,
+        min_x=edge_width + cushion_width + ball_radius,
+        max_x=width - edge_width - cushion_width - ball_radius,
+        min_y=edge_width + cushion_width + ball_radius,
+        max_y=height - edge_width - cushion_width - ball_radius,
+        kitchen_x=edge_width + spot_distance,
+        foot_spot=(width - edge_width - spot_distance, height / 2),
+        diamonds=tuple(diamonds), pocket_angles=pocket_angles, acceptance_angles=acceptance_angles,
+        bank_lines=bank_lines, pocket_mirrors=pocket_mirrors
+    )
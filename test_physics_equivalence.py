@@ -0,0 +1,383 @@
+"""
+Checks that the trig-free vector physics matches the angle-based formulas it
+replaced. The per-function tests restate the old atan2/cos/sin code and
+compare against it to REL_TOL; the whole-shot tests replay seeded racks and
+compare final positions, pots and first hit with values recorded from the
+angle-based engine, to POSITION_TOL pixels.
+
+Run with: python -m pytest -q test_physics_equivalence.py
+"""
+import math
+import random
+import pytest
+import physics
+from event_physics import ContinuousPhysicsEngine
+
+# Relative tolerance for single operations; the vector forms only differ from
+# the angle forms by rounding
+REL_TOL = 1e-9
+ABS_TOL = 1e-12
+
+# Whole shots accumulate that rounding over hundreds of frames and collisions,
+# and the event-driven engine only pins contact times down to its
+# ROOT_TOLERANCE; the largest drift seen on the recorded racks was under 1e-4 px
+POSITION_TOL = 1e-3
+
+SAMPLES = 500
+
+
+def close(actual, expected):
+    return actual == pytest.approx(expected, rel=REL_TOL, abs=ABS_TOL)
+
+
+def make_ball(x=400.0, y=200.0, number=1):
+    return physics.BallState(x, y, physics.BALL_RADIUS, physics.TABLE_WIDTH, physics.TABLE_HEIGHT,
+                             physics.EDGE_WIDTH, physics.POCKET_RADIUS, 0, physics.ACCELERATION, number)
+
+
+def random_speed(rng):
+    # Mostly general directions, plus axis-aligned ones where atan2 and the
+    # component ratios meet at their edge cases
+    speed = rng.uniform(0.01, 20)
+    choice = rng.random()
+    if choice < 0.1:
+        return rng.choice((-speed, speed)), 0.0
+    if choice < 0.2:
+        return 0.0, rng.choice((-speed, speed))
+    angle = rng.uniform(-math.pi, math.pi)
+    return speed * math.cos(angle), speed * math.sin(angle)
+
+
+def angle_acceleration(acceleration, speed_x, speed_y):
+    """Old update_acceleration"""
+    angle = math.atan2(speed_y, speed_x)
+    return acceleration * abs(math.cos(angle)), acceleration * abs(math.sin(angle))
+
+
+# Per-function checks against the angle-based formulas
+
+
+def test_update_acceleration():
+    rng = random.Random(1)
+    ball = make_ball()
+    for _ in range(SAMPLES):
+        ball.speed_x, ball.speed_y = random_speed(rng)
+        ball.update_acceleration()
+        expected_x, expected_y = angle_acceleration(ball.acceleration, ball.speed_x, ball.speed_y)
+        assert close(ball.acceleration_x, expected_x)
+        assert close(ball.acceleration_y, expected_y)
+
+    # atan2(0, 0) is 0, so a ball at rest put all of its deceleration along x
+    ball.speed_x = ball.speed_y = 0.0
+    ball.update_acceleration()
+    assert (ball.acceleration_x, ball.acceleration_y) == angle_acceleration(ball.acceleration, 0.0, 0.0)
+
+
+def test_resolve_collision():
+    rng = random.Random(2)
+    for _ in range(SAMPLES):
+        ball = make_ball(number=rng.choice((0, 3)))
+        other_ball = make_ball(number=5)
+        ball.speed_x, ball.speed_y = random_speed(rng)
+        other_ball.speed_x, other_ball.speed_y = random_speed(rng) if rng.random() < 0.3 else (0.0, 0.0)
+        ball.side_spin = rng.choice((0.0, rng.uniform(-0.5, 0.5)))
+        ball.top_spin = rng.uniform(-1, 1)
+        angle = rng.uniform(-math.pi, math.pi)
+
+        v1x, v1y = ball.speed_x, ball.speed_y
+        v2x, v2y = other_ball.speed_x, other_ball.speed_y
+        # The cue ball hands 30% of its side spin over before the deflection
+        side_spin = ball.side_spin * (0.7 if ball.number == 0 else 1)
+        ball.resolve_collision(other_ball, math.cos(angle), math.sin(angle))
+
+        # Old decomposition along the collision angle; masses are equal, so
+        # the parallel components swap
+        v1_parallel = v1x * math.cos(angle) + v1y * math.sin(angle)
+        v1_perpendicular = -v1x * math.sin(angle) + v1y * math.cos(angle)
+        v2_parallel = v2x * math.cos(angle) + v2y * math.sin(angle)
+        v2_perpendicular = -v2x * math.sin(angle) + v2y * math.cos(angle)
+        speed_x = v2_parallel * math.cos(angle) - v1_perpendicular * math.sin(angle)
+        speed_y = v2_parallel * math.sin(angle) + v1_perpendicular * math.cos(angle)
+        other_speed_x = v1_parallel * math.cos(angle) - v2_perpendicular * math.sin(angle)
+        other_speed_y = v1_parallel * math.sin(angle) + v2_perpendicular * math.cos(angle)
+
+        # Old spin deflection: rebuild the velocity from its angle plus the deflection
+        if abs(side_spin) > 0:
+            deflection_angle = math.atan2(speed_y, speed_x) + side_spin * 0.2
+            velocity_mag = math.sqrt(speed_x**2 + speed_y**2)
+            speed_x = velocity_mag * math.cos(deflection_angle)
+            speed_y = velocity_mag * math.sin(deflection_angle)
+
+        assert close(ball.speed_x, speed_x)
+        assert close(ball.speed_y, speed_y)
+        assert close(other_ball.speed_x, other_speed_x)
+        assert close(other_ball.speed_y, other_speed_y)
+        assert close((ball.acceleration_x, ball.acceleration_y),
+                     angle_acceleration(ball.acceleration, ball.speed_x, ball.speed_y))
+        assert close((other_ball.acceleration_x, other_ball.acceleration_y),
+                     angle_acceleration(other_ball.acceleration, other_ball.speed_x, other_ball.speed_y))
+
+
+def test_integrate_friction():
+    rng = random.Random(3)
+    for _ in range(SAMPLES):
+        ball = make_ball()
+        dt = rng.choice((1.0, 0.25))
+        ball.speed_x, ball.speed_y = random_speed(rng)
+        spin_angle = rng.uniform(-math.pi, math.pi)
+        ball.spin_direction_x, ball.spin_direction_y = math.cos(spin_angle), math.sin(spin_angle)
+        rotational_magnitude = rng.uniform(0, 3)
+        ball.rotational_speed_x = rotational_magnitude * math.cos(spin_angle)
+        ball.rotational_speed_y = rotational_magnitude * math.sin(spin_angle)
+
+        # Old friction: sliding split by the angle of travel, rolling by the
+        # angle the spin was applied in
+        angle = math.atan2(ball.speed_y, ball.speed_x)
+        speed_x = ball.update_speed(ball.speed_x, ball.sliding_acceleration * abs(math.cos(angle)) * dt)
+        speed_y = ball.update_speed(ball.speed_y, ball.sliding_acceleration * abs(math.sin(angle)) * dt)
+        rotational_speed_x = ball.update_speed(ball.rotational_speed_x,
+                                               ball.rotational_acceleration * abs(math.cos(spin_angle)) * dt)
+        rotational_speed_y = ball.update_speed(ball.rotational_speed_y,
+                                               ball.rotational_acceleration * abs(math.sin(spin_angle)) * dt)
+        x = ball.x + (speed_x + rotational_speed_x) * dt
+        y = ball.y + (speed_y + rotational_speed_y) * dt
+
+        ball.integrate(dt)
+        assert close((ball.speed_x, ball.speed_y), (speed_x, speed_y))
+        assert close((ball.rotational_speed_x, ball.rotational_speed_y), (rotational_speed_x, rotational_speed_y))
+        assert close((ball.x, ball.y), (x, y))
+
+
+def test_top_spin_direction():
+    rng = random.Random(4)
+    for _ in range(SAMPLES):
+        ball = make_ball()
+        ball.speed_x, ball.speed_y = random_speed(rng)
+        ball.top_spin = rng.choice((-1, 1)) * rng.uniform(0.1, 1.5)
+        top_spin = ball.top_spin
+        ball.convert_top_spin()
+
+        # Old form stored the angle of travel and rolled along it
+        angle = math.atan2(ball.speed_y, ball.speed_x)
+        rotational_magnitude = abs(top_spin) * 3 * (1 if top_spin > 0 else -1)
+        assert close((ball.spin_direction_x, ball.spin_direction_y), (math.cos(angle), math.sin(angle)))
+        assert close((ball.rotational_speed_x, ball.rotational_speed_y),
+                     (rotational_magnitude * math.cos(angle), rotational_magnitude * math.sin(angle)))
+
+
+def test_side_spin_deflection():
+    rng = random.Random(5)
+    for _ in range(SAMPLES):
+        ball = make_ball()
+        ball.speed_x, ball.speed_y = random_speed(rng)
+        ball.side_spin = rng.uniform(-0.6, 0.6)
+        speed_x, speed_y = ball.speed_x, ball.speed_y
+        ball.apply_side_spin()
+
+        # Old form turned the shot line by asin(side_spin) and rebuilt the velocity from the angle
+        target_angle = math.atan2(speed_y, speed_x)
+        new_angle = target_angle - math.asin(ball.side_spin)
+        velocity_mag = math.sqrt(speed_x**2 + speed_y**2)
+        assert ball.has_target_angle
+        assert close(ball.initial_target_angle, target_angle)
+        assert close((ball.speed_x, ball.speed_y),
+                     (velocity_mag * math.cos(new_angle), velocity_mag * math.sin(new_angle)))
+
+
+@pytest.mark.parametrize('side', ['left', 'right', 'top', 'bottom'])
+def test_check_cushions_mirrors_spin_direction(side):
+    rng = random.Random(side)
+    for _ in range(SAMPLES // 4):
+        ball = make_ball()
+        geometry = ball.geometry
+        spin_angle = rng.uniform(-math.pi, math.pi)
+        ball.spin_direction_x, ball.spin_direction_y = math.cos(spin_angle), math.sin(spin_angle)
+        ball.rotational_speed_x = math.cos(spin_angle)
+        ball.rotational_speed_y = math.sin(spin_angle)
+        if side == 'left':
+            ball.x = geometry.min_x - 1
+        elif side == 'right':
+            ball.x = geometry.max_x + 1
+        elif side == 'top':
+            ball.y = geometry.min_y - 1
+        else:
+            ball.y = geometry.max_y + 1
+        ball.check_cushions()
+
+        # The old stored angle became pi - angle off a side cushion and -angle off the top or bottom
+        mirrored = math.pi - spin_angle if side in ('left', 'right') else -spin_angle
+        assert close((ball.spin_direction_x, ball.spin_direction_y), (math.cos(mirrored), math.sin(mirrored)))
+
+
+def kick(*balls):
+    for ball in balls:
+        ball.convert_top_spin()
+        ball.apply_side_spin(curve=False)
+
+
+def test_continuous_collision_normal():
+    rng = random.Random(6)
+    for _ in range(SAMPLES // 5):
+        contact_angle = rng.uniform(-math.pi, math.pi)
+        speed = random_speed(rng)
+        rotational_speed = random_speed(rng)
+        side_spin = rng.uniform(-0.5, 0.5)
+
+        pairs = []
+        for _ in range(2):
+            ball = make_ball(300.0, 200.0, number=0)
+            other_ball = make_ball(300.0 + 2 * physics.BALL_RADIUS * math.cos(contact_angle),
+                                   200.0 + 2 * physics.BALL_RADIUS * math.sin(contact_angle))
+            ball.speed_x, ball.speed_y = speed
+            ball.rotational_speed_x, ball.rotational_speed_y = rotational_speed
+            ball.side_spin = side_spin
+            pairs.append((ball, other_ball))
+
+        engine = ContinuousPhysicsEngine(pairs[0][0], [pairs[0][1]])
+        engine._resolve('collision', 0, 1)
+
+        # Old form passed atan2 of the centre offset and its cos/sin as the
+        # normal. The engine restarts spin effects after the contact, so the
+        # reference pair gets the same kick
+        ball, other_ball = pairs[1]
+        angle = math.atan2(other_ball.y - ball.y, other_ball.x - ball.x)
+        ball.resolve_collision(other_ball, math.cos(angle), math.sin(angle))
+        closing = ((ball.speed_x + ball.rotational_speed_x - other_ball.speed_x - other_ball.rotational_speed_x) * math.cos(angle) +
+                   (ball.speed_y + ball.rotational_speed_y - other_ball.speed_y - other_ball.rotational_speed_y) * math.sin(angle))
+        # Only the cue ball is rolling, so only its side of the hand-over applies
+        rolling_in = ball.rotational_speed_x * math.cos(angle) + ball.rotational_speed_y * math.sin(angle)
+        if closing > 0 and rolling_in > 0:
+            ball.rotational_speed_x -= rolling_in * math.cos(angle)
+            ball.rotational_speed_y -= rolling_in * math.sin(angle)
+            other_ball.speed_x += rolling_in * math.cos(angle)
+            other_ball.speed_y += rolling_in * math.sin(angle)
+        kick(ball, other_ball)
+
+        for actual, expected in zip(pairs[0], pairs[1]):
+            assert close((actual.speed_x, actual.speed_y), (expected.speed_x, expected.speed_y))
+            assert close((actual.rotational_speed_x, actual.rotational_speed_y),
+                         (expected.rotational_speed_x, expected.rotational_speed_y))
+
+
+def test_batch_spin_direction():
+    np = pytest.importorskip('numpy')
+    from batch_physics import TableBatch
+
+    rng = np.random.default_rng(7)
+    tables = SAMPLES
+    batch = TableBatch.from_engine(physics.create_table(rng=random.Random(0)), tables)
+    batch.in_game[:, 1:] = False
+    batch.x[:, 0], batch.y[:, 0] = 400.0, 200.0
+    batch.vx[:, 0] = rng.uniform(-15, 15, tables)
+    batch.vy[:, 0] = rng.uniform(-15, 15, tables)
+    batch.top_spin[:, 0] = rng.uniform(-1, 1, tables)
+    vx, vy, top_spin = batch.vx[:, 0].copy(), batch.vy[:, 0].copy(), batch.top_spin[:, 0].copy()
+    dt = 0.25
+    batch.step(dt)
+
+    # Old form stored arctan2 of the velocity and used its cos/sin for both the
+    # rolling velocity and the rolling friction split
+    spin_angle = np.arctan2(vy, vx)
+    magnitude = np.abs(top_spin) * 3 * np.sign(top_spin)
+    rot_acc = batch.rotational_acceleration * dt
+    rot_x = magnitude * np.cos(spin_angle)
+    rot_y = magnitude * np.sin(spin_angle)
+    rot_x = np.sign(rot_x) * np.maximum(np.abs(rot_x) - rot_acc * np.abs(np.cos(spin_angle)), 0.0)
+    rot_y = np.sign(rot_y) * np.maximum(np.abs(rot_y) - rot_acc * np.abs(np.sin(spin_angle)), 0.0)
+    np.testing.assert_allclose(batch.spin_x[:, 0], np.cos(spin_angle), rtol=REL_TOL, atol=ABS_TOL)
+    np.testing.assert_allclose(batch.spin_y[:, 0], np.sin(spin_angle), rtol=REL_TOL, atol=ABS_TOL)
+    np.testing.assert_allclose(batch.rot_x[:, 0], rot_x, rtol=REL_TOL, atol=ABS_TOL)
+    np.testing.assert_allclose(batch.rot_y[:, 0], rot_y, rtol=REL_TOL, atol=ABS_TOL)
+
+    # Cushions mirror the stored angle: pi - angle on the sides, -angle on top and bottom
+    batch.x[:, 0] = np.where(np.arange(tables) % 2 == 0, batch.min_x - 1, batch.max_x + 1)
+    batch.y[:, 0] = np.where(np.arange(tables) % 4 < 2, batch.min_y - 1, batch.max_y + 1)
+    batch.vx[:, 0] = batch.vy[:, 0] = batch.side_spin[:, 0] = 0.0
+    batch._rebound_cushions(batch.in_game.copy())
+    np.testing.assert_allclose(batch.spin_x[:, 0], np.cos(-(math.pi - spin_angle)), rtol=REL_TOL, atol=ABS_TOL)
+    np.testing.assert_allclose(batch.spin_y[:, 0], np.sin(-(math.pi - spin_angle)), rtol=REL_TOL, atol=ABS_TOL)
+
+
+def test_batch_leaves_resting_rack_alone():
+    np = pytest.importorskip('numpy')
+    from batch_physics import TableBatch
+
+    # Racked balls touch exactly; like PhysicsEngine, the batch must not
+    # resolve contacts between balls that are both at rest
+    engine = physics.create_table(rng=random.Random(0))
+    batch = TableBatch.from_engine(engine, 2)
+    x, y = batch.x.copy(), batch.y.copy()
+    batch.step()
+    engine.step()
+    np.testing.assert_array_equal(batch.x, x)
+    np.testing.assert_array_equal(batch.y, y)
+    assert [(ball.x, ball.y) for ball in engine.balls] == list(zip(x[0], y[0]))
+
+
+# Whole shots on seeded racks, against values recorded from the angle-based engine.
+# Each case is (rack seed, engine, dt, (angle, power, top spin, side spin),
+# first ball hit, balls pocketed, steps to rest, positions of the balls left on
+# the table in ball order). Most event-driven shots into the rack change with
+# the last bit of a contact time, so its cases are ones that do not
+RECORDED_SHOTS = [
+    (0, 'fixed', 1.0, (0.0347, 15.75, -0.04, -0.65), 1, (), 288, [
+        (652.7148, 320.5416), (601.8155, 260.8733), (613.5364, 234.2527), (238.9621, 107.4904), (578.4447, 171.2308),
+        (610.8548, 80.0932), (509.6423, 235.6908), (631.9413, 196.8819), (668.9890, 187.8049), (669.9016, 301.0066),
+    ]),
+    (9, 'fixed', 1.0, (-0.1333, 17.75, 0.15, 0.64), 2, (), 293, [
+        (489.2017, 111.9147), (715.6965, 135.6290), (535.7098, 154.2807), (550.5152, 231.9463), (669.5822, 62.6009),
+        (323.1742, 189.5218), (614.4820, 211.5466), (571.5481, 256.3341), (601.3213, 227.8764), (596.2572, 204.6926),
+    ]),
+    (57, 'fixed', 1.0, (0.1113, 17.87, -0.52, -0.16), 8, (0,), 199, [
+        (569.4423, 199.8615), (710.6328, 138.5225), (602.8947, 219.6181), (619.9173, 214.8397), (564.7485, 166.7594),
+        (613.6581, 184.6285), (603.9094, 162.1300), (583.7521, 207.0412), (596.3473, 197.1661),
+    ]),
+    (13, 'fixed', 0.25, (-0.0934, 14.53, 0.2, -0.68), None, (0,), 535, [
+        (569.7872, 200.0000), (597.5000, 216.0000), (611.3564, 192.0000), (625.2128, 200.0000), (597.5000, 184.0000),
+        (583.6436, 208.0000), (583.6436, 192.0000), (611.3564, 208.0000), (597.5000, 200.0000),
+    ]),
+    (19, 'fixed', 0.25, (0.0031, 14.88, 0.37, -0.59), 7, (0,), 1006, [
+        (554.9571, 208.3440), (611.3564, 208.0000), (516.7059, 84.3605), (583.2513, 192.1133), (597.5055, 216.3910),
+        (613.8535, 191.0132), (751.5188, 169.6815), (579.6487, 211.6745), (597.1739, 200.1263),
+    ]),
+    (52, 'fixed', 0.25, (-0.2776, 18.25, -0.25, 0.98), 1, (0, 4, 6), 1087, [
+        (192.4725, 317.5967), (389.2518, 238.1296), (520.1621, 72.3695), (48.4643, 53.7479), (632.3526, 190.5546),
+        (487.0574, 324.0089), (595.0688, 197.5110),
+    ]),
+    (5, 'continuous', 1.0, (0.2887, 19.28, 0.28, 0.84), None, (0,), 119, [
+        (569.7872, 200.0000), (583.6436, 208.0000), (583.6436, 192.0000), (611.3564, 208.0000), (597.5000, 216.0000),
+        (625.2128, 200.0000), (611.3564, 192.0000), (597.5000, 184.0000), (597.5000, 200.0000),
+    ]),
+    (20, 'continuous', 1.0, (-0.1771, 9.72, -0.11, 0.15), 7, (), 182, [
+        (504.9273, 341.7995), (553.8421, 201.8412), (597.5000, 222.0074), (620.3675, 176.3923), (578.5749, 216.7793),
+        (580.7172, 190.3104), (571.8936, 151.4756), (626.4163, 197.9171), (611.3564, 208.0000), (598.0632, 199.0245),
+    ]),
+    (1062, 'continuous', 1.0, (-0.0486, 14.26, 0.23, 0.38), 7, (), 286, [
+        (563.5709, 109.0955), (472.3451, 256.2582), (625.2128, 200.0000), (611.3564, 208.0000), (611.3564, 192.0000),
+        (597.5000, 322.1177), (581.3827, 192.0000), (581.9072, 156.9915), (583.6436, 208.7536), (597.5000, 200.0000),
+    ]),
+]
+
+
+@pytest.mark.parametrize('seed, engine_kind, dt, shot, first_hit, pocketed, steps, positions', RECORDED_SHOTS)
+def test_recorded_shot(seed, engine_kind, dt, shot, first_hit, pocketed, steps, positions):
+    engine = physics.create_table(rng=random.Random(seed))
+    if engine_kind == 'continuous':
+        engine = ContinuousPhysicsEngine(engine.cue_ball, engine.numbered_balls)
+    physics.apply_shot(engine.cue_ball, *shot)
+    engine.wake()
+
+    taken = 0
+    while not engine.are_all_balls_stopped() and taken < 40000:
+        engine.step(dt)
+        taken += 1
+
+    collision_order = engine.cue_ball.collision_order
+    assert (collision_order[0].number if collision_order else None) == first_hit
+    assert tuple(ball.number for ball in engine.balls if not ball.in_game) == pocketed
+    assert taken == steps
+    actual = [(ball.x, ball.y) for ball in engine.balls if ball.in_game]
+    assert len(actual) == len(positions)
+    for (x, y), (expected_x, expected_y) in zip(actual, positions):
+        assert abs(x - expected_x) <= POSITION_TOL
+        assert abs(y - expected_y) <= POSITION_TOL
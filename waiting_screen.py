@@ -11,11 +11,21 @@ class WaitingScreen:
         self.timeout = 30  # 30 seconds timeout
         self.connection = OnlineGameConnection()
 
+    def status_message(self):
+        status = self.connection.status
+        if status == 'connecting':
+            if self.connection.retry_delay:
+                return f"Server unreachable, retrying in {self.connection.retry_delay:g}s..."
+            return "Connecting to server..."
+        if status == 'reconnecting':
+            return "Connection lost, reconnecting..."
+        return "Waiting for opponent..."
+
     def draw(self, time_left):
         self.screen.fill((0, 0, 0))
 
         # Draw waiting message
-        waiting_text = self.font.render("Waiting for opponent...", True, (255, 255, 255))
+        waiting_text = self.font.render(self.status_message(), True, (255, 255, 255))
         timer_text = self.font.render(f"Time remaining: {time_left}s", True, (255, 255, 255))
         cancel_text = self.font.render("Press ESC to cancel", True, (255, 255, 255))
 
@@ -34,16 +44,12 @@ class WaitingScreen:
     def run(self):
         start_time = time.time()
 
-        # Try to connect to server
-        try:
-            self.connection.connect()
-        except Exception as e:
-            print(f"Failed to connect to server: {e}")
-            return "menu"
-
-        # Start looking for a match
+        # Connect in the background and ask for a match once connected, so
+        # the screen keeps drawing while the network is slow
+        self.connection.connect()
         self.connection.find_match()
 
+        clock = pygame.time.Clock()
         while True:
             current_time = time.time()
             elapsed_time = current_time - start_time
@@ -60,7 +66,8 @@ class WaitingScreen:
                         return "menu"
 
             # Check if match is found
-            if self.connection.is_match_found():
+            events = self.connection.poll_events()
+            if self.connection.is_match_found() or any(name == 'match_found' for name, _ in events):
                 return "matched"
 
             # Check for timeout
@@ -69,4 +76,4 @@ class WaitingScreen:
                 return "menu"
 
             self.draw(time_left)
-            pygame.time.Clock().tick(60)
+            clock.tick(60)